@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# bench_import.py
+
+"""
+导入耗时回归测试
+
+每个模块在全新的子进程中导入若干次，取最小值（受系统抖动影响最小），并检查导入后是否意外加载了重量级依赖
+（tkinter、matplotlib、openpyxl、PIL）。结果保存为 JSON，与上一次的结果比较：
+
+    python benchmarks/bench_import.py --output import_times.json --baseline import_times.json
+
+导入耗时超过基线的 (1 + tolerance) 倍，或出现不应加载的依赖时，退出码为 1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("tkinter", "matplotlib", "openpyxl", "PIL")
+
+# 模块 -> 允许加载的重量级依赖
+TARGETS = {
+    "telnet_app": (),
+    "telnet_app.telnet_manager": (),
+    "telnet_app.runner": (),
+    "telnet_app.cli": (),
+    "telnet_app.gui.main_window": ("tkinter",),
+}
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module, repeat=7):
+    """在子进程中导入模块 repeat 次，返回 (最小耗时秒, 已加载的重量级依赖)"""
+    samples = []
+    heavy = []
+    for _ in range(repeat):
+        code = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["elapsed"])
+        heavy = result["heavy"]
+    return min(samples), heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入耗时回归测试")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="结果保存路径（JSON）")
+    parser.add_argument("--baseline", help="用于比较的历史结果（JSON）")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="允许比基线慢的比例，默认 0.5")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("modules", {})
+
+    results = {}
+    failures = []
+    for module, allowed in TARGETS.items():
+        try:
+            elapsed, heavy = measure(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            # 可选依赖未安装时跳过，不算回归
+            print(f"{module:32s} 跳过: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+
+        results[module] = {"elapsed_ms": round(elapsed * 1000, 2), "heavy": heavy}
+        unexpected = [name for name in heavy if name not in allowed]
+        line = f"{module:32s} {elapsed * 1000:8.2f} ms"
+        if unexpected:
+            failures.append(f"{module} 加载了 {', '.join(unexpected)}")
+            line += f"  加载了: {', '.join(unexpected)}"
+
+        previous = baseline.get(module)
+        if previous:
+            ratio = results[module]["elapsed_ms"] / max(previous["elapsed_ms"], 0.01)
+            line += f"  (基线 {previous['elapsed_ms']:.2f} ms, x{ratio:.2f})"
+            if ratio > 1 + args.tolerance:
+                failures.append(f"{module} 导入耗时从 {previous['elapsed_ms']:.2f} ms 增加到 {results[module]['elapsed_ms']:.2f} ms")
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "modules": results}, f, indent=4, ensure_ascii=False)
+
+    for failure in failures:
+        print(f"回归: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# bench_suite.py
+
+"""
+性能基准测试，使用内置的模拟设备（telnet_app.fake_device），不需要开发板
+
+- commands/s：单条执行和流水线执行的吞吐量
+- TelnetManager 每条命令的额外开销：同一模拟设备上，TelnetManager.execute_command 与裸 socket 收发的耗时之差
+- 日志管道：解析输出、格式化日志行并经 LogFileWriter 写入文件的速度
+- Excel 导出：StreamingExcelExporter 写入并保存指定行数的耗时（未安装 openpyxl 时跳过）
+
+结果保存为 JSON，与上一次的结果比较：
+
+    python benchmarks/bench_suite.py --output bench.json --baseline bench.json
+
+任一指标比基线差 tolerance 以上时，退出码为 1
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from telnet_app.excel_exporter import EXCEL_HEADER  # noqa: E402
+from telnet_app.fake_device import FakeDevice, DeviceBehavior  # noqa: E402
+from telnet_app.log_writer import LogFileWriter, format_log_line  # noqa: E402
+from telnet_app.result_parser import parse_result  # noqa: E402
+from telnet_app.runner import CommandRunner  # noqa: E402
+from telnet_app.telnet_manager import TelnetManager  # noqa: E402
+
+HIGHER = "higher"
+LOWER = "lower"
+
+SAMPLE_COMMANDS = ["AT+VER", "AT+TEMP", "AT+GPIO=1", "AT+ADC=0"]
+
+
+def bench_throughput(device, commands, window):
+    """CommandRunner 执行 commands 条命令，返回每秒命令数"""
+    manager = TelnetManager(device.host, device.port)
+    manager.connect()
+    try:
+        runner = CommandRunner(manager, pipeline_window=window)
+        loops = max(1, commands // len(SAMPLE_COMMANDS))
+        start = time.perf_counter()
+        runner.run(SAMPLE_COMMANDS, loops)
+        elapsed = time.perf_counter() - start
+    finally:
+        manager.close()
+    return runner.executed / elapsed
+
+
+def _raw_round_trips(device, commands):
+    """裸 socket 逐条发送命令并读到提示符，返回每条命令的平均耗时（秒）"""
+    prompt = device.prompt
+    with socket.create_connection((device.host, device.port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buffer = b""
+        while not buffer.endswith(prompt):
+            buffer += sock.recv(4096)
+        start = time.perf_counter()
+        for index in range(commands):
+            sock.sendall(SAMPLE_COMMANDS[index % len(SAMPLE_COMMANDS)].encode("ascii") + b"\n")
+            buffer = b""
+            while not buffer.endswith(prompt):
+                buffer += sock.recv(4096)
+        return (time.perf_counter() - start) / commands
+
+
+def bench_manager_overhead(device, commands):
+    """TelnetManager.execute_command 比裸 socket 多出的每条命令耗时（微秒）"""
+    raw = _raw_round_trips(device, commands)
+    manager = TelnetManager(device.host, device.port)
+    manager.connect()
+    try:
+        start = time.perf_counter()
+        for index in range(commands):
+            manager.execute_command(SAMPLE_COMMANDS[index % len(SAMPLE_COMMANDS)])
+        managed = (time.perf_counter() - start) / commands
+    finally:
+        manager.close()
+    return max(0.0, managed - raw) * 1000000
+
+
+def bench_log_pipeline(device, results, directory):
+    """解析输出并写入日志文件，返回每秒处理的命令数"""
+    outputs = [device.response(command).decode("ascii") for command in SAMPLE_COMMANDS]
+    writer = LogFileWriter(os.path.join(directory, "bench_log.txt"))
+    start = time.perf_counter()
+    for index in range(results):
+        command = SAMPLE_COMMANDS[index % len(SAMPLE_COMMANDS)]
+        result, log_lines = parse_result(command, outputs[index % len(outputs)], 0.001)
+        writer.write(format_log_line(f"命令: {command}"))
+        for line, _ in log_lines:
+            writer.write(format_log_line(line))
+        writer.write(format_log_line(f"命令执行时间: {result.elapsed:.3f} 秒\n"))
+    writer.close(timeout=None)
+    return results / (time.perf_counter() - start)
+
+
+def bench_excel_export(rows, directory):
+    """写入 rows 行并保存 Excel 的耗时（秒），未安装 openpyxl 时返回 None"""
+    try:
+        from telnet_app.excel_exporter import StreamingExcelExporter
+        exporter = StreamingExcelExporter(os.path.join(directory, "bench.xlsx"), header=EXCEL_HEADER)
+    except ImportError:
+        return None
+    start = time.perf_counter()
+    for index in range(rows):
+        exporter.append(("2024-01-01 00:00:00", SAMPLE_COMMANDS[index % len(SAMPLE_COMMANDS)], str(index), "Pass"))
+    exporter.close()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(args):
+    """返回 {指标: {"value", "unit", "better"}}"""
+    results = {}
+    with FakeDevice(behavior=DeviceBehavior(), seed=0) as device:
+        results["serial_commands_per_s"] = (bench_throughput(device, args.commands, 1), "cmd/s", HIGHER)
+        results["pipelined_commands_per_s"] = (bench_throughput(device, args.commands, 8), "cmd/s", HIGHER)
+        results["manager_overhead_us"] = (bench_manager_overhead(device, args.commands), "us/cmd", LOWER)
+        with tempfile.TemporaryDirectory() as directory:
+            results["log_pipeline_commands_per_s"] = (
+                bench_log_pipeline(device, args.log_results, directory), "cmd/s", HIGHER
+            )
+            excel = bench_excel_export(args.excel_rows, directory)
+            if excel is not None:
+                results["excel_export_s"] = (excel, "s", LOWER)
+    return {
+        name: {"value": round(value, 3), "unit": unit, "better": better}
+        for name, (value, unit, better) in results.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="性能基准测试")
+    parser.add_argument("--commands", type=int, default=2000, help="吞吐量和开销测试的命令数")
+    parser.add_argument("--log-results", dest="log_results", type=int, default=50000, help="日志管道测试的命令数")
+    parser.add_argument("--excel-rows", dest="excel_rows", type=int, default=50000, help="Excel导出测试的行数")
+    parser.add_argument("--output", help="结果保存路径（JSON）")
+    parser.add_argument("--baseline", help="用于比较的历史结果（JSON）")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="允许比基线差的比例，默认 0.3")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results = run_benchmarks(args)
+    failures = []
+    for name, item in results.items():
+        line = f"{name:30s} {item['value']:12.3f} {item['unit']}"
+        previous = baseline.get(name)
+        if previous and previous["value"] > 0 and item["value"] > 0:
+            ratio = item["value"] / previous["value"]
+            line += f"  (基线 {previous['value']:.3f}, x{ratio:.2f})"
+            worse = ratio < 1 / (1 + args.tolerance) if item["better"] == HIGHER else ratio > 1 + args.tolerance
+            if worse:
+                failures.append(f"{name} 从 {previous['value']:.3f} 变为 {item['value']:.3f} {item['unit']}")
+        print(line)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=4, ensure_ascii=False)
+
+    for failure in failures:
+        print(f"回归: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@
 
 import sys
 import os
+import multiprocessing
 
 # 添加项目根目录到Python路径
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -18,4 +19,6 @@ def main():
     app.mainloop()
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，多进程执行的工作进程从这里启动
+    multiprocessing.freeze_support()
     main()
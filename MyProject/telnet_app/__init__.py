@@ -4,9 +4,24 @@
 
 __version__ = "1.0.1"
 
-from .gui.main_window import MainWindow
+import importlib
+
 from .telnet_manager import TelnetManager
+from .async_telnet import AsyncTelnetManager
 from .config_manager import import_config, export_config
-from .advanced_editor import AdvancedEditor
 
-__all__ = ['MainWindow', 'TelnetManager', 'import_config', 'export_config', 'AdvancedEditor', '__version__'] 
\ No newline at end of file
+# 图形界面相关的类按需导入，命令行模式下不加载 tkinter
+_LAZY_IMPORTS = {
+    'MainWindow': '.gui.main_window',
+    'AdvancedEditor': '.advanced_editor',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ['MainWindow', 'TelnetManager', 'AsyncTelnetManager', 'import_config', 'export_config', 'AdvancedEditor', '__version__'] 
\ No newline at end of file
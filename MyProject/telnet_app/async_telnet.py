@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+# async_telnet.py
+
+"""
+基于 asyncio 的 Telnet 传输层，不依赖 telnetlib（Python 3.13 起已移除）
+一个事件循环即可同时维持大量会话，无需每个会话占用一个线程
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import deque
+
+from . import instrumentation
+from .prompt_matcher import PromptMatcher, PROMPT, PAGER, PAGER_REPLY
+from .result_parser import PROMPT_TIMEOUT
+
+# Telnet 协议字节
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+READ_CHUNK_SIZE = 4096
+ERROR_GRACE = 0.5  # 出现错误标记后继续等待提示符的最长时间（秒）
+CANCEL_POLL = 0.02  # 同步接口检查 stop_event 的间隔（秒）
+CANCEL_WAIT = 1.0   # 取消后等待协程完成清理的最长时间（秒）
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """返回后台线程中运行的共享事件循环，首次调用时启动"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="telnet-event-loop", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro, stop_event=None):
+    """
+    在共享事件循环中执行协程，并阻塞等待结果（供同步接口使用）
+    - stop_event：等待期间被设置时取消协程并抛出 InterruptedError，不等协程自己超时
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("不能在 Telnet 事件循环线程中调用同步接口")
+    if stop_event is None:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    finished = threading.Event()
+    future = asyncio.run_coroutine_threadsafe(_guarded(coro, finished), loop)
+    while True:
+        done, _ = concurrent.futures.wait((future,), CANCEL_POLL)
+        if done:
+            return future.result()
+        if not stop_event.is_set():
+            continue
+        if not future.cancel():
+            return future.result()
+        # 等协程处理完取消（记录会话状态、关闭未完成的连接），避免与同一会话的下一个请求交叠
+        finished.wait(CANCEL_WAIT)
+        raise InterruptedError("已被用户中断")
+
+
+async def _guarded(coro, finished):
+    """执行协程，结束时（包括被取消）设置 finished"""
+    try:
+        return await coro
+    finally:
+        finished.set()
+
+
+class TelnetStream:
+    """
+    一条 Telnet 连接
+    - 拒绝服务器发起的所有选项协商（DO -> WONT，WILL -> DONT），与 telnetlib 默认行为一致
+    - 过滤子协商内容，只把普通数据放入缓冲区
+    - tap：SessionTap，设置后记录收发的原始字节和选项协商（见 session_record）
+    """
+    def __init__(self, reader, writer, tap=None):
+        self._reader = reader
+        self._writer = writer
+        self.tap = tap
+        self._buffer = bytearray()
+        self.position = 0           # 已取出的数据字节数（不含 IAC 序列）
+        self._iac_state = None      # None / IAC / 命令字节 / SB
+        self._sb_pending_iac = False
+        self.options = []           # 协商记录 [(命令, 选项), ...]
+        self.eof = False
+
+    @classmethod
+    async def open(cls, host, port, timeout=10, transport=None, recorder=None):
+        """
+        建立 TCP 连接
+        - transport：提供 async open_connection(host, port) 的对象（如 ReplayTransport），代替套接字
+        - recorder：SessionRecorder，设置后录制该连接
+        """
+        open_connection = transport.open_connection if transport else asyncio.open_connection
+        reader, writer = await asyncio.wait_for(open_connection(host, port), timeout)
+        return cls(reader, writer, recorder.open_session(host, port) if recorder else None)
+
+    def _process(self, data):
+        """处理原始字节中的 IAC 序列，普通数据追加到缓冲区"""
+        buffer = self._buffer
+        replies = bytearray()
+        state = self._iac_state
+        for byte in data:
+            if state is None:
+                if byte == IAC:
+                    state = IAC
+                else:
+                    buffer.append(byte)
+            elif state == IAC:
+                if byte == IAC:
+                    buffer.append(IAC)
+                    state = None
+                elif byte in (DO, DONT, WILL, WONT):
+                    state = byte
+                elif byte == SB:
+                    state = SB
+                    self._sb_pending_iac = False
+                else:
+                    state = None
+            elif state == SB:
+                if self._sb_pending_iac:
+                    self._sb_pending_iac = False
+                    if byte == SE:
+                        state = None
+                elif byte == IAC:
+                    self._sb_pending_iac = True
+            else:
+                self.options.append((state, byte))
+                if self.tap is not None:
+                    self.tap.option(state, byte)
+                if state == DO:
+                    replies += bytes((IAC, WONT, byte))
+                elif state == WILL:
+                    replies += bytes((IAC, DONT, byte))
+                state = None
+        self._iac_state = state
+        if replies:
+            self._send(bytes(replies))
+
+    async def read_some(self):
+        """从套接字读取一块数据并处理，连接关闭时设置 eof"""
+        data = await self._reader.read(READ_CHUNK_SIZE)
+        if self.tap is not None:
+            self.tap.received(data)
+        if not data:
+            self.eof = True
+            return b''
+        self._process(data)
+        return data
+
+    async def read_until_prompt(self, matcher, timeout=None, error_grace=ERROR_GRACE):
+        """
+        读取直到出现提示符，返回 (data, prompt, error)
+        - matcher：PromptMatcher，新到的数据只扫描一次，不会重复扫描整个缓冲区
+        - 遇到分页提示时自动发送空格继续，分页提示本身从数据中删除
+        - 遇到错误标记后最多再等待 error_grace 秒的提示符（None 表示仍按 timeout 等待）
+        - prompt / error 为匹配到的 Match；超时或连接关闭时 prompt 为 None，返回已读到的全部数据
+        - 连接关闭且没有任何数据时抛出 EOFError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        scanner = matcher.scanner()
+        scanned = 0
+        error = None
+        while True:
+            match = scanner.feed(self._buffer, scanned)
+            if match is not None:
+                if match.kind == PROMPT:
+                    return self._take(match.end), match, error
+                if match.kind == PAGER:
+                    scanned = match.end - len(match.pattern)
+                    del self._buffer[scanned:match.end]
+                    self.write(PAGER_REPLY)
+                else:
+                    scanned = match.end
+                    if error is None:
+                        error = match
+                        if error_grace is not None:
+                            grace_deadline = time.monotonic() + error_grace
+                            deadline = grace_deadline if deadline is None else min(deadline, grace_deadline)
+                continue
+            scanned = len(self._buffer)
+
+            if self.eof:
+                if self._buffer:
+                    return self._take(len(self._buffer)), None, error
+                raise EOFError("telnet connection closed")
+
+            if deadline is None:
+                await self.read_some()
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self._take(len(self._buffer)), None, error
+            try:
+                await asyncio.wait_for(self.read_some(), remaining)
+            except asyncio.TimeoutError:
+                return self._take(len(self._buffer)), None, error
+
+    def _take(self, end):
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        self.position += end
+        return data
+
+    def write(self, data):
+        """写入数据，数据中的 IAC 字节会被转义"""
+        if IAC in data:
+            data = data.replace(bytes((IAC,)), bytes((IAC, IAC)))
+        self._send(data)
+
+    def _send(self, data):
+        self._writer.write(data)
+        if self.tap is not None:
+            self.tap.sent(data)
+
+    async def drain(self):
+        await self._writer.drain()
+
+    def close(self):
+        if self.tap is not None:
+            self.tap.close()
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+
+
+def _pattern_text(match):
+    return match.pattern.decode("utf-8", errors="replace") if match else None
+
+
+class AsyncTelnetManager:
+    """
+    TelnetManager 的异步版本，所有方法都在事件循环中调用
+    - matcher：PromptMatcher，决定提示符、错误标记和分页提示，默认只识别 CIG-EVK-G2:>
+    - transport / recorder：见 TelnetStream.open
+    """
+    def __init__(self, host, port, timeout=10, matcher=None, transport=None, recorder=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.matcher = matcher or PromptMatcher()
+        self.transport = transport
+        self.recorder = recorder
+        self.stream = None
+        self.is_connected = False
+        self.last_active = 0.0  # 最近一次收发数据的时间（time.monotonic）
+        self.last_error = None  # 最近一条命令输出中匹配到的错误标记，没有时为 None
+        self.last_offset = 0    # 最近一条命令输出在本次连接收到的数据中的偏移
+        self.in_flight = 0      # 已发送、尚未收到提示符的命令数
+        self.pending_prompts = 0  # 被中断或超时的命令尚未读到的提示符数，下次使用会话前先重新同步
+
+    async def connect(self):
+        """
+        建立 Telnet 连接。如果已连接过，会先关闭再重连。
+        """
+        await self.close()
+        try:
+            self.stream = await TelnetStream.open(self.host, self.port, self.timeout, self.transport, self.recorder)
+            self.is_connected = True
+            # 读取初始提示符，确保连接正常
+            await self.stream.read_until_prompt(self.matcher, timeout=self.timeout)
+            self.last_active = time.monotonic()
+        except asyncio.CancelledError:
+            await self.close()
+            raise
+        except Exception as e:
+            self.is_connected = False
+            raise ConnectionError(f"Telnet 连接失败: {e}")
+
+    async def close(self):
+        """ 关闭 Telnet 连接 """
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.is_connected = False
+        self.pending_prompts = 0
+
+    async def set_recorder(self, recorder):
+        """更换录制文件，已建立的连接从此刻开始录制；recorder 为 None 时停止录制"""
+        self.recorder = recorder
+        if self.stream:
+            if self.stream.tap is not None:
+                self.stream.tap.close()
+            self.stream.tap = recorder.open_session(self.host, self.port) if recorder else None
+
+    async def resync(self):
+        """
+        命令被中断或超时后，设备仍会陆续返回它的输出和提示符
+        发送一个空行，读完欠下的提示符和空行的提示符并丢弃期间的数据，使会话回到空闲状态；
+        等待超时或连接出错时重新连接
+        """
+        owed = self.pending_prompts + 1
+        self.pending_prompts = 0
+        try:
+            self.stream.write(b'\n')
+            await self.stream.drain()
+            for _ in range(owed):
+                _, prompt, _ = await self.stream.read_until_prompt(
+                    self.matcher, timeout=self.timeout, error_grace=None
+                )
+                if prompt is None:
+                    break
+            else:
+                self.last_active = time.monotonic()
+                return
+        except asyncio.CancelledError:
+            await self.close()
+            raise
+        except (EOFError, OSError):
+            pass
+        await self.connect()
+
+    async def execute_command(self, command, stop_event=None, delay_ms=0):
+        """
+        执行一条命令，并读取返回结果，返回 (output, elapsed)
+        - stop_event：设置后跳过命令后的延时
+        - delay_ms：执行完当前命令后，额外等待的时间
+        输出中出现错误标记时不再等满超时，匹配到的标记保存在 last_error；等待提示符超时时 last_error 为 PROMPT_TIMEOUT
+        被取消或等待提示符超时后，下一条命令执行前会先重新同步会话（见 resync）
+        """
+        if not self.is_connected or not self.stream:
+            raise RuntimeError("尚未建立 Telnet 连接，无法执行命令。")
+        if self.pending_prompts:
+            await self.resync()
+
+        start_time = time.perf_counter()
+        timing = instrumentation.enabled
+
+        self.in_flight = 1
+        try:
+            # 发送命令
+            self.stream.write(command.encode('ascii') + b'\n')
+            await self.stream.drain()
+            if timing:
+                sent_at = time.perf_counter()
+                instrumentation.record("send", sent_at - start_time)
+
+            # 读取直到提示符
+            offset = self.stream.position
+            raw, prompt, error = await self.stream.read_until_prompt(self.matcher, timeout=self.timeout)
+            if timing:
+                instrumentation.record("wait", time.perf_counter() - sent_at)
+            if prompt is None:
+                self.pending_prompts = 1
+        except asyncio.CancelledError:
+            self.pending_prompts = self.in_flight
+            raise
+        except (EOFError, OSError) as e:
+            self.is_connected = False
+            raise ConnectionError(f"读取 Telnet 输出时出错: {e}")
+        finally:
+            self.in_flight = 0
+        self.last_error = PROMPT_TIMEOUT if prompt is None else _pattern_text(error)
+        self.last_offset = offset
+        output = raw.decode('ascii', errors='ignore')
+        self.last_active = time.monotonic()
+
+        elapsed = time.perf_counter() - start_time
+
+        # 可选的延时
+        if delay_ms > 0 and not (stop_event and stop_event.is_set()):
+            await asyncio.sleep(delay_ms / 1000.0)
+
+        return output, elapsed
+
+    async def execute_pipelined(self, commands, window=4, stop_event=None):
+        """
+        流水线执行：最多保持 window 条命令在途，不等待上一条的提示符就发送下一条
+        按提示符把返回数据切分给各条命令，依次产出 (command, output, elapsed)
+        - elapsed 从“命令发出”与“上一条命令的提示符到达”两者中较晚的时刻算起，
+          即该命令实际占用设备的时间，与逐条执行时的含义一致
+        - 等待提示符超时后数据无法再与命令对应：关闭连接，以已收到的部分输出产出该命令
+          （last_error 为 PROMPT_TIMEOUT），再抛出 TimeoutError
+        - 出现错误标记时仍等待该命令的提示符，last_error / last_offset 在产出每条命令前更新
+        - 调用方提前结束迭代时，会读完在途命令的返回数据，保证会话处于空闲状态；
+          被取消时不再等待，留到下次使用会话前重新同步
+        """
+        if not self.is_connected or not self.stream:
+            raise RuntimeError("尚未建立 Telnet 连接，无法执行命令。")
+        if self.pending_prompts:
+            await self.resync()
+
+        pending = deque()  # [(command, 发送时间), ...]
+        commands = iter(commands)
+        exhausted = False
+        last_prompt = None
+        cancelled = False
+        try:
+            while True:
+                # 补满发送窗口
+                while not exhausted and len(pending) < window:
+                    if stop_event and stop_event.is_set():
+                        exhausted = True
+                        break
+                    try:
+                        command = next(commands)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    self.stream.write(command.encode('ascii') + b'\n')
+                    pending.append((command, time.perf_counter()))
+                self.in_flight = len(pending)
+                if not pending:
+                    break
+
+                timing = instrumentation.enabled
+                if timing:
+                    drain_start = time.perf_counter()
+                await self.stream.drain()
+                offset = self.stream.position
+                if timing:
+                    sent_at = time.perf_counter()
+                    instrumentation.record("send", sent_at - drain_start)
+                raw, prompt, error = await self.stream.read_until_prompt(
+                    self.matcher, timeout=self.timeout, error_grace=None
+                )
+                now = time.perf_counter()
+                if timing:
+                    instrumentation.record("wait", now - sent_at)
+                command, sent_at = pending.popleft()
+                self.in_flight = len(pending)
+                start = sent_at if last_prompt is None else max(sent_at, last_prompt)
+                if prompt is None:
+                    await self.close()
+                    self.last_error = PROMPT_TIMEOUT
+                    self.last_offset = offset
+                    yield command, raw.decode('ascii', errors='ignore'), now - start
+                    raise TimeoutError(f"等待命令 '{command}' 的提示符超时，已断开会话")
+                self.last_error = _pattern_text(error)
+                self.last_offset = offset
+
+                last_prompt = now
+                self.last_active = time.monotonic()
+                yield command, raw.decode('ascii', errors='ignore'), now - start
+        except asyncio.CancelledError:
+            cancelled = True
+            self.pending_prompts = len(pending)
+            raise
+        except TimeoutError:
+            # TimeoutError 是 OSError 的子类，不能当作连接错误处理，否则超时的命令会在重连后被重发
+            raise
+        except (EOFError, OSError) as e:
+            self.is_connected = False
+            raise ConnectionError(f"读取 Telnet 输出时出错: {e}")
+        finally:
+            # 提前结束时丢弃在途命令的输出
+            while pending and self.is_connected and not cancelled:
+                pending.popleft()
+                try:
+                    await self.stream.read_until_prompt(self.matcher, timeout=self.timeout, error_grace=None)
+                except (EOFError, OSError):
+                    self.is_connected = False
+            self.in_flight = 0
+
+    async def probe(self, timeout=2):
+        """
+        发送一个空行并等待提示符，用于检查空闲连接是否仍然可用
+        """
+        if not self.is_connected or not self.stream:
+            return False
+        try:
+            if self.pending_prompts:
+                await self.resync()
+                return self.is_connected
+            self.stream.write(b'\n')
+            await self.stream.drain()
+            _, prompt, _ = await self.stream.read_until_prompt(self.matcher, timeout=timeout)
+        except (EOFError, OSError):
+            self.is_connected = False
+            return False
+        if prompt is None:
+            return False
+        self.last_active = time.monotonic()
+        return True
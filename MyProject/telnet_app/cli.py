@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+# cli.py
+
+"""
+命令行入口，不依赖 Tk，可在没有图形界面的 CI 环境中运行
+
+    python -m telnet_app run --config cfg.json
+    python -m telnet_app run --config cfg.json --replay telnet_logs/*.tsr
+    python -m telnet_app run --config cfg.json --processes 8
+    python -m telnet_app stats --db telnet_logs/results.db --command "AT+X" --days 30
+
+退出码：0 全部通过；1 有命令 Result 失败、执行出错或等待提示符超时；2 配置错误或设备连接失败
+"""
+
+import argparse
+import sys
+import time
+from threading import Lock
+
+from . import instrumentation
+from .config_manager import DEFAULT_CONFIG, import_config
+from .command_plan import load_plan
+from .excel_exporter import StreamingExcelExporter, EXCEL_HEADER, DEVICE_HEADER
+from .latency import LatencyStats, LATENCY_HEADER
+from .log_writer import format_log_line, new_log_file_path, LogFileWriter
+from .metrics import RunMetrics, MetricsHTTPServer, MetricsTextfileWriter
+from .prompt_matcher import PromptMatcher
+from .result_store import ResultStore, failure_rates
+from .runner import CommandRunner, MultiDeviceRunner, parse_targets
+from .session_record import SessionRecorder, ReplayTransport, iter_sessions
+from .sharded_runner import ShardedRunner
+from .telnet_manager import TelnetManager
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+# 可以由命令行参数覆盖的配置项
+_OVERRIDES = (
+    "host", "port", "targets", "max_workers", "processes", "commands_file", "loop_count",
+    "delay_ms", "rate", "timeout", "pipeline_window", "output_mode", "log_dir", "result_db",
+    "metrics_port", "metrics_host", "metrics_textfile", "record_session",
+)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m telnet_app", description="Telnet命令测试工具")
+    subparsers = parser.add_subparsers(dest="action")
+
+    run_parser = subparsers.add_parser("run", help="不启动界面，直接执行命令文件")
+    run_parser.add_argument("--config", help="配置文件（与界面导出的JSON格式相同）")
+    run_parser.add_argument("--host")
+    run_parser.add_argument("--port", type=int)
+    run_parser.add_argument("--targets", help="多设备目标，host:port 列表，逗号分隔")
+    run_parser.add_argument("--max-workers", dest="max_workers", type=int)
+    run_parser.add_argument("--processes", type=int,
+                            help="多设备执行时的工作进程数，大于1时设备分片到多个进程执行，--max-workers 为每个进程的并发数")
+    run_parser.add_argument("--commands-file", dest="commands_file")
+    run_parser.add_argument("--loop-count", dest="loop_count", type=int)
+    run_parser.add_argument("--delay-ms", dest="delay_ms", type=int, help="相邻两条命令发送时刻的间隔（毫秒）")
+    run_parser.add_argument("--rate", type=float, help="目标速率（条/秒），每台设备分别计算，代替 --delay-ms")
+    run_parser.add_argument("--timeout", type=int)
+    run_parser.add_argument("--pipeline-window", dest="pipeline_window", type=int)
+    run_parser.add_argument("--output-mode", dest="output_mode",
+                            choices=["do_not_generate", "log", "excel", "both"])
+    run_parser.add_argument("--log-dir", dest="log_dir")
+    run_parser.add_argument("--result-db", dest="result_db",
+                            help="结果数据库路径（例如 telnet_logs/results.db），默认不保存")
+    run_parser.add_argument("--metrics-port", dest="metrics_port", type=int, help="在该端口提供 /metrics，0 表示不启动")
+    run_parser.add_argument("--metrics-host", dest="metrics_host", help="指标HTTP服务的监听地址，默认 127.0.0.1")
+    run_parser.add_argument("--metrics-textfile", dest="metrics_textfile", help="定期写入指标的文本文件（node_exporter）")
+    run_parser.add_argument("--record", dest="record_session", action="store_true", default=None,
+                            help="把收发的原始数据录制到与日志同名的 .tsr 文件")
+    run_parser.add_argument("--replay", nargs="+", metavar="FILE",
+                            help="不连接设备，回放录制文件中的会话，按会话中发送过的命令重新解析和记录")
+    run_parser.add_argument("--replay-speed", dest="replay_speed", type=float, default=0.0,
+                            help="回放速度，0 表示尽快回放（默认），1 表示按录制时的速度")
+    run_parser.add_argument("--stop-on-error", dest="stop_on_error", action="store_true", default=None)
+    run_parser.add_argument("-v", "--verbose", action="store_true", help="同时在终端输出完整日志")
+    run_parser.add_argument("--profile", metavar="FILE",
+                            help="记录各阶段耗时，执行结束后打印并保存到文件（.json 或文本）")
+
+    stats_parser = subparsers.add_parser("stats", help="查询结果数据库中各命令的失败率")
+    stats_parser.add_argument("--db", required=True, help="结果数据库路径")
+    stats_parser.add_argument("--command", help="只统计该命令")
+    stats_parser.add_argument("--host", help="只统计该设备（host:port）")
+    stats_parser.add_argument("--days", type=float, default=30, help="统计最近多少天，默认30")
+    return parser
+
+
+def load_run_config(args):
+    """合并默认配置、配置文件和命令行参数"""
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        config.update(import_config(args.config))
+    for key in _OVERRIDES:
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+    if args.stop_on_error is not None:
+        config["stop_on_error"] = args.stop_on_error
+    return config
+
+
+class ConsoleReporter:
+    """
+    命令行输出：日志写入日志文件（可选同时打印），进度和汇总打印到 stdout
+    多设备执行时各回调来自不同的工作线程，统一加锁
+    """
+    def __init__(self, log_writer=None, verbose=False, stream=None, exporter=None, store=None, host=None,
+                 metrics=None):
+        self.stream = stream or sys.stdout
+        self.verbose = verbose
+        self.log_writer = log_writer
+        self.exporter = exporter
+        self.store = store
+        self.latency = LatencyStats(host)
+        self.metrics = metrics
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self._last_percent = -1
+        self._last_current = 0
+        self._last_report = 0.0
+        self._lock = Lock()
+
+    def log(self, message, tag="NORMAL"):
+        timing = instrumentation.enabled
+        if timing:
+            start = time.perf_counter()
+        line = format_log_line(message)
+        if self.log_writer:
+            self.log_writer.write(line)
+        if self.verbose:
+            with self._lock:
+                print(line, file=self.stream)
+        if timing:
+            instrumentation.record("log_enqueue", time.perf_counter() - start)
+
+    def on_result(self, result):
+        if self.exporter:
+            self.exporter.append(result.to_row())
+        if self.store:
+            self.store.add(result)
+        self.latency.record(result)
+        if self.metrics:
+            self.metrics.record(result)
+        with self._lock:
+            self.total += 1
+            if result.passed:
+                self.passed += 1
+            elif result.failed:
+                self.failed += 1
+
+    def on_progress(self, current, total):
+        """每前进1%或每秒最多打印一次进度"""
+        if self.metrics:
+            self.metrics.progress(current, total)
+        percent = int(current * 100 / total) if total else 100
+        now = time.monotonic()
+        with self._lock:
+            if current <= self._last_current:
+                return
+            self._last_current = current
+            if percent == self._last_percent and now - self._last_report < 1.0 and current != total:
+                return
+            self._last_percent = percent
+            self._last_report = now
+            print(f"进度: {current}/{total} ({percent}%)", file=self.stream, flush=True)
+
+    def close(self):
+        if self.store:
+            self.store.finish_run()
+            self.store.close()
+            self.store = None
+        if self.log_writer:
+            self.log_writer.close()
+            self.log_writer = None
+
+
+def _open_metrics(config, log_writer):
+    """按配置启动指标导出，返回 (RunMetrics, [导出器, ...])"""
+    metrics = RunMetrics()
+    if log_writer:
+        metrics.log_queue_depth = lambda: log_writer.pending
+    exporters = []
+    if config.get("metrics_port"):
+        try:
+            server = MetricsHTTPServer(metrics, config["metrics_port"], config.get("metrics_host") or "127.0.0.1")
+            exporters.append(server)
+            print(f"监控指标: http://{server.host}:{server.port}/metrics")
+        except OSError as e:
+            print(f"警告: 无法启动监控指标HTTP服务：{e}", file=sys.stderr)
+    if config.get("metrics_textfile"):
+        exporters.append(MetricsTextfileWriter(
+            metrics, config["metrics_textfile"], max(1, config.get("metrics_interval", 15)),
+            on_error=lambda e: print(f"写入监控指标文件失败：{e}", file=sys.stderr)
+        ))
+    return metrics, exporters
+
+
+def _run_replay(paths, speed, config, matcher, options, metrics):
+    """
+    依次回放录制文件中的会话，每个会话执行录制时发送过的命令
+    返回 (已执行的命令数, 无法回放的会话和录制文件数)
+    """
+    executed = failed = 0
+    for path in paths:
+        try:
+            for session in iter_sessions(path):
+                commands = session.commands()
+                if not commands:
+                    continue
+                label = f"{session.host}:{session.port}"
+                telnet_manager = TelnetManager(session.host, session.port, timeout=config["timeout"],
+                                               matcher=matcher, transport=ReplayTransport([session], speed))
+                try:
+                    telnet_manager.connect()
+                except ConnectionError as e:
+                    options["log"](f"[{label}] 回放失败: {e}")
+                    failed += 1
+                    continue
+                try:
+                    runner = CommandRunner(telnet_manager, host=label, **options)
+                    metrics.start(runner, len(commands))
+                    runner.run(commands)
+                finally:
+                    telnet_manager.close()
+                executed += runner.executed
+        except (OSError, ValueError) as e:
+            print(f"错误: 读取录制文件 {path} 失败: {e}", file=sys.stderr)
+            failed += 1
+    return executed, failed
+
+
+def run(config, verbose=False, replay=None, replay_speed=0.0):
+    """
+    按配置执行一次命令文件，返回退出码
+    - replay：录制文件列表，设置后不连接设备，回放其中的会话（忽略命令文件和设备设置）
+    """
+    try:
+        plan = None if replay else load_plan(config["commands_file"])
+        targets = [] if replay else parse_targets(config.get("targets", ""), default_port=config["port"])
+        matcher = PromptMatcher.from_config(config)
+    except (OSError, ValueError) as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    mode = config["output_mode"]
+    log_file_path = excel_file_path = None
+    if mode != "do_not_generate":
+        log_file_path = new_log_file_path(config["log_dir"])
+        excel_file_path = log_file_path.replace(".txt", ".xlsx")
+
+    exporter = None
+    if mode in ("excel", "both"):
+        try:
+            exporter = StreamingExcelExporter(excel_file_path,
+                                              header=DEVICE_HEADER if targets or replay else EXCEL_HEADER)
+        except Exception as e:
+            print(f"错误: 无法创建Excel文件：{e}", file=sys.stderr)
+            return EXIT_ERROR
+
+    log_writer = None
+    if mode in ("log", "both"):
+        log_writer = LogFileWriter(
+            log_file_path,
+            max_bytes=config.get("log_max_mb", 0) * 1024 * 1024,
+            rotate_interval=config.get("log_rotate_minutes", 0) * 60,
+            on_error=lambda e: print(f"写入日志文件失败：{e}", file=sys.stderr)
+        )
+
+    # 单设备执行时结果记录中没有 host，数据库和耗时统计使用该标识
+    host = None if targets or replay else f"{config['host']}:{config['port']}"
+    store = None
+    if config.get("result_db"):
+        try:
+            store = ResultStore(config["result_db"],
+                                on_error=lambda e: print(f"写入结果数据库失败：{e}", file=sys.stderr))
+        except Exception as e:
+            print(f"警告: 无法打开结果数据库：{e}", file=sys.stderr)
+        else:
+            store.start_run(", ".join(replay) if replay else config["commands_file"],
+                            config.get("targets", ""), host)
+
+    # 多进程执行时各工作进程分别录制，主进程不打开录制文件
+    sharded = bool(targets) and config.get("processes", 0) > 1
+    recorder = record_path = None
+    if config.get("record_session") and not replay:
+        record_path = (log_file_path or new_log_file_path(config["log_dir"])).replace(".txt", ".tsr")
+        if not sharded:
+            try:
+                recorder = SessionRecorder(record_path)
+            except (OSError, ValueError) as e:
+                print(f"警告: 无法创建会话录制文件：{e}", file=sys.stderr)
+
+    metrics, metrics_exporters = _open_metrics(config, log_writer)
+    reporter = ConsoleReporter(log_writer, verbose, exporter=exporter, store=store, host=host, metrics=metrics)
+    exit_code = EXIT_OK
+    try:
+        options = dict(
+            log=reporter.log,
+            on_result=reporter.on_result,
+            delay_ms=config["delay_ms"],
+            rate=config.get("rate", 0),
+            stop_on_error=config["stop_on_error"],
+            pipeline_window=config.get("pipeline_window", 1),
+        )
+        failed = 0
+        if replay:
+            executed, failed = _run_replay(replay, replay_speed, config, matcher, options, metrics)
+        elif targets:
+            if sharded:
+                runner = ShardedRunner(targets, timeout=config["timeout"], max_workers=config.get("max_workers", 8),
+                                       processes=config["processes"], matcher=matcher, record_path=record_path,
+                                       **options)
+            else:
+                runner = MultiDeviceRunner(targets, timeout=config["timeout"],
+                                           max_workers=config.get("max_workers", 8),
+                                           matcher=matcher, recorder=recorder, **options)
+            metrics.start(runner, plan.command_count * config["loop_count"] * len(targets))
+            summary = runner.run(plan, config["loop_count"], on_progress=reporter.on_progress)
+            if any(item["error"] for item in summary.values()):
+                exit_code = EXIT_ERROR
+            executed = sum(item["executed"] for item in summary.values())
+        else:
+            telnet_manager = TelnetManager(config["host"], config["port"], timeout=config["timeout"], matcher=matcher,
+                                           recorder=recorder)
+            try:
+                telnet_manager.connect()
+            except ConnectionError as e:
+                reporter.log(f"连接失败: {e}")
+                print(f"错误: {e}", file=sys.stderr)
+                return EXIT_ERROR
+            try:
+                runner = CommandRunner(telnet_manager, **options)
+                metrics.start(runner, plan.command_count * config["loop_count"])
+                runner.run(plan, config["loop_count"], on_progress=reporter.on_progress)
+            finally:
+                telnet_manager.close()
+            executed = runner.executed
+        # 有结果的命令（包括超时）已计入通过/失败，出错只统计没有产生结果的命令，如连接中断时的命令
+        failed += executed - reporter.total
+
+    finally:
+        if recorder:
+            recorder.close()
+        metrics.finish()
+        for metrics_exporter in metrics_exporters:
+            metrics_exporter.close()
+        latency_lines = reporter.latency.summary_lines()
+        if latency_lines:
+            reporter.log("命令耗时统计（按 p99 排序）:")
+            for line in latency_lines:
+                reporter.log(line)
+        if exporter:
+            try:
+                exporter.add_sheet("命令耗时", LATENCY_HEADER, reporter.latency.rows())
+                for path in exporter.close():
+                    reporter.log(f"Excel文件已保存到 {path}")
+                    print(f"Excel文件: {path}")
+            except Exception as e:
+                print(f"保存Excel文件失败：{e}，已执行的结果保存在 {exporter.journal_path}", file=sys.stderr)
+                exit_code = EXIT_ERROR
+        reporter.close()
+
+    print(f"执行完成: 共 {reporter.total} 条，通过 {reporter.passed}，失败 {reporter.failed}，出错 {failed}")
+    if latency_lines:
+        print("命令耗时（按 p99 排序）:")
+        for line in latency_lines:
+            print(f"  {line}")
+    if log_file_path and reporter.latency.by_command:
+        csv_path = log_file_path.replace(".txt", "_latency.csv")
+        try:
+            reporter.latency.write_csv(csv_path)
+            print(f"耗时统计: {csv_path}")
+        except OSError as e:
+            print(f"保存耗时统计失败：{e}", file=sys.stderr)
+    if log_writer:
+        for path in log_writer.files:
+            print(f"日志文件: {path}")
+    if recorder:
+        print(f"会话录制: {recorder.file_path}")
+    elif record_path and sharded:
+        print(f"会话录制: {record_path.replace('.tsr', '_*.tsr')}")
+    if exit_code == EXIT_OK and (reporter.failed or failed):
+        exit_code = EXIT_FAILED
+    return exit_code
+
+
+def stats(args):
+    """打印结果数据库中各命令的执行次数和失败率"""
+    try:
+        items = failure_rates(args.db, args.days, args.command, args.host)
+    except Exception as e:
+        print(f"错误: 查询结果数据库失败: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    if not items:
+        print(f"最近 {args.days:g} 天没有执行记录")
+        return EXIT_OK
+    print(f"{'命令':<30} {'次数':>8} {'通过':>8} {'失败':>8} {'失败率':>8}")
+    for item in items:
+        print(f"{item['command']:<30} {item['total']:>8} {item['passed']:>8} {item['failed']:>8} {item['rate']:>8.2%}")
+    return EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.action is None:
+        # 不带子命令时启动图形界面
+        from .gui.main_window import MainWindow
+        app = MainWindow()
+        app.protocol("WM_DELETE_WINDOW", app.on_closing)
+        app.mainloop()
+        return EXIT_OK
+    if args.action == "stats":
+        return stats(args)
+
+    try:
+        config = load_run_config(args)
+    except (OSError, ValueError) as e:
+        print(f"错误: 读取配置失败: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    if args.profile:
+        instrumentation.enable()
+    exit_code = run(config, verbose=args.verbose, replay=args.replay, replay_speed=args.replay_speed)
+    if args.profile:
+        instrumentation.enable(False)
+        print("\n".join(instrumentation.format_lines()))
+        try:
+            instrumentation.dump(args.profile)
+        except OSError as e:
+            print(f"保存分阶段耗时失败：{e}", file=sys.stderr)
+    return exit_code
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+# command_plan.py
+
+"""
+命令文件编译：把命令文件解析为不可变的执行计划，并按 路径+修改时间+大小 缓存
+
+除普通命令、# 注释和 DELAY 外，命令文件还支持：
+- 模板命令：命令中的 ${0..100 step 5}（范围，含两端）、${a,b,c}（列表）在执行时展开，
+  一行中有多组时按笛卡尔积展开，左边的一组变化最慢；普通的 {...} 原样发送，$${ 表示字面的 ${
+- 循环块：LOOP n ... END 重复 n 次；LOOP 名称 IN ${范围或列表} ... END 依次取值，块内用 ${名称} 引用当前值；可以嵌套
+  只有符合这两种格式的 LOOP 行和循环块内的 END 行是指令，其他情况仍按普通命令发送
+模板和循环在编译时只保存结构和条数，执行时由 iter_steps() 逐条生成，展开后的命令不会全部放在内存中
+"""
+
+import os
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation, ROUND_FLOOR
+from threading import Lock
+
+# 一条命令，line_no 为命令文件中的行号（从1开始），用于错误提示
+# source 为模板展开的命令对应的模板（"模板 (第 n 行)"），耗时统计按它汇总；普通命令为 None
+Command = namedtuple('Command', ['line_no', 'text', 'source'], defaults=(None,))
+# DELAY 指令，ms 为等待的毫秒数
+Delay = namedtuple('Delay', ['line_no', 'ms'])
+
+_cache = {}
+_cache_lock = Lock()
+
+# ${...} 为模板，$${...} 转义为字面的 ${...}
+_GROUP = re.compile(r'\$(\$?)\{([^{}]*)\}')
+_RANGE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*\.\.\s*(-?\d+(?:\.\d+)?)(?:\s+step\s+(-?\d+(?:\.\d+)?))?\s*$',
+                    re.IGNORECASE)
+_NAME = re.compile(r'^[A-Za-z_]\w*$')
+_LOOP = re.compile(r'^(\S+)\s+IN\s+\$\{(.*)\}$', re.IGNORECASE)
+
+
+class Sweep(namedtuple('Sweep', ['start', 'step', 'count', 'width', 'places'])):
+    """范围 {a..b step s}，第 i 个值为 start + i * step；width 大于 0 时整数补零到该宽度"""
+    __slots__ = ()
+
+    def value(self, index):
+        value = self.start + self.step * index
+        if self.places:
+            return f"{value:.{self.places}f}"
+        text = str(int(value))
+        if self.width:
+            sign = '-' if text.startswith('-') else ''
+            text = sign + text.lstrip('-').zfill(self.width)
+        return text
+
+
+class Choice(namedtuple('Choice', ['values'])):
+    """列表 {a,b,c}"""
+    __slots__ = ()
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    def value(self, index):
+        return self.values[index]
+
+
+# 模板中对循环变量的引用
+Var = namedtuple('Var', ['name'])
+
+
+class Template(namedtuple('Template', ['line_no', 'source', 'parts', 'count'])):
+    """
+    模板命令
+    - source："模板原文 (第 n 行)"，作为展开后各条命令的 source
+    - parts：文本、Sweep / Choice（参与笛卡尔积）和 Var（取循环变量的当前值）组成的元组
+    - count：展开后的命令条数
+    """
+    __slots__ = ()
+
+    def expand(self, variables):
+        """按笛卡尔积逐条生成命令文本，左边的一组变化最慢"""
+        groups = [index for index, part in enumerate(self.parts) if isinstance(part, (Sweep, Choice))]
+        texts = [variables[part.name] if isinstance(part, Var) else part for part in self.parts]
+        if any(self.parts[index].count == 0 for index in groups):
+            return
+        indexes = [0] * len(groups)
+        for index in groups:
+            texts[index] = self.parts[index].value(0)
+        while True:
+            yield ''.join(texts)
+            # 从右往左进位
+            position = len(groups) - 1
+            while position >= 0:
+                part_index = groups[position]
+                indexes[position] += 1
+                if indexes[position] < self.parts[part_index].count:
+                    texts[part_index] = self.parts[part_index].value(indexes[position])
+                    break
+                indexes[position] = 0
+                texts[part_index] = self.parts[part_index].value(0)
+                position -= 1
+            if position < 0:
+                return
+
+
+class Loop(namedtuple('Loop', ['line_no', 'count', 'name', 'values', 'steps', 'command_count'])):
+    """
+    循环块
+    - count：循环次数
+    - name / values：LOOP 名称 IN {...} 时的变量名和取值（Sweep / Choice），LOOP n 时为 None
+    - command_count：每次循环的命令条数
+    """
+    __slots__ = ()
+
+
+class CommandPlan(namedtuple('CommandPlan', ['path', 'steps', 'command_count'])):
+    """
+    编译后的命令文件
+    - steps：Command / Delay / Template / Loop 组成的元组，按文件顺序排列
+    - command_count：每轮执行的命令条数（不含 DELAY，模板和循环按展开后计算）
+    """
+    __slots__ = ()
+
+    def iter_steps(self):
+        """逐条生成一轮执行的 Command 和 Delay，模板和循环在这里展开"""
+        return _iter_steps(self.steps, {})
+
+    @property
+    def commands(self):
+        """只包含命令文本的元组（模板和循环展开后的全部命令）"""
+        return tuple(step.text for step in self.iter_steps() if isinstance(step, Command))
+
+
+def _iter_steps(steps, variables):
+    for step in steps:
+        if isinstance(step, Template):
+            for text in step.expand(variables):
+                yield Command(step.line_no, text, step.source)
+        elif isinstance(step, Loop):
+            if step.values is None:
+                for _ in range(step.count):
+                    yield from _iter_steps(step.steps, variables)
+            else:
+                scope = dict(variables)
+                for index in range(step.count):
+                    scope[step.name] = step.values.value(index)
+                    yield from _iter_steps(step.steps, scope)
+        else:
+            yield step
+
+
+def _parse_group(content, where):
+    """解析 {...} 的内容，返回 Sweep / Choice；不是范围或列表时返回 None"""
+    match = _RANGE.match(content)
+    if match:
+        start_text, stop_text, step_text = match.groups()
+        try:
+            start, stop = Decimal(start_text), Decimal(stop_text)
+            step = Decimal(step_text) if step_text else Decimal(1 if stop >= start else -1)
+        except InvalidOperation:
+            return None
+        if step == 0:
+            raise ValueError(f"{where}: 范围的步长不能为 0")
+        count = int(((stop - start) / step).to_integral_value(ROUND_FLOOR)) + 1
+        places = max(-value.as_tuple().exponent for value in (start, stop, step))
+        width = 0
+        if not places:
+            for text in (start_text, stop_text):
+                digits = text.lstrip('-')
+                if len(digits) > 1 and digits.startswith('0'):
+                    width = max(width, len(digits))
+        return Sweep(start, step, max(0, count), width, places)
+    if ',' in content:
+        return Choice(tuple(value.strip() for value in content.split(',')))
+    return None
+
+
+def _compile_template(text, line_no, variables, where):
+    """
+    把命令编译为 Template；没有 ${...} 时返回 None，只有 $${...} 转义时返回去掉转义的 Command
+    ${...} 既不是范围、列表，也不是当前可见的循环变量时抛出 ValueError
+    """
+    parts = []
+    count = 1
+    position = 0
+    templated = False
+    for match in _GROUP.finditer(text):
+        escaped, content = match.groups()
+        if escaped:
+            part = match.group(0)[1:]
+        else:
+            content = content.strip()
+            if _NAME.match(content):
+                if content not in variables:
+                    raise ValueError(f"{where}: 未定义的循环变量 '{content}'")
+                part = Var(content)
+            else:
+                part = _parse_group(content, where)
+                if part is None:
+                    raise ValueError(f"{where}: 无效的模板 '{match.group(0)}'，应为 ${{a..b}}、${{a..b step s}} 或 ${{a,b,...}}")
+                count *= part.count
+            templated = True
+        if match.start() > position:
+            parts.append(text[position:match.start()])
+        parts.append(part)
+        position = match.end()
+    if position == 0:
+        return None
+    if position < len(text):
+        parts.append(text[position:])
+    if not templated:
+        return Command(line_no, ''.join(parts))
+    return Template(line_no, f"{text} (第 {line_no} 行)", tuple(_merge_text(parts)), count)
+
+
+def _merge_text(parts):
+    """合并相邻的文本片段，减少展开时拼接的片段数"""
+    merged = []
+    for part in parts:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return merged
+
+
+def _command_count(steps):
+    count = 0
+    for step in steps:
+        if isinstance(step, Command):
+            count += 1
+        elif isinstance(step, Template):
+            count += step.count
+        elif isinstance(step, Loop):
+            count += step.count * step.command_count
+    return count
+
+
+def compile_lines(lines, path=None):
+    """
+    把命令文件的各行编译为 CommandPlan
+    - 空行和以 # 开头的注释行被忽略
+    - DELAY n 表示等待 n 毫秒
+    - LOOP n / LOOP 名称 IN ${...} 开始一个循环块，END 结束
+    - 含 ${a..b step s} / ${a,b} / ${循环变量} 的命令编译为模板
+    """
+    # 每层：(LOOP 所在行号, LOOP 参数, 本层的 steps)
+    stack = [(None, None, [])]
+    variables = set()
+    for line_no, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+
+        where = f"{path or '命令文件'} 第 {line_no} 行"
+        keyword, _, argument = text.partition(' ')
+        keyword = keyword.upper()
+        argument = argument.strip()
+        steps = stack[-1][2]
+        if keyword == 'DELAY':
+            try:
+                ms = int(argument)
+            except ValueError:
+                ms = -1
+            if ms < 0:
+                raise ValueError(f"{where}: 无效的 DELAY 指令 '{text}'")
+            steps.append(Delay(line_no, ms))
+        elif keyword == 'LOOP' and (argument.isdecimal() or _LOOP.match(argument)):
+            name = values = None
+            match = _LOOP.match(argument)
+            if match:
+                name = match.group(1)
+                values = _parse_group(match.group(2), where)
+                if not _NAME.match(name) or values is None:
+                    raise ValueError(f"{where}: 无效的 LOOP 指令 '{text}'")
+                count = values.count
+                variables.add(name)
+            else:
+                count = int(argument)
+            stack.append((line_no, (count, name, values), []))
+        elif keyword == 'END' and not argument and len(stack) > 1:
+            loop_line, (count, name, values), body = stack.pop()
+            if name:
+                variables = {level[1][1] for level in stack[1:] if level[1][1]}
+            body = tuple(body)
+            stack[-1][2].append(Loop(loop_line, count, name, values, body, _command_count(body)))
+        else:
+            steps.append(_compile_template(text, line_no, variables, where) or Command(line_no, text))
+
+    if len(stack) > 1:
+        raise ValueError(f"{path or '命令文件'} 第 {stack[-1][0]} 行: LOOP 没有对应的 END")
+    steps = tuple(stack[0][2])
+    return CommandPlan(path, steps, _command_count(steps))
+
+
+def load_plan(path):
+    """
+    读取并编译命令文件
+    文件的修改时间和大小都没有变化时直接返回缓存的执行计划
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with open(key, 'r', encoding='utf-8') as f:
+        plan = compile_lines(f, path)
+
+    with _cache_lock:
+        _cache[key] = (signature, plan)
+    return plan
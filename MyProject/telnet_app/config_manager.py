@@ -3,6 +3,36 @@
 import json
 import os
 
+# 配置项及默认值，与GUI界面的默认设置一致
+DEFAULT_CONFIG = {
+    "host": "192.168.0.21",
+    "port": 81,
+    "targets": "",
+    "max_workers": 8,
+    "processes": 0,
+    "loop_count": 1,
+    "commands_file": "commands.txt",
+    "log_dir": "telnet_logs",
+    "log_max_mb": 0,
+    "log_rotate_minutes": 0,
+    "log_view_lines": 10000,
+    "result_db": "",
+    "record_session": False,
+    "delay_ms": 0,
+    "rate": 0,
+    "timeout": 10,
+    "pipeline_window": 1,
+    "prompts": ["CIG-EVK-G2:>"],
+    "error_markers": [],
+    "pager_markers": ["--More--"],
+    "metrics_port": 0,
+    "metrics_host": "127.0.0.1",
+    "metrics_textfile": "",
+    "metrics_interval": 15,
+    "output_mode": "do_not_generate",
+    "stop_on_error": False,
+}
+
 def import_config(file_path):
     """ 从指定 JSON 文件导入配置 """
     if not os.path.isfile(file_path):
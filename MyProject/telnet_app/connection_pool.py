@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# connection_pool.py
+
+"""
+按 (host, port) 复用 Telnet 会话的连接池
+"""
+
+import time
+from threading import Event, Lock, Thread
+
+from .telnet_manager import TelnetManager
+
+
+class ConnectionPool:
+    """
+    持久连接池
+    - acquire：取出 (host, port) 对应的会话，空闲超过 probe_idle 秒的会话先探测，失效则重连
+    - reconnect：按指数退避重连，最多 max_retries 次，等待过程可被 stop_event 中断
+    - keepalive_interval：设置后启动后台线程，定期探测空闲会话，保持连接活跃
+    - set_recorder：所有会话改为录制到同一个 SessionRecorder
+    """
+    def __init__(self, probe_idle=30.0, max_retries=5, backoff_base=0.5, backoff_max=10.0,
+                 keepalive_interval=None):
+        self.probe_idle = probe_idle
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sessions = {}
+        self._lock = Lock()
+        self.recorder = None
+        self._closed = Event()
+        self._keepalive_thread = None
+        if keepalive_interval:
+            self._keepalive_thread = Thread(
+                target=self._keepalive_loop,
+                args=(keepalive_interval,),
+                name="telnet-keepalive",
+                daemon=True
+            )
+            self._keepalive_thread.start()
+
+    def acquire(self, host, port, timeout=10, stop_event: Event = None, matcher=None):
+        """返回一个已连接的会话，必要时新建或重连；matcher 不为 None 时替换会话的提示符匹配器"""
+        key = (host, port)
+        with self._lock:
+            manager = self._sessions.get(key)
+            if manager is None:
+                manager = TelnetManager(host, port, timeout=timeout)
+                self._sessions[key] = manager
+        manager.timeout = timeout
+        if matcher is not None:
+            manager.matcher = matcher
+        manager.recorder = self.recorder
+
+        if manager.is_connected:
+            idle = time.monotonic() - manager.last_active
+            if idle < self.probe_idle or manager.probe():
+                return manager
+
+        self.reconnect(manager, stop_event)
+        return manager
+
+    def reconnect(self, manager, stop_event: Event = None):
+        """
+        重连会话，失败时按指数退避重试
+        全部重试失败或在退避等待中被 stop_event 中断时抛出 ConnectionError，连接过程中被中断时抛出 InterruptedError
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                if stop_event is None:
+                    time.sleep(delay)
+                elif stop_event.wait(delay):
+                    raise ConnectionError("用户终止重连")
+            try:
+                manager.connect(stop_event)
+                return manager
+            except ConnectionError as e:
+                last_error = e
+        raise ConnectionError(f"重连 {manager.host}:{manager.port} 失败（已重试 {self.max_retries} 次）: {last_error}")
+
+    def set_recorder(self, recorder):
+        """设置录制文件，已有的会话立即生效；recorder 为 None 时停止录制"""
+        with self._lock:
+            self.recorder = recorder
+            sessions = list(self._sessions.values())
+        for manager in sessions:
+            manager.recorder = recorder
+
+    def release(self, host, port):
+        """关闭并移除指定会话"""
+        with self._lock:
+            manager = self._sessions.pop((host, port), None)
+        if manager:
+            manager.close()
+
+    def close_all(self):
+        """关闭所有会话并停止保活线程"""
+        self._closed.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for manager in sessions:
+            manager.close()
+
+    def _keepalive_loop(self, interval):
+        """后台保活：探测空闲会话，失效的会话在下次 acquire 时重连"""
+        while not self._closed.wait(interval):
+            with self._lock:
+                sessions = list(self._sessions.values())
+            for manager in sessions:
+                if not manager.is_connected:
+                    continue
+                if time.monotonic() - manager.last_active < interval:
+                    continue
+                try:
+                    manager.probe(blocking=False)
+                except Exception:
+                    pass
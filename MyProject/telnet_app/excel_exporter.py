@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# excel_exporter.py
+
+"""
+测试结果导出为 Excel
+"""
+
+import csv
+import os
+import time
+from threading import Lock
+
+from . import instrumentation
+
+EXCEL_MAX_ROWS = 1048576  # Excel 单个工作表的行数上限（含表头）
+EXCEL_HEADER = ["时间", "命令", "数据", "结果"]
+DEVICE_HEADER = EXCEL_HEADER + ["设备"]
+
+
+class StreamingExcelExporter:
+    """
+    边执行边写入的 Excel 导出器
+    - 使用 openpyxl 的 write_only 模式，行数据直接写入临时文件，内存占用不随行数增长
+    - 工作表写满 Excel 行数上限后新建工作表，工作表数达到 max_sheets 后换新文件（xxx_2.xlsx ...）
+    - 每行同时追加到 xxx.partial.csv，按 flush_rows / flush_interval 刷新到磁盘，
+      程序异常退出时已执行的结果仍保留在该文件中；正常 close() 后删除
+    - append 可以在多个线程中调用
+    openpyxl 未安装时构造函数抛出 ImportError
+    """
+    def __init__(self, file_path, header=None, max_rows=EXCEL_MAX_ROWS, max_sheets=10,
+                 flush_rows=500, flush_interval=1.0):
+        # openpyxl 较重，只在真正导出时才导入
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ImportError("openpyxl模块未安装，无法保存Excel文件。")
+        self._workbook_class = Workbook
+
+        self.file_path = file_path
+        self.header = list(header or EXCEL_HEADER)
+        self.max_rows = max_rows
+        self.max_sheets = max_sheets
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.row_count = 0
+        self.saved_files = []
+
+        self._lock = Lock()
+        self._file_index = 1
+        self._workbook = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._sheet_count = 0
+
+        self.journal_path = os.path.splitext(file_path)[0] + ".partial.csv"
+        self._journal = open(self.journal_path, "w", newline="", encoding="utf-8-sig")
+        self._journal_writer = csv.writer(self._journal)
+        self._journal_writer.writerow(self.header)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        self._new_workbook()
+
+    def _current_path(self):
+        if self._file_index == 1:
+            return self.file_path
+        base, ext = os.path.splitext(self.file_path)
+        return f"{base}_{self._file_index}{ext}"
+
+    def _new_workbook(self):
+        self._workbook = self._workbook_class(write_only=True)
+        self._sheet_count = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self._sheet_count += 1
+        title = "测试结果" if self._sheet_count == 1 else f"测试结果{self._sheet_count}"
+        self._sheet = self._workbook.create_sheet(title)
+        self._sheet.append(self.header)
+        self._sheet_rows = 1
+
+    def _save_workbook(self):
+        path = self._current_path()
+        self._workbook.save(path)
+        self._workbook = None
+        self._sheet = None
+        self.saved_files.append(path)
+
+    def append(self, row):
+        """追加一行结果"""
+        timing = instrumentation.enabled
+        if timing:
+            start = time.perf_counter()
+        with self._lock:
+            if self._workbook is None:
+                raise RuntimeError("Excel导出已结束，不能再追加数据。")
+            if self._sheet_rows >= self.max_rows:
+                if self._sheet_count >= self.max_sheets:
+                    self._save_workbook()
+                    self._file_index += 1
+                    self._new_workbook()
+                else:
+                    self._new_sheet()
+
+            self._sheet.append(row)
+            self._sheet_rows += 1
+            self.row_count += 1
+
+            self._journal_writer.writerow(row)
+            self._unflushed += 1
+            now = time.monotonic()
+            if self._unflushed >= self.flush_rows or now - self._last_flush >= self.flush_interval:
+                self._journal.flush()
+                self._unflushed = 0
+                self._last_flush = now
+        if timing:
+            instrumentation.record("excel_append", time.perf_counter() - start)
+
+    def add_sheet(self, title, header, rows):
+        """在当前文件中追加一个汇总工作表（如耗时统计），需在 close() 之前调用"""
+        with self._lock:
+            if self._workbook is None:
+                raise RuntimeError("Excel导出已结束，不能再追加数据。")
+            sheet = self._workbook.create_sheet(title)
+            sheet.append(list(header))
+            for row in rows:
+                sheet.append(row)
+
+    def close(self):
+        """保存 Excel 文件并删除 .partial.csv，返回已保存的文件列表"""
+        with self._lock:
+            if self._workbook is not None:
+                try:
+                    self._save_workbook()
+                finally:
+                    self._journal.close()
+                os.remove(self.journal_path)
+            return list(self.saved_files)
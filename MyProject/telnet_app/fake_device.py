@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# fake_device.py
+
+"""
+模拟 CIG-EVK-G2 的本地 Telnet 服务，用于没有开发板时的调试、压测和基准测试
+
+    python -m telnet_app.fake_device --port 8181 --latency-ms 20 --jitter-ms 5 --fail-rate 0.1
+
+每条命令返回与设备相同格式的输出：
+
+    Cmd: <命令>
+    Data: <数据>
+    Result: Pass / Fail
+    CIG-EVK-G2:>
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import threading
+
+from .prompt_matcher import DEFAULT_PROMPTS
+
+# 连接建立时发送的选项协商（DO ECHO、WILL SUPPRESS-GO-AHEAD），检验客户端的协商处理
+_NEGOTIATION = bytes([255, 253, 1, 255, 251, 3])
+_IAC_SEQUENCE = re.compile(rb"\xff[\xfb-\xfe].|\xff\xfa.*?\xff\xf0|\xff[\xf0-\xfa]", re.DOTALL)
+_FILLER_LINE = "Log: " + "x" * 73 + "\r\n"  # 每行 80 字节
+
+
+class DeviceBehavior:
+    """
+    一类命令的模拟行为
+    - latency / jitter：返回前等待 latency ± jitter 秒
+    - output_size：在 Cmd: 行之前附加的日志输出字节数，模拟大段输出
+    - fail_rate：Result 为 Fail 的概率
+    - drop_rate：收到命令后不返回、直接断开连接的概率
+    """
+    __slots__ = ("latency", "jitter", "output_size", "fail_rate", "drop_rate")
+
+    def __init__(self, latency=0.0, jitter=0.0, output_size=0, fail_rate=0.0, drop_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.output_size = output_size
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return DeviceBehavior(**values)
+
+
+class FakeDevice:
+    """
+    模拟设备
+    - behavior：默认行为；overrides：{命令: DeviceBehavior 或参数字典}，按命令单独设置
+    - 命令中包含 FAIL 时 Result 总是 Fail；空行只返回提示符（用于连接探测）
+    - 每个连接按顺序处理命令，与真实设备一样一次只执行一条
+    - seed：固定随机数种子，使抖动、失败和断线可重现
+    - port 为 0 时由系统分配端口，start() 后从 port 属性读取
+
+    可以在已有事件循环中 await start() / stop()，也可以用 with 语句在独立线程中运行：
+
+        with FakeDevice(behavior=DeviceBehavior(latency=0.01)) as device:
+            TelnetManager(device.host, device.port).connect()
+    """
+    def __init__(self, host="127.0.0.1", port=0, behavior=None, overrides=None,
+                 prompt=DEFAULT_PROMPTS[0], banner="Welcome to CIG-EVK-G2", seed=None):
+        self.host = host
+        self.port = port
+        self.behavior = behavior or DeviceBehavior()
+        self.overrides = {}
+        for command, value in (overrides or {}).items():
+            self.overrides[command] = value if isinstance(value, DeviceBehavior) else self.behavior.replace(**value)
+        self.prompt = prompt.encode("ascii")
+        self.banner = banner
+        self.random = random.Random(seed)
+        self.commands = 0
+        self.connections = 0
+        self.drops = 0
+        self._server = None
+        self._handlers = set()  # 正在处理连接的任务，stop() 时取消
+        self._loop = None
+        self._thread = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """停止监听，取消并等待所有连接的处理任务结束"""
+        if self._server:
+            self._server.close()
+            handlers = list(self._handlers)
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def __enter__(self):
+        """在独立线程的事件循环中启动，不占用 Telnet 客户端的共享事件循环"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fake-device", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    def response(self, command):
+        """生成一条命令的输出（不含延迟和断线）"""
+        behavior = self.overrides.get(command, self.behavior)
+        if not command:
+            return b"\r\n" + self.prompt
+        failed = "FAIL" in command or self.random.random() < behavior.fail_rate
+        filler = _FILLER_LINE * (behavior.output_size // len(_FILLER_LINE))
+        text = (f"\r\n{filler}Cmd: {command}\r\nData: {len(command)}\r\n"
+                f"Result: {'Fail' if failed else 'Pass'}\r\n")
+        return text.encode("ascii", errors="replace") + self.prompt
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            writer.write(_NEGOTIATION + f"{self.banner}\r\n".encode("ascii") + self.prompt)
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = _IAC_SEQUENCE.sub(b"", line).strip().decode("ascii", errors="replace")
+                behavior = self.overrides.get(command, self.behavior)
+                if command and self.random.random() < behavior.drop_rate:
+                    self.drops += 1
+                    break
+                delay = behavior.latency
+                if behavior.jitter:
+                    delay += self.random.uniform(-behavior.jitter, behavior.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.commands += 1
+                writer.write(self.response(command))
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        except asyncio.CancelledError:
+            # stop() 取消的连接正常结束，否则 asyncio 的连接回调会把取消当作异常打印出来
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+
+def _parse_override(text):
+    """命令=毫秒，设置该命令的延迟"""
+    command, sep, ms = text.rpartition("=")
+    if not sep or not command:
+        raise argparse.ArgumentTypeError(f"格式应为 命令=毫秒: {text}")
+    return command, float(ms) / 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m telnet_app.fake_device", description="模拟设备Telnet服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--latency-ms", dest="latency_ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", dest="jitter_ms", type=float, default=0)
+    parser.add_argument("--output-size", dest="output_size", type=int, default=0, help="每条命令附加的输出字节数")
+    parser.add_argument("--fail-rate", dest="fail_rate", type=float, default=0)
+    parser.add_argument("--drop-rate", dest="drop_rate", type=float, default=0, help="每条命令断开连接的概率")
+    parser.add_argument("--command-latency", dest="command_latency", type=_parse_override, action="append",
+                        default=[], help="单独设置某条命令的延迟，格式 命令=毫秒，可重复")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    behavior = DeviceBehavior(args.latency_ms / 1000, args.jitter_ms / 1000, args.output_size,
+                              args.fail_rate, args.drop_rate)
+    overrides = {command: {"latency": latency} for command, latency in args.command_latency}
+    device = FakeDevice(args.host, args.port, behavior, overrides, seed=args.seed)
+
+    async def serve():
+        await device.start()
+        print(f"模拟设备已启动: {device.host}:{device.port}，按 Ctrl+C 退出", flush=True)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,10 +4,27 @@
 GUI模块，提供图形界面相关功能
 """
 
-from .main_window import MainWindow
-from .log_manager import LogManager
-from .chart_manager import ChartManager
-from .config_manager import ConfigManager
-from .command_editor import CommandEditor
+import importlib
 
-__all__ = ['MainWindow', 'LogManager', 'ChartManager', 'ConfigManager', 'CommandEditor'] 
\ No newline at end of file
+# 子模块在首次访问时才导入
+_LAZY_IMPORTS = {
+    'MainWindow': '.main_window',
+    'LogManager': '.log_manager',
+    'ChartManager': '.chart_manager',
+    'ConfigManager': '.config_manager',
+    'CommandEditor': '.command_editor',
+    'LogViewer': '.log_viewer',
+    'LatencyView': '.latency_view',
+    'PhaseView': '.phase_view',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ['MainWindow', 'LogManager', 'ChartManager', 'ConfigManager', 'CommandEditor', 'LogViewer',
+           'LatencyView', 'PhaseView'] 
\ No newline at end of file
@@ -1,89 +1,192 @@
 # -*- coding: utf-8 -*-
 
+import math
 import tkinter as tk
+from threading import Lock
 from tkinter import ttk
-import matplotlib
-matplotlib.use('TkAgg')
-# 设置中文字体
-matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
-matplotlib.rcParams['axes.unicode_minus'] = False
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+
+_matplotlib = None
+
+def _load_matplotlib():
+    """首次创建图表时才导入 matplotlib 并设置后端和中文字体"""
+    global _matplotlib
+    if _matplotlib is None:
+        import matplotlib
+        matplotlib.use('TkAgg')
+        # 设置中文字体
+        matplotlib.rcParams['font.sans-serif'] = ['Microsoft YaHei', 'SimHei', 'Arial Unicode MS']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        _matplotlib = (FigureCanvasTkAgg, Figure)
+    return _matplotlib
+
+PASS_COLOR = '#27ae60'
+FAIL_COLOR = '#e74c3c'
 
 class ChartManager:
-    def __init__(self, parent_frame):
+    """
+    测试结果统计图表
+    - record() 只累加计数，可在执行线程中调用，每条命令的开销只有一次加锁计数
+    - 界面按 max_fps 定时刷新，计数没有变化时不重绘
+    - 图表在第一次显示时才创建（才导入 matplotlib），饼图扇区和柱子只创建一次，
+      刷新时原地修改并用 blit 只重绘这些图形；柱状图超出 y 轴范围时才整体重绘一次
+    """
+    def __init__(self, parent_frame, max_fps=5):
         self.parent = parent_frame
-        
+        self.interval_ms = max(int(1000 / max_fps), 20)
+
+        # 计数
+        self._lock = Lock()
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self._dirty = True
+
+        # 图表对象，首次显示时创建
+        self.figure = None
+        self.canvas = None
+        self._background = None
+        self._artists = []
+
         # 创建图表框架
         self.chart_frame = ttk.Frame(parent_frame)
         self.chart_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
+
         # 创建统计标签
         self.stats_frame = ttk.Frame(self.chart_frame)
         self.stats_frame.pack(fill=tk.X, padx=5, pady=5)
-        
+
         self.total_label = ttk.Label(self.stats_frame, text="总数: 0")
         self.total_label.pack(side=tk.LEFT, padx=5)
-        
+
         self.pass_label = ttk.Label(self.stats_frame, text="通过: 0")
         self.pass_label.pack(side=tk.LEFT, padx=5)
-        
+
         self.fail_label = ttk.Label(self.stats_frame, text="失败: 0")
         self.fail_label.pack(side=tk.LEFT, padx=5)
-        
-        # 创建图表
+
+        self.chart_frame.after(self.interval_ms, self._refresh)
+
+    def record(self, result):
+        """累加一条 CommandResult"""
+        passed = result.passed
+        failed = not passed and result.failed
+        with self._lock:
+            self.total += 1
+            if passed:
+                self.passed += 1
+            elif failed:
+                self.failed += 1
+            self._dirty = True
+
+    def reset(self):
+        """开始新一次执行时清零"""
+        with self._lock:
+            self.total = self.passed = self.failed = 0
+            self._dirty = True
+
+    def _create_chart(self):
+        """创建图表和需要刷新的图形对象"""
+        try:
+            FigureCanvasTkAgg, Figure = _load_matplotlib()
+        except ImportError:
+            ttk.Label(self.chart_frame, text="matplotlib模块未安装，无法显示图表。").pack(padx=5, pady=5)
+            self.figure = False
+            return
+        from matplotlib.patches import Circle, Wedge
+
         self.figure = Figure(figsize=(4, 3), dpi=100)
-        self.ax = self.figure.add_subplot(111)
+        self.figure.suptitle('测试结果统计')
+        self.pie_ax = self.figure.add_subplot(121)
+        self.bar_ax = self.figure.add_subplot(122)
+
+        # 饼图：灰色底圆表示没有数据，两个扇区的角度随计数变化
+        self.pie_ax.set_xlim(-1.1, 1.1)
+        self.pie_ax.set_ylim(-1.1, 1.1)
+        self.pie_ax.set_aspect('equal')
+        self.pie_ax.axis('off')
+        self.pie_ax.add_patch(Circle((0, 0), 1, color='#dddddd'))
+        self.pass_wedge = self.pie_ax.add_patch(Wedge((0, 0), 1, 90, 90, color=PASS_COLOR, animated=True))
+        self.fail_wedge = self.pie_ax.add_patch(Wedge((0, 0), 1, 90, 90, color=FAIL_COLOR, animated=True))
+        self.pass_text = self.pie_ax.text(0, 0, '', ha='center', va='center', animated=True)
+        self.fail_text = self.pie_ax.text(0, 0, '', ha='center', va='center', animated=True)
+
+        # 柱状图：只修改柱子高度，超出 y 轴范围时扩大范围
+        self.pass_bar, self.fail_bar = self.bar_ax.bar(['通过', '失败'], [0, 0], color=[PASS_COLOR, FAIL_COLOR])
+        self.pass_bar.set_animated(True)
+        self.fail_bar.set_animated(True)
+        self.bar_ax.set_ylim(0, 10)
+        self.figure.tight_layout()
+
+        self._artists = [self.pass_wedge, self.fail_wedge, self.pass_text, self.fail_text,
+                         self.pass_bar, self.fail_bar]
         self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-        # 初始化图表
-        self.init_chart()
-
-    def init_chart(self):
-        """初始化图表"""
-        self.ax.clear()
-        # 使用柱状图代替饼图来显示初始状态
-        self.ax.bar(['通过', '失败'], [0, 0], color=['#27ae60', '#e74c3c'])
-        self.ax.set_ylim(0, 1)  # 设置y轴范围
-        self.ax.set_title('测试结果统计')
-        self.canvas.draw()
-
-    def update_chart(self, results):
-        """更新图表"""
-        if not results:
-            self.init_chart()
+        # 每次整体重绘（包括窗口大小变化）后重新保存背景
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self._dirty = True
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self._artists:
+            artist.axes.draw_artist(artist)
+
+    def _update_artists(self, passed, failed):
+        """修改图形数据；柱状图需要扩大 y 轴范围时返回 True"""
+        counted = passed + failed
+        pass_angle = 360.0 * passed / counted if counted else 0.0
+        self.pass_wedge.set_theta1(90)
+        self.pass_wedge.set_theta2(90 + pass_angle)
+        self.fail_wedge.set_theta1(90 + pass_angle)
+        self.fail_wedge.set_theta2(450 if counted else 90)
+        self._place_label(self.pass_text, 90, pass_angle, passed, counted)
+        self._place_label(self.fail_text, 90 + pass_angle, 360 - pass_angle if counted else 0, failed, counted)
+
+        self.pass_bar.set_height(passed)
+        self.fail_bar.set_height(failed)
+        top = self.bar_ax.get_ylim()[1]
+        if max(passed, failed) > top:
+            while max(passed, failed) > top:
+                top *= 2
+            self.bar_ax.set_ylim(0, top)
+            return True
+        return False
+
+    @staticmethod
+    def _place_label(text, start, span, count, counted):
+        if not count:
+            text.set_text('')
             return
+        angle = math.radians(start + span / 2)
+        text.set_position((0.6 * math.cos(angle), 0.6 * math.sin(angle)))
+        text.set_text(f'{count * 100.0 / counted:.1f}%')
 
-        # 计算统计数据
-        total = len(results)
-        pass_count = results.count("Pass")
-        fail_count = results.count("Fail")
-        
-        # 更新标签
-        self.total_label.config(text=f"总数: {total}")
-        self.pass_label.config(text=f"通过: {pass_count}")
-        self.fail_label.config(text=f"失败: {fail_count}")
-        
-        # 更新图表
-        self.ax.clear()
-        if total > 0:
-            # 如果有数据，使用饼图
-            values = [pass_count, fail_count]
-            if sum(values) > 0:  # 确保至少有一个非零值
-                labels = ['通过', '失败']
-                colors = ['#27ae60', '#e74c3c']
-                
-                self.ax.pie(values, labels=labels, colors=colors, 
-                          autopct='%1.1f%%', startangle=90)
-                self.ax.axis('equal')
-                self.ax.set_title('测试结果统计')
-            else:
-                # 如果所有值都是0，使用柱状图
-                self.init_chart()
-        else:
-            self.init_chart()
-        
-        # 调整布局
-        self.figure.tight_layout()
-        self.canvas.draw() 
\ No newline at end of file
+    def _refresh(self):
+        """定时刷新：计数有变化时更新标签和图表"""
+        try:
+            # 图表所在的标签页不可见时不刷新
+            if not self.chart_frame.winfo_ismapped():
+                return
+            if self.figure is None:
+                self._create_chart()
+
+            with self._lock:
+                dirty, self._dirty = self._dirty, False
+                total, passed, failed = self.total, self.passed, self.failed
+            if dirty:
+                self.total_label.config(text=f"总数: {total}")
+                self.pass_label.config(text=f"通过: {passed}")
+                self.fail_label.config(text=f"失败: {failed}")
+                if self.figure:
+                    if self._update_artists(passed, failed) or self._background is None:
+                        self.canvas.draw_idle()
+                    else:
+                        self.canvas.restore_region(self._background)
+                        self._draw_artists()
+                        self.canvas.blit(self.figure.bbox)
+        finally:
+            self.chart_frame.after(self.interval_ms, self._refresh)
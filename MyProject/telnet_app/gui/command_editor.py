@@ -61,8 +61,9 @@ class CommandEditor:
         """在线程中执行命令"""
         # 清除之前的结果和数据
         self.parent.stop_event.clear()
-        self.parent.test_results.clear()
-        self.parent.excel_data.clear()
+        self.parent.chart_manager.reset()
+        # 所有命令共用一个执行器，命令间隔和目标速率按整批命令计算
+        runner = self.parent._create_runner(self.parent.delay_ms_var.get(), self.parent.rate_var.get())
 
         for line in lines_to_send:
             if self.parent.stop_event.is_set():
@@ -73,12 +74,17 @@ class CommandEditor:
             if not cmd_str:
                 continue
 
-            # 调用GUI的execute_one_command
-            success = self.parent.execute_one_command(cmd_str, self.parent.delay_ms_var.get())
+            if runner.pacer and not runner.pacer.wait():
+                break
+            try:
+                success = runner.execute_one_command(cmd_str)
+            except InterruptedError:
+                self.parent.log_manager.write_log("用户终止执行，已中断正在等待返回的命令。")
+                break
             if not success and self.parent.stop_on_error_var.get():
                 self.parent.log_manager.write_log("遇到错误，停止执行。")
                 self.parent.stop_event.set()
                 break
 
         # 保存Excel
-        self.parent.save_excel_if_needed() 
\ No newline at end of file
+        self.parent.generate_output_files() 
\ No newline at end of file
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from tkinter import filedialog, messagebox
-from ..config_manager import import_config, export_config
+from ..config_manager import DEFAULT_CONFIG, import_config, export_config
+from ..prompt_matcher import DEFAULT_PROMPTS, DEFAULT_PAGERS, split_patterns, join_patterns
 
 class ConfigManager:
     def __init__(self, parent):
@@ -20,11 +21,28 @@ class ConfigManager:
             data = import_config(config_path)
             self.parent.host_var.set(data.get("host", "192.168.0.21"))
             self.parent.port_var.set(data.get("port", 81))
+            self.parent.targets_var.set(data.get("targets", ""))
+            self.parent.max_workers_var.set(data.get("max_workers", 8))
+            self.parent.processes_var.set(data.get("processes", 0))
             self.parent.loop_count_var.set(data.get("loop_count", 1))
             self.parent.commands_file_var.set(data.get("commands_file", "commands.txt"))
             self.parent.log_dir_var.set(data.get("log_dir", "telnet_logs"))
+            self.parent.log_max_mb_var.set(data.get("log_max_mb", 0))
+            self.parent.log_rotate_minutes_var.set(data.get("log_rotate_minutes", 0))
+            self.parent.log_view_lines_var.set(data.get("log_view_lines", 10000))
+            self.parent.result_db_var.set(data.get("result_db", DEFAULT_CONFIG["result_db"]))
+            self.parent.record_session_var.set(data.get("record_session", False))
             self.parent.delay_ms_var.set(data.get("delay_ms", 0))
+            self.parent.rate_var.set(data.get("rate", 0))
             self.parent.timeout_var.set(data.get("timeout", 10))
+            self.parent.pipeline_window_var.set(data.get("pipeline_window", 1))
+            self.parent.prompts_var.set(join_patterns(data.get("prompts", DEFAULT_PROMPTS)))
+            self.parent.error_markers_var.set(join_patterns(data.get("error_markers", [])))
+            self.parent.pager_markers_var.set(join_patterns(data.get("pager_markers", DEFAULT_PAGERS)))
+            self.parent.metrics_port_var.set(data.get("metrics_port", 0))
+            self.parent.metrics_host_var.set(data.get("metrics_host", DEFAULT_CONFIG["metrics_host"]))
+            self.parent.metrics_textfile_var.set(data.get("metrics_textfile", ""))
+            self.parent.metrics_interval_var.set(data.get("metrics_interval", DEFAULT_CONFIG["metrics_interval"]))
             self.parent.output_mode_var.set(data.get("output_mode", "do_not_generate"))
             self.parent.stop_on_error_var.set(data.get("stop_on_error", False))
             messagebox.showinfo("提示", "配置导入成功！")
@@ -44,11 +62,28 @@ class ConfigManager:
         data = {
             "host": self.parent.host_var.get(),
             "port": self.parent.port_var.get(),
+            "targets": self.parent.targets_var.get(),
+            "max_workers": self.parent.max_workers_var.get(),
+            "processes": self.parent.processes_var.get(),
             "loop_count": self.parent.loop_count_var.get(),
             "commands_file": self.parent.commands_file_var.get(),
             "log_dir": self.parent.log_dir_var.get(),
+            "log_max_mb": self.parent.log_max_mb_var.get(),
+            "log_rotate_minutes": self.parent.log_rotate_minutes_var.get(),
+            "log_view_lines": self.parent.log_view_lines_var.get(),
+            "result_db": self.parent.result_db_var.get(),
+            "record_session": self.parent.record_session_var.get(),
             "delay_ms": self.parent.delay_ms_var.get(),
+            "rate": self.parent.rate_var.get(),
             "timeout": self.parent.timeout_var.get(),
+            "pipeline_window": self.parent.pipeline_window_var.get(),
+            "prompts": split_patterns(self.parent.prompts_var.get()),
+            "error_markers": split_patterns(self.parent.error_markers_var.get()),
+            "pager_markers": split_patterns(self.parent.pager_markers_var.get()),
+            "metrics_port": self.parent.metrics_port_var.get(),
+            "metrics_host": self.parent.metrics_host_var.get(),
+            "metrics_textfile": self.parent.metrics_textfile_var.get(),
+            "metrics_interval": self.parent.metrics_interval_var.get(),
             "output_mode": self.parent.output_mode_var.get(),
             "stop_on_error": self.parent.stop_on_error_var.get(),
         }
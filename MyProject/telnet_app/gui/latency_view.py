@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import tkinter as tk
+from tkinter import ttk
+
+from ..latency import LATENCY_HEADER
+
+
+class LatencyView:
+    """
+    命令耗时统计表：每个命令和每台设备一行，显示次数和 p50 / p95 / p99 / max
+    - 定时刷新，只更新有新记录的行；所在标签页不可见时不刷新
+    """
+    def __init__(self, parent_frame, stats, interval_ms=1000):
+        self.stats = stats
+        self.interval_ms = interval_ms
+        self._items = {}
+
+        self.frame = ttk.LabelFrame(parent_frame, text="命令耗时", padding=5)
+        self.frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        columns = list(range(len(LATENCY_HEADER)))
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", height=8)
+        for column, title in zip(columns, LATENCY_HEADER):
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=200 if column == 1 else 70, anchor=tk.W if column < 2 else tk.E)
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.frame.after(self.interval_ms, self._refresh)
+
+    def clear(self):
+        """开始新一次执行时清空表格"""
+        self.tree.delete(*self.tree.get_children())
+        self._items.clear()
+
+    def _refresh(self):
+        try:
+            if not self.frame.winfo_ismapped():
+                return
+            for key in self.stats.take_changed():
+                row = self.stats.row(*key)
+                if row is None:
+                    continue
+                item = self._items.get(key)
+                if item is None:
+                    self._items[key] = self.tree.insert("", tk.END, values=row)
+                else:
+                    self.tree.item(item, values=row)
+        finally:
+            self.frame.after(self.interval_ms, self._refresh)
@@ -1,14 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import time
 import tkinter as tk
 from tkinter import scrolledtext, ttk
-from datetime import datetime
-from queue import Queue
+from queue import Queue, Empty
+
+from .. import instrumentation
+from ..log_writer import format_log_line, LogFileWriter
 
 class LogManager:
-    def __init__(self, parent):
+    # 每次刷新最多写入文本控件的行数
+    MAX_LINES_PER_TICK = 2000
+
+    def __init__(self, parent, max_lines=10000):
         self.parent = parent
         self.log_queue = Queue()
+        self.log_writer = None
+        # 文本控件最多保留的行数，更早的日志只保存在日志文件中；0 表示不限制
+        self.max_lines = max_lines
         
         # 创建日志文本控件容器框架
         self.log_frame = ttk.Frame(parent.lower_left)
@@ -33,38 +42,78 @@ class LogManager:
         parent.after(200, self._update_log_text)
 
     def write_log(self, message, tag="NORMAL"):
-        """将消息放入队列，由主线程更新UI"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        if message.lower().startswith('cmd:'):
-            line = f"[{timestamp}] {message}"
-        elif message.lower().startswith('data:'):
-            line = f"                      {message}"
-        elif message.lower().startswith('result:'):
-            line = f"                      {message}"
-        else:
-            line = f"[{timestamp}] {message}"
+        """将消息放入队列，由主线程更新UI；打开了日志文件时同时交给后台线程写入"""
+        timing = instrumentation.enabled
+        if timing:
+            start = time.perf_counter()
+        line = format_log_line(message)
         self.log_queue.put((line, tag))
+        log_writer = self.log_writer
+        if log_writer:
+            log_writer.write(line)
+        if timing:
+            instrumentation.record("log_enqueue", time.perf_counter() - start)
+
+    def queue_depth(self):
+        """等待显示和等待写入文件的日志行数"""
+        log_writer = self.log_writer
+        return self.log_queue.qsize() + (log_writer.pending if log_writer else 0)
+
+    def open_log_file(self, file_path, max_bytes=0, rotate_interval=0):
+        """开始把日志写入文件，磁盘 I/O 在后台线程中完成"""
+        self.close_log_file()
+        self.log_writer = LogFileWriter(
+            file_path,
+            max_bytes=max_bytes,
+            rotate_interval=rotate_interval,
+            on_error=lambda e: self.log_queue.put((format_log_line(f"写入日志文件失败：{e}"), "RESULT_FAIL"))
+        )
+
+    def close_log_file(self):
+        """写完剩余日志并关闭日志文件"""
+        log_writer, self.log_writer = self.log_writer, None
+        if log_writer:
+            log_writer.close()
 
     def _update_log_text(self):
-        """定期从队列获取日志消息并写入文本控件"""
-        while not self.log_queue.empty():
-            line_to_insert, tag = self.log_queue.get()
-            
-            self.log_text.insert(tk.END, line_to_insert + "\n", tag)
+        """
+        定期从队列获取日志消息并写入文本控件
+        - 每次最多取 MAX_LINES_PER_TICK 行，相同标签的连续行合并后一次 insert 写入
+        - 行数超过 max_lines 的 10% 后一次删除最早的行，避免每次刷新都删除
+        """
+        timing = instrumentation.enabled
+        if timing:
+            start = time.perf_counter()
+        chunks = []
+        count = 0
+        last_tag = None
+        while count < self.MAX_LINES_PER_TICK:
+            try:
+                line_to_insert, tag = self.log_queue.get_nowait()
+            except Empty:
+                break
+            count += 1
+            if tag == last_tag:
+                chunks[-2] += line_to_insert + "\n"
+            else:
+                chunks.append(line_to_insert + "\n")
+                chunks.append(tag)
+                last_tag = tag
+
+        if chunks:
+            self.log_text.insert(tk.END, *chunks)
+            if self.max_lines > 0:
+                line_count = int(self.log_text.index("end-1c").split(".")[0])
+                if line_count > self.max_lines * 1.1:
+                    excess = line_count - self.max_lines
+                    self.log_text.delete("1.0", f"{excess + 1}.0")
             if hasattr(self.parent, 'is_auto_scroll') and self.parent.is_auto_scroll.get():
                 self.log_text.see(tk.END)
+            if timing:
+                instrumentation.record("log_drain", time.perf_counter() - start)
 
-            # 如果需要则写入文件
-            if hasattr(self.parent, 'output_mode_var') and hasattr(self.parent, 'log_file_path'):
-                mode = self.parent.output_mode_var.get()
-                if mode in ("log", "both") and self.parent.log_file_path:
-                    try:
-                        with open(self.parent.log_file_path, "a", encoding="utf-8") as f:
-                            f.write(line_to_insert + "\n")
-                    except Exception as e:
-                        self.write_log(f"写入日志文件失败：{e}")
-
-        self.parent.after(200, self._update_log_text)
+        # 队列中还有积压时尽快进行下一次刷新
+        self.parent.after(200 if self.log_queue.empty() else 20, self._update_log_text)
 
     def clear_log(self):
         """清除日志文本控件"""
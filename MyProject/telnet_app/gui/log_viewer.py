@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+import tkinter as tk
+from bisect import bisect_right
+from threading import Thread, Event
+from tkinter import ttk, filedialog, messagebox
+
+from ..log_index import LogIndex
+
+
+class LogViewer(tk.Toplevel):
+    """
+    日志浏览器
+    - 文件由 LogIndex 建立索引，文本框中只放当前可见的几十行，滚动时重新读取
+    - 支持跳转到指定行、跳转到下一个 FAIL、按命令过滤
+    - 查找和过滤在后台线程中执行，界面定时检查结果
+    """
+    POLL_MS = 200
+
+    def __init__(self, master, file_path=None, initial_dir=None):
+        super().__init__(master)
+        self.title("日志浏览器")
+        self.geometry("1000x650")
+
+        self.index = None
+        self.top_line = 0          # 可见区域第一行对应的行（过滤时为过滤结果中的序号）
+        self.current_line = -1     # 最近一次跳转到的文件行号，作为下一次查找的起点
+        self.filter_ranges = None  # 过滤结果 [(起始行, 结束行), ...]
+        self._range_starts = []    # 每个过滤区间在过滤结果中的起始序号
+        self._filter_total = 0
+        self._task = None          # 后台任务 (线程, 结果列表, 完成回调)
+        self._cancel = Event()
+        self._indexing = False
+
+        # ---- 工具栏 ----
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(toolbar, text="打开", command=self.choose_file).pack(side=tk.LEFT, padx=2)
+
+        ttk.Label(toolbar, text="行号:").pack(side=tk.LEFT, padx=(10, 2))
+        self.goto_var = tk.StringVar()
+        goto_entry = ttk.Entry(toolbar, textvariable=self.goto_var, width=10)
+        goto_entry.pack(side=tk.LEFT)
+        goto_entry.bind("<Return>", lambda e: self.goto_line())
+        ttk.Button(toolbar, text="跳转", command=self.goto_line).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="下一个FAIL", command=self.find_next_fail).pack(side=tk.LEFT, padx=(10, 2))
+
+        ttk.Label(toolbar, text="命令过滤:").pack(side=tk.LEFT, padx=(10, 2))
+        self.filter_var = tk.StringVar()
+        filter_entry = ttk.Entry(toolbar, textvariable=self.filter_var, width=20)
+        filter_entry.pack(side=tk.LEFT)
+        filter_entry.bind("<Return>", lambda e: self.apply_filter())
+        ttk.Button(toolbar, text="过滤", command=self.apply_filter).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="清除过滤", command=self.clear_filter).pack(side=tk.LEFT, padx=2)
+
+        # ---- 文本区域 ----
+        container = ttk.Frame(self)
+        container.pack(fill=tk.BOTH, expand=True, padx=5)
+        self.text = tk.Text(container, wrap=tk.NONE, font=('Consolas', 10), state='disabled')
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(container, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.text.tag_config("RESULT_PASS", foreground="green")
+        self.text.tag_config("RESULT_FAIL", foreground="red")
+        self.text.tag_config("CURRENT", background="#fff3b0")
+
+        self.text.bind("<Configure>", lambda e: self.render())
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda e: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll_lines(3))
+        for key, delta in (("<Prior>", "page-up"), ("<Next>", "page-down")):
+            self.text.bind(key, lambda e, d=delta: self._on_page(d))
+        self.text.bind("<Up>", lambda e: self.scroll_lines(-1))
+        self.text.bind("<Down>", lambda e: self.scroll_lines(1))
+
+        self.status_var = tk.StringVar(value="未打开文件")
+        ttk.Label(self, textvariable=self.status_var, anchor=tk.W).pack(fill=tk.X, padx=5, pady=2)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self._initial_dir = initial_dir
+        if file_path:
+            self.open_file(file_path)
+        self._poll_id = self.after(self.POLL_MS, self._poll)
+
+    # ---------- 文件 ----------
+    def choose_file(self):
+        file_path = filedialog.askopenfilename(
+            parent=self,
+            initialdir=self._initial_dir,
+            filetypes=[("日志文件", "telnet_log_*.txt"), ("文本文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if file_path:
+            self.open_file(file_path)
+
+    def open_file(self, file_path):
+        try:
+            index = LogIndex(file_path)
+        except OSError as e:
+            messagebox.showerror("错误", f"无法打开日志文件：{e}", parent=self)
+            return
+        self._close_index()
+        self.index = index
+        self.top_line = 0
+        self.current_line = -1
+        self._set_filter(None)
+        self._indexing = True
+        self.title(f"日志浏览器 - {file_path}")
+        self.render()
+
+    def _close_index(self):
+        self._cancel.set()
+        if self._task:
+            self._task[0].join()
+            self._task = None
+        self._cancel = Event()
+        if self.index:
+            self.index.close()
+            self.index = None
+
+    def on_closing(self):
+        self.after_cancel(self._poll_id)
+        self._close_index()
+        self.destroy()
+
+    # ---------- 行映射 ----------
+    def _total_rows(self):
+        if self.filter_ranges is not None:
+            return self._filter_total
+        return self.index.line_count if self.index else 0
+
+    def _row_to_line(self, row):
+        """可见行序号转换为文件行号"""
+        if self.filter_ranges is None:
+            return row
+        i = bisect_right(self._range_starts, row) - 1
+        return self.filter_ranges[i][0] + row - self._range_starts[i]
+
+    def _line_to_row(self, line):
+        """文件行号转换为可见行序号，过滤时取该行之后最近的一行"""
+        if self.filter_ranges is None:
+            return line
+        for (start, end), row in zip(self.filter_ranges, self._range_starts):
+            if line < end:
+                return row + max(line - start, 0)
+        return self._filter_total
+
+    def _read_rows(self, row, count):
+        """读取可见行，返回 [(文件行号, 文本), ...]"""
+        if self.filter_ranges is None:
+            lines = self.index.get_lines(row, count)
+            return list(zip(range(row, row + len(lines)), lines))
+        rows = []
+        i = bisect_right(self._range_starts, row) - 1
+        while i < len(self.filter_ranges) and len(rows) < count:
+            start, end = self.filter_ranges[i]
+            first = start + max(row - self._range_starts[i], 0)
+            lines = self.index.get_lines(first, min(end - first, count - len(rows)))
+            rows.extend(zip(range(first, first + len(lines)), lines))
+            if first + len(lines) < end:
+                break  # 该区间尚未索引完
+            i += 1
+        return rows
+
+    # ---------- 显示 ----------
+    def _visible_rows(self):
+        line_height = max(self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"), 1)
+        return max(self.text.winfo_height() // line_height, 1)
+
+    def render(self):
+        """只把可见的行写入文本框"""
+        visible = self._visible_rows()
+        total = self._total_rows()
+        self.top_line = max(min(self.top_line, total - visible), 0)
+
+        rows = self._read_rows(self.top_line, visible) if self.index else []
+        width = len(str(self.index.line_count)) if self.index else 1
+        self.text.config(state='normal')
+        self.text.delete("1.0", tk.END)
+        for i, (line_no, line) in enumerate(rows):
+            tags = ()
+            if "Result:" in line:
+                tags = ("RESULT_PASS",) if "pass" in line.lower() else ("RESULT_FAIL",)
+            if line_no == self.current_line:
+                tags += ("CURRENT",)
+            if i:
+                self.text.insert(tk.END, "\n")
+            self.text.insert(tk.END, f"{line_no + 1:>{width}}  {line}", tags)
+        self.text.config(state='disabled')
+
+        if total:
+            self.scrollbar.set(self.top_line / total, min((self.top_line + visible) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_lines(self, delta):
+        self.top_line += delta
+        self.render()
+        return "break"
+
+    def _on_page(self, direction):
+        visible = self._visible_rows()
+        return self.scroll_lines(-visible if direction == "page-up" else visible)
+
+    def _on_mousewheel(self, event):
+        return self.scroll_lines(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, *args):
+        if action == tk.MOVETO:
+            self.top_line = int(float(args[0]) * self._total_rows())
+            self.render()
+        elif action == tk.SCROLL:
+            amount, unit = int(args[0]), args[1]
+            if unit == tk.PAGES:
+                amount *= self._visible_rows()
+            self.scroll_lines(amount)
+
+    def _show_line(self, line_no):
+        """跳转到文件行号 line_no，该行显示在可见区域的前几行"""
+        self.current_line = line_no
+        self.top_line = max(self._line_to_row(line_no) - 3, 0)
+        self.render()
+
+    # ---------- 跳转 / 查找 / 过滤 ----------
+    def goto_line(self):
+        if not self.index:
+            return
+        try:
+            line_no = int(self.goto_var.get()) - 1
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的行号。", parent=self)
+            return
+        if not 0 <= line_no < self.index.line_count:
+            messagebox.showinfo("提示", f"行号超出范围（已索引 {self.index.line_count} 行）。", parent=self)
+            return
+        self._show_line(line_no)
+
+    def find_next_fail(self):
+        if not self.index or self._task:
+            return
+        start = self.current_line
+        if start < 0 and self.top_line:
+            start = self._row_to_line(self.top_line) - 1
+        index = self.index
+
+        def on_done(line_no):
+            if line_no is None:
+                self.status_var.set("后面没有FAIL。")
+            else:
+                self._show_line(line_no)
+
+        self._start_task(lambda: index.find_next_fail(start), on_done, "正在查找FAIL...")
+
+    def apply_filter(self):
+        text = self.filter_var.get().strip()
+        if not self.index or self._task:
+            return
+        if not text:
+            self.clear_filter()
+            return
+        index, cancel = self.index, self._cancel
+
+        def on_done(ranges):
+            if ranges is not None:
+                self._set_filter(ranges)
+                self.top_line = 0
+                self.render()
+
+        self._start_task(lambda: index.filter_command(text, cancel), on_done, "正在过滤...")
+
+    def clear_filter(self):
+        line_no = self._row_to_line(self.top_line) if self.filter_ranges else None
+        self._set_filter(None)
+        if line_no is not None:
+            self.top_line = line_no
+        self.render()
+
+    def _set_filter(self, ranges):
+        self.filter_ranges = ranges
+        self._range_starts = []
+        self._filter_total = 0
+        for start, end in ranges or ():
+            self._range_starts.append(self._filter_total)
+            self._filter_total += end - start
+
+    def _start_task(self, func, on_done, message):
+        result = []
+        thread = Thread(target=lambda: result.append(func()), daemon=True)
+        self._task = (thread, result, on_done)
+        self.status_var.set(message)
+        thread.start()
+
+    def _poll(self):
+        """定时检查索引进度和后台任务"""
+        if self._task and not self._task[0].is_alive():
+            _, result, on_done = self._task
+            self._task = None
+            self._update_status()
+            if result:
+                on_done(result[0])
+        elif self._indexing and not self._task:
+            # 索引建立过程中刷新行数，完成后再刷新一次
+            self._indexing = not self.index.done
+            self.render()
+            self._update_status()
+        self._poll_id = self.after(self.POLL_MS, self._poll)
+
+    def _update_status(self):
+        if not self.index:
+            return
+        status = f"{self.index.file_path}    共 {self.index.line_count} 行"
+        if not self.index.done:
+            status += f"    正在建立索引 {self.index.progress:.0%}"
+        if self.filter_ranges is not None:
+            status += f"    过滤结果 {self._filter_total} 行"
+        self.status_var.set(status)
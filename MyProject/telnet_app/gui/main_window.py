@@ -1,29 +1,34 @@
 # -*- coding: utf-8 -*-
 
 import os
-import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 from threading import Thread, Event
-from queue import Queue
-import base64
-from PIL import Image, ImageTk
-import io
-
-try:
-    from openpyxl import Workbook
-except ImportError:
-    Workbook = None
 
 from .. import __version__
-from ..telnet_manager import TelnetManager
+from ..connection_pool import ConnectionPool
+from ..command_plan import load_plan
+from ..excel_exporter import StreamingExcelExporter, EXCEL_HEADER, DEVICE_HEADER
+from ..latency import LatencyStats, LATENCY_HEADER
+from ..metrics import RunMetrics, MetricsHTTPServer, MetricsTextfileWriter
+from ..progress import ProgressSnapshot
+from ..log_writer import new_log_file_path
+from ..prompt_matcher import PromptMatcher, DEFAULT_PROMPTS, DEFAULT_PAGERS, split_patterns, join_patterns
+from ..result_parser import parse_telnet_output
+from ..result_store import ResultStore
+from ..runner import CommandRunner, MultiDeviceRunner, parse_targets
+from ..session_record import SessionRecorder
+from ..sharded_runner import ShardedRunner
 from .log_manager import LogManager
 from .chart_manager import ChartManager
+from .latency_view import LatencyView
 from .config_manager import ConfigManager
 from .command_editor import CommandEditor
 
 class MainWindow(tk.Tk):
+    # 进度条和状态的刷新周期，与 LogManager 的日志刷新周期相同
+    PROGRESS_POLL_MS = 200
+
     def __init__(self):
         """初始化主窗口"""
         super().__init__()
@@ -68,17 +73,26 @@ class MainWindow(tk.Tk):
     def _init_variables(self):
         """初始化变量"""
         self.telnet_manager = None
+        self.prompt_matcher = None
+        self.connection_pool = ConnectionPool(keepalive_interval=30)
         self.stop_event = Event()
         self.telnet_thread = None
         self.is_auto_scroll = tk.BooleanVar(value=True)
-        self.test_results = []
-        self.excel_data = []
+        self.excel_exporter = None
+        self.result_store = None
+        self.session_recorder = None
+        self.latency_stats = LatencyStats()
+        self.run_metrics = RunMetrics()
+        self.metrics_exporters = []
+        self._metrics_settings = None
         self.output_mode_var = tk.StringVar(value="do_not_generate")
         self.stop_on_error_var = tk.BooleanVar(value=False)
         self.timeout_var = tk.IntVar(value=10)
         self.log_file_path = None
         self.excel_file_path = None
         self.progress_var = tk.DoubleVar(value=0.0)  # 添加进度变量
+        self.progress = ProgressSnapshot()  # 执行线程写入，界面每 PROGRESS_POLL_MS 毫秒读取一次
+        self._progress_version = -1
 
     def create_style(self):
         """创建样式"""
@@ -151,6 +165,22 @@ class MainWindow(tk.Tk):
         editor_menu.add_command(label="打开命令编辑器", command=self.command_editor.open_advanced_editor)
         menubar.add_cascade(label="编辑器", menu=editor_menu)
 
+        log_menu = tk.Menu(menubar, tearoff=0)
+        log_menu.add_command(label="打开日志浏览器", command=self.open_log_viewer)
+        log_menu.add_command(label="分阶段耗时", command=self.open_phase_view)
+        menubar.add_cascade(label="日志", menu=log_menu)
+
+    def open_log_viewer(self):
+        """打开日志浏览器，有本次执行的日志文件时直接打开该文件"""
+        from .log_viewer import LogViewer
+        file_path = self.log_file_path if self.log_file_path and os.path.isfile(self.log_file_path) else None
+        LogViewer(self, file_path=file_path, initial_dir=self.log_dir_var.get())
+
+    def open_phase_view(self):
+        """打开分阶段耗时窗口，用于定位执行慢的环节"""
+        from .phase_view import PhaseView
+        PhaseView(self)
+
     def create_widgets(self):
         """创建控件"""
         # 创建选项卡
@@ -180,6 +210,20 @@ class MainWindow(tk.Tk):
         )
         connect_btn.grid(row=0, column=4, padx=5, pady=5, sticky=tk.W)
 
+        # 多设备目标，填写后开始执行时会并发连接这些设备，不再使用上面的单一连接
+        ttk.Label(conn_frame, text="多设备目标:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+        self.targets_var = tk.StringVar(value="")
+        ttk.Entry(conn_frame, textvariable=self.targets_var, width=40).grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(conn_frame, text="并发数:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
+        self.max_workers_var = tk.IntVar(value=8)
+        ttk.Entry(conn_frame, textvariable=self.max_workers_var, width=8).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # 进程数大于1时设备分片到多个进程执行，并发数为每个进程的并发数
+        ttk.Label(conn_frame, text="进程数:").grid(row=2, column=2, padx=5, pady=5, sticky=tk.E)
+        self.processes_var = tk.IntVar(value=0)
+        ttk.Entry(conn_frame, textvariable=self.processes_var, width=8).grid(row=2, column=3, padx=5, pady=5, sticky=tk.W)
+
         # 命令设置
         cmd_frame = ttk.LabelFrame(basic_frame, text="命令设置", padding=5)
         cmd_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -201,13 +245,39 @@ class MainWindow(tk.Tk):
         time_frame = ttk.LabelFrame(advanced_frame, text="时间设置", padding=5)
         time_frame.pack(fill=tk.X, padx=5, pady=5)
 
-        ttk.Label(time_frame, text="命令执行延迟(毫秒):").grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
+        # 命令间隔按发送时刻计算，扣除命令本身的耗时；设置了目标速率时以速率为准
+        ttk.Label(time_frame, text="命令间隔(毫秒):").grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
         self.delay_ms_var = tk.IntVar(value=0)
         ttk.Entry(time_frame, textvariable=self.delay_ms_var, width=8).grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
 
         ttk.Label(time_frame, text="超时时间(秒):").grid(row=0, column=2, padx=5, pady=5, sticky=tk.E)
         ttk.Entry(time_frame, textvariable=self.timeout_var, width=8).grid(row=0, column=3, padx=5, pady=5, sticky=tk.W)
 
+        # 流水线窗口：大于1时不等待提示符就发送后续命令，命令间隔和目标速率都为0时生效
+        ttk.Label(time_frame, text="流水线窗口:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+        self.pipeline_window_var = tk.IntVar(value=1)
+        ttk.Entry(time_frame, textvariable=self.pipeline_window_var, width=8).grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(time_frame, text="目标速率(条/秒):").grid(row=1, column=2, padx=5, pady=5, sticky=tk.E)
+        self.rate_var = tk.DoubleVar(value=0)
+        ttk.Entry(time_frame, textvariable=self.rate_var, width=8).grid(row=1, column=3, padx=5, pady=5, sticky=tk.W)
+
+        # 提示符设置：多个模式用 | 分隔，出现错误标记的命令记为失败，遇到分页提示自动发送空格
+        prompt_frame = ttk.LabelFrame(advanced_frame, text="提示符设置", padding=5)
+        prompt_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(prompt_frame, text="提示符:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
+        self.prompts_var = tk.StringVar(value=join_patterns(DEFAULT_PROMPTS))
+        ttk.Entry(prompt_frame, textvariable=self.prompts_var, width=40).grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(prompt_frame, text="错误标记:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+        self.error_markers_var = tk.StringVar(value="")
+        ttk.Entry(prompt_frame, textvariable=self.error_markers_var, width=40).grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+
+        ttk.Label(prompt_frame, text="分页提示:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
+        self.pager_markers_var = tk.StringVar(value=join_patterns(DEFAULT_PAGERS))
+        ttk.Entry(prompt_frame, textvariable=self.pager_markers_var, width=40).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+
         # 错误处理
         error_frame = ttk.LabelFrame(advanced_frame, text="错误处理", padding=5)
         error_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -237,6 +307,53 @@ class MainWindow(tk.Tk):
         ttk.Entry(log_frame, textvariable=self.log_dir_var, width=40).grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
         ttk.Button(log_frame, text="选择目录", command=self.config_manager.select_log_dir).grid(row=0, column=2, padx=5, pady=5, sticky=tk.W)
 
+        # 日志文件切换：超过大小或时间后写入新文件，0 表示不切换
+        rotate_frame = ttk.Frame(log_frame)
+        rotate_frame.grid(row=1, column=0, columnspan=3, sticky=tk.W)
+        ttk.Label(rotate_frame, text="单个日志上限(MB):").pack(side=tk.LEFT, padx=5, pady=5)
+        self.log_max_mb_var = tk.IntVar(value=0)
+        ttk.Entry(rotate_frame, textvariable=self.log_max_mb_var, width=8).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Label(rotate_frame, text="切换间隔(分钟):").pack(side=tk.LEFT, padx=5, pady=5)
+        self.log_rotate_minutes_var = tk.IntVar(value=0)
+        ttk.Entry(rotate_frame, textvariable=self.log_rotate_minutes_var, width=8).pack(side=tk.LEFT, padx=5, pady=5)
+
+        # 界面上只保留最近的日志，完整日志在日志文件中
+        ttk.Label(log_frame, text="界面日志行数:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
+        self.log_view_lines_var = tk.IntVar(value=self.log_manager.max_lines)
+        ttk.Entry(log_frame, textvariable=self.log_view_lines_var, width=8).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # 设置路径后每条命令的结果都保存到结果数据库（例如 telnet_logs/results.db），默认留空不保存
+        ttk.Label(log_frame, text="结果数据库:").grid(row=3, column=0, padx=5, pady=5, sticky=tk.E)
+        self.result_db_var = tk.StringVar(value="")
+        ttk.Entry(log_frame, textvariable=self.result_db_var, width=40).grid(row=3, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # 把收发的原始数据录制到与日志同名的 .tsr 文件，可用命令行 --replay 离线回放
+        self.record_session_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(log_frame, text="录制会话(.tsr)", variable=self.record_session_var).grid(
+            row=4, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # 监控指标：HTTP 端口为 0、文本文件留空时不导出
+        metrics_frame = ttk.LabelFrame(output_frame, text="监控指标", padding=5)
+        metrics_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(metrics_frame, text="HTTP端口:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
+        self.metrics_port_var = tk.IntVar(value=0)
+        ttk.Entry(metrics_frame, textvariable=self.metrics_port_var, width=8).grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+        ttk.Label(metrics_frame, text="监听地址:").grid(row=0, column=2, padx=5, pady=5, sticky=tk.E)
+        self.metrics_host_var = tk.StringVar(value="127.0.0.1")
+        ttk.Entry(metrics_frame, textvariable=self.metrics_host_var, width=16).grid(row=0, column=3, padx=5, pady=5, sticky=tk.W)
+        ttk.Label(metrics_frame, text="文本文件:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+        self.metrics_textfile_var = tk.StringVar(value="")
+        ttk.Entry(metrics_frame, textvariable=self.metrics_textfile_var, width=40).grid(row=1, column=1, columnspan=3, padx=5, pady=5, sticky=tk.W)
+        ttk.Label(metrics_frame, text="写入间隔(秒):").grid(row=2, column=0, padx=5, pady=5, sticky=tk.E)
+        self.metrics_interval_var = tk.IntVar(value=15)
+        ttk.Entry(metrics_frame, textvariable=self.metrics_interval_var, width=8).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+
+        # 统计图表标签页：执行过程中实时更新，切换到该页时才创建图表
+        chart_frame = ttk.Frame(self.notebook)
+        self.notebook.add(chart_frame, text="统计图表")
+        self.chart_manager = ChartManager(chart_frame)
+        self.latency_view = LatencyView(chart_frame, self.latency_stats)
+
         # 状态和控制区域
         status_frame = ttk.LabelFrame(self.upper_left, text="状态和控制", padding=5)
         status_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -258,6 +375,7 @@ class MainWindow(tk.Tk):
             length=200
         )
         self.progress_bar.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.after(self.PROGRESS_POLL_MS, self._poll_progress)
 
         # 控制按钮
         button_frame = ttk.Frame(status_frame)
@@ -283,15 +401,28 @@ class MainWindow(tk.Tk):
             command=self.log_manager.clear_log
         ).pack(side=tk.LEFT, padx=5)
 
+    def _build_matcher(self):
+        """根据提示符设置创建匹配器，设置无效时提示并返回 None"""
+        try:
+            return PromptMatcher(
+                split_patterns(self.prompts_var.get()),
+                split_patterns(self.error_markers_var.get()),
+                split_patterns(self.pager_markers_var.get())
+            )
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return None
+
     def connect_telnet(self):
         """连接到Telnet"""
         host = self.host_var.get()
         port = self.port_var.get()
         timeout = self.timeout_var.get()
-        self.telnet_manager = TelnetManager(host, port, timeout=timeout)
-
+        matcher = self._build_matcher()
+        if matcher is None:
+            return
         try:
-            self.telnet_manager.connect()
+            self.telnet_manager = self.connection_pool.acquire(host, port, timeout, matcher=matcher)
             self.log_manager.write_log(f"已连接到 {host}:{port}")
             self.update_status("Telnet连接成功")
         except Exception as e:
@@ -305,36 +436,52 @@ class MainWindow(tk.Tk):
             messagebox.showwarning("提示", "Telnet命令正在执行中，请停止或等待执行完成。")
             return
 
-        if not self.telnet_manager or not self.telnet_manager.is_connected:
+        try:
+            targets = parse_targets(self.targets_var.get(), default_port=self.port_var.get())
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
+
+        if not targets and (not self.telnet_manager or not self.telnet_manager.is_connected):
             messagebox.showinfo("提示", "请先点击'连接'按钮连接到Telnet。")
             return
 
+        self.prompt_matcher = self._build_matcher()
+        if self.prompt_matcher is None:
+            return
+        if not targets:
+            self.telnet_manager.matcher = self.prompt_matcher
+
         # 重置状态
         self.stop_event.clear()
-        self.test_results.clear()
-        self.excel_data.clear()
+        self.chart_manager.reset()
+        self.latency_stats.reset(None if targets else f"{self.telnet_manager.host}:{self.telnet_manager.port}")
+        self.latency_view.clear()
+        self.log_manager.max_lines = self.log_view_lines_var.get()
 
         # 设置日志文件路径
-        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         mode = self.output_mode_var.get()
         if mode != "do_not_generate":
-            os.makedirs(self.log_dir_var.get(), exist_ok=True)
-            self.log_file_path = os.path.join(
-                self.log_dir_var.get(),
-                f"telnet_log_{current_time}.txt"
-            )
+            self.log_file_path = new_log_file_path(self.log_dir_var.get())
             self.excel_file_path = self.log_file_path.replace(".txt", ".xlsx")
         else:
             self.log_file_path = None
             self.excel_file_path = None
 
+        if mode in ("log", "both"):
+            self.log_manager.open_log_file(
+                self.log_file_path,
+                max_bytes=self.log_max_mb_var.get() * 1024 * 1024,
+                rotate_interval=self.log_rotate_minutes_var.get() * 60
+            )
+
         # 启动执行线程
         self.telnet_thread = Thread(target=self.run_commands)
         self.telnet_thread.daemon = True
         self.telnet_thread.start()
 
     def stop_execution(self):
-        """停止执行"""
+        """停止执行：正在等待设备返回的命令会立即中断，会话在下一条命令前重新同步"""
         self.stop_event.set()
 
     def run_commands(self):
@@ -347,166 +494,254 @@ class MainWindow(tk.Tk):
                 self.log_manager.write_log(f"命令文件不存在: {commands_file}")
                 return
 
-            # 读取命令
-            with open(commands_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            # 编译命令文件（文件未修改时直接使用缓存）
+            plan = load_plan(commands_file)
 
             # 获取循环次数和延迟设置
             loop_count = self.loop_count_var.get()
             delay_ms = self.delay_ms_var.get()
-            
-            # 计算总命令数（排除注释和空行）
-            valid_commands = [line for line in lines if line.strip() and not line.startswith('#')]
-            total_commands = len(valid_commands) * loop_count
-            executed_commands = 0
+            rate = self.rate_var.get()
+            targets = parse_targets(self.targets_var.get(), default_port=self.port_var.get())
+            self._open_excel_exporter(DEVICE_HEADER if targets else EXCEL_HEADER)
+            self._open_result_store()
+            if self.result_store:
+                host = None if targets else f"{self.telnet_manager.host}:{self.telnet_manager.port}"
+                self.result_store.start_run(commands_file, self.targets_var.get(), host)
+
+            self._open_metrics_exporters()
+            # 多进程执行时各工作进程分别录制
+            sharded = bool(targets) and self.processes_var.get() > 1
+            if not sharded:
+                self._open_session_recorder()
+
+            def on_progress(current, total):
+                self.run_metrics.progress(current, total)
+                self.progress.update(current, total)
 
             # 执行命令
-            for loop in range(loop_count):
-                if self.stop_event.is_set():
-                    self.log_manager.write_log("用户终止执行。")
-                    break
-
-                loop_start = time.time()
-                self.log_manager.write_log(f"\n=== 开始第 {loop + 1} 轮执行 ===\n")
-
-                for line in lines:
-                    if self.stop_event.is_set():
-                        break
-
-                    command_str = line.strip()
-                    if not command_str or command_str.startswith('#'):
-                        continue
-
-                    success = self.execute_one_command(command_str, delay_ms)
-                    executed_commands += 1
-                    self.after(0, self.update_progress, executed_commands, total_commands)
-
-                    if not success and self.stop_on_error_var.get():
-                        self.log_manager.write_log("检测到错误，停止执行")
-                        self.stop_event.set()
-                        break
-
-                loop_end = time.time()
-                self.log_manager.write_log(f"本轮执行时间: {loop_end - loop_start:.2f} 秒")
-
-            # 生成输出文件
-            self.generate_output_files()
+            if sharded:
+                runner = ShardedRunner(
+                    targets,
+                    timeout=self.timeout_var.get(),
+                    max_workers=self.max_workers_var.get(),
+                    log=self.log_manager.write_log,
+                    on_result=self._on_result,
+                    stop_event=self.stop_event,
+                    delay_ms=delay_ms,
+                    stop_on_error=self.stop_on_error_var.get(),
+                    processes=self.processes_var.get(),
+                    pipeline_window=self.pipeline_window_var.get(),
+                    matcher=self.prompt_matcher,
+                    rate=rate,
+                    record_path=self._session_record_path() if self.record_session_var.get() else None
+                )
+            elif targets:
+                runner = MultiDeviceRunner(
+                    targets,
+                    timeout=self.timeout_var.get(),
+                    max_workers=self.max_workers_var.get(),
+                    log=self.log_manager.write_log,
+                    on_result=self._on_result,
+                    stop_event=self.stop_event,
+                    delay_ms=delay_ms,
+                    stop_on_error=self.stop_on_error_var.get(),
+                    pool=self.connection_pool,
+                    pipeline_window=self.pipeline_window_var.get(),
+                    matcher=self.prompt_matcher,
+                    rate=rate
+                )
+            else:
+                runner = self._create_runner(delay_ms, rate)
+            self.run_metrics.start(runner, plan.command_count * loop_count * (len(targets) or 1))
+            runner.run(plan, loop_count, on_progress=on_progress)
 
             # 重置进度条并更新状态
-            self.after(0, lambda: self.progress_var.set(0))
-            self.after(0, lambda: self.update_status("执行完成"))
+            self.progress.finish("执行完成")
 
         except Exception as e:
             self.log_manager.write_log(f"执行过程中出错: {str(e)}")
-            self.after(0, lambda: self.update_status("执行出错"))
-            self.after(0, lambda: self.progress_var.set(0))
+            self.progress.finish("执行出错")
 
         finally:
+            self.run_metrics.finish()
+            self._close_session_recorder()
+            # 出错时也保存已经执行的结果
+            if self.result_store:
+                self.result_store.finish_run()
+            self.generate_output_files()
+            self.log_manager.close_log_file()
             self.stop_event.clear()
 
+    def _create_runner(self, delay_ms, rate=0):
+        """为当前单一连接创建命令执行器"""
+        return CommandRunner(
+            self.telnet_manager,
+            log=self.log_manager.write_log,
+            on_result=self._on_result,
+            stop_event=self.stop_event,
+            delay_ms=delay_ms,
+            stop_on_error=self.stop_on_error_var.get(),
+            pool=self.connection_pool,
+            pipeline_window=self.pipeline_window_var.get(),
+            rate=rate
+        )
+
     def execute_one_command(self, command_str, delay_ms):
         """执行单条命令"""
-        try:
-            # 执行命令前记录
-            self.log_manager.write_log(f"命令: {command_str}")
-            
-            # 执行命令
-            start_time = time.time()
-            output, success = self.telnet_manager.execute_command(command_str)
-            elapsed = time.time() - start_time
-            
-            # 格式化输出
-            if output:
-                # 直接写入原始输出，保持格式
-                lines = str(output).splitlines()
-                for line in lines:
-                    line = line.strip()
-                    if line and not line.startswith('CIG-EVK-G2:>'):  # 跳过命令提示符
-                        if line.startswith('Cmd:'):
-                            self.log_manager.write_log(line, "NORMAL")
-                        elif line.startswith('Data:'):
-                            self.log_manager.write_log(line, "NORMAL")
-                        elif line.startswith('Result:'):
-                            tag = "RESULT_PASS" if "pass" in line.lower() else "RESULT_FAIL"
-                            self.log_manager.write_log(line, tag)
-            
-            # 记录执行时间
-            self.log_manager.write_log(f"命令执行时间: {elapsed:.3f} 秒\n")
-            
-            # 解析输出用于统计和Excel
-            data_val, result_val = self.parse_telnet_output(output)
-            
-            # 记录到Excel数据
-            self.excel_data.append([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                command_str,
-                data_val,
-                result_val
-            ])
-            
-            # 执行延迟
-            if delay_ms > 0:
-                time.sleep(delay_ms / 1000)
-            
-            return success
-
-        except Exception as e:
-            self.log_manager.write_log(f"执行命令 '{command_str}' 时出错: {str(e)}")
-            return False
+        return self._create_runner(delay_ms).execute_one_command(command_str)
 
     def parse_telnet_output(self, output):
         """解析Telnet输出"""
-        data_val = ""
-        result_val = ""
+        return parse_telnet_output(output)
 
-        if output:
-            lines = str(output).splitlines()
-            for line in lines:
-                line = line.strip()
-                if line.startswith("Data:"):
-                    data_val = line[5:].strip()  # 去掉"Data:"前缀
-                elif line.startswith("Result:"):
-                    result_val = line[7:].strip()  # 去掉"Result:"前缀
+    def update_progress(self, current, total):
+        """更新进度，可在任意线程调用，界面在下一次定时刷新时显示"""
+        self.progress.update(current, total)
+
+    def _poll_progress(self):
+        """定时读取进度快照，有变化时才更新进度条和状态"""
+        version, current, total, status = self.progress.read()
+        if version != self._progress_version:
+            self._progress_version = version
+            self.progress_var.set(current * 100 / total if total > 0 else 0)
+            self.status_var.set(status)
+        self.after(self.PROGRESS_POLL_MS, self._poll_progress)
+
+    def _open_excel_exporter(self, header):
+        """需要生成Excel时创建导出器，结果边执行边写入文件"""
+        self.excel_exporter = None
+        mode = self.output_mode_var.get()
+        if mode in ("excel", "both") and self.excel_file_path:
+            try:
+                self.excel_exporter = StreamingExcelExporter(self.excel_file_path, header=header)
+            except Exception as e:
+                self.log_manager.write_log(f"无法创建Excel文件：{e}")
+
+    def _open_result_store(self):
+        """按设置打开结果数据库，路径未变时继续使用已打开的数据库"""
+        db_path = self.result_db_var.get().strip()
+        store = self.result_store
+        if store and store.db_path == db_path:
+            return
+        if store:
+            store.close()
+            self.result_store = None
+        if not db_path:
+            return
+        try:
+            self.result_store = ResultStore(
+                db_path,
+                on_error=lambda e: self.log_manager.write_log(f"写入结果数据库失败：{e}")
+            )
+        except Exception as e:
+            self.log_manager.write_log(f"无法打开结果数据库：{e}")
 
-        return data_val, result_val
+    def _session_record_path(self):
+        return (self.log_file_path or new_log_file_path(self.log_dir_var.get())).replace(".txt", ".tsr")
 
-    def update_progress(self, current, total):
-        """更新进度条"""
-        progress = (current / total) * 100 if total > 0 else 0
-        self.progress_var.set(progress)
-        self.update_status(f"正在执行: {current}/{total} ({progress:.1f}%)")
-        self.update_idletasks()
+    def _open_session_recorder(self):
+        """勾选录制会话时创建与日志同名的 .tsr 文件，当前连接和连接池中的会话都录制到该文件"""
+        self.session_recorder = None
+        if not self.record_session_var.get():
+            return
+        path = self._session_record_path()
+        try:
+            self.session_recorder = SessionRecorder(path)
+        except (OSError, ValueError) as e:
+            self.log_manager.write_log(f"无法创建会话录制文件：{e}")
+            return
+        if self.telnet_manager:
+            self.telnet_manager.recorder = self.session_recorder
+        self.connection_pool.set_recorder(self.session_recorder)
+        self.log_manager.write_log(f"会话录制到 {path}")
+
+    def _close_session_recorder(self):
+        recorder, self.session_recorder = self.session_recorder, None
+        if recorder is None:
+            return
+        if self.telnet_manager:
+            self.telnet_manager.recorder = None
+        self.connection_pool.set_recorder(None)
+        recorder.close()
+
+    def _open_metrics_exporters(self):
+        """按设置启动指标导出，设置未变时继续使用已启动的导出器"""
+        settings = (self.metrics_port_var.get(), self.metrics_host_var.get().strip(),
+                    self.metrics_textfile_var.get().strip(), self.metrics_interval_var.get())
+        if settings == self._metrics_settings:
+            return
+        self._close_metrics_exporters()
+        self._metrics_settings = settings
+        port, host, textfile, interval = settings
+        self.run_metrics.log_queue_depth = self.log_manager.queue_depth
+        if port > 0:
+            try:
+                server = MetricsHTTPServer(self.run_metrics, port, host or "127.0.0.1")
+                self.metrics_exporters.append(server)
+                self.log_manager.write_log(f"监控指标: http://{server.host}:{server.port}/metrics")
+            except OSError as e:
+                self.log_manager.write_log(f"无法启动监控指标HTTP服务：{e}")
+        if textfile:
+            self.metrics_exporters.append(MetricsTextfileWriter(
+                self.run_metrics, textfile, max(1, interval),
+                on_error=lambda e: self.log_manager.write_log(f"写入监控指标文件失败：{e}")
+            ))
+
+    def _close_metrics_exporters(self):
+        exporters, self.metrics_exporters = self.metrics_exporters, []
+        for exporter in exporters:
+            exporter.close()
+        self._metrics_settings = None
+
+    def _on_result(self, result):
+        """每条命令完成后的结果记录"""
+        if self.excel_exporter:
+            self.excel_exporter.append(result.to_row())
+        if self.result_store:
+            self.result_store.add(result)
+        self.chart_manager.record(result)
+        self.latency_stats.record(result)
+        self.run_metrics.record(result)
 
     def generate_output_files(self):
         """生成输出文件"""
-        mode = self.output_mode_var.get()
-        if mode in ("excel", "both") and self.excel_file_path:
-            if Workbook:
-                try:
-                    wb = Workbook()
-                    ws = wb.active
-                    ws.title = "测试结果"
-                    ws.append(["命令", "数据", "结果"])
-
-                    for row in self.excel_data:
-                        ws.append(row)
-
-                    wb.save(self.excel_file_path)
-                    self.log_manager.write_log(f"Excel文件已保存到 {self.excel_file_path}")
-                except Exception as e:
-                    self.log_manager.write_log(f"保存Excel文件失败：{e}")
-            else:
-                self.log_manager.write_log("openpyxl模块未安装，无法保存Excel文件。")
+        self._export_latency()
+        exporter, self.excel_exporter = self.excel_exporter, None
+        if exporter:
+            try:
+                exporter.add_sheet("命令耗时", LATENCY_HEADER, self.latency_stats.rows())
+                for path in exporter.close():
+                    self.log_manager.write_log(f"Excel文件已保存到 {path}")
+            except Exception as e:
+                self.log_manager.write_log(f"保存Excel文件失败：{e}，已执行的结果保存在 {exporter.journal_path}")
+
+    def _export_latency(self):
+        """执行结束时把耗时最长的命令写入日志，生成文件时另存完整的耗时统计CSV"""
+        lines = self.latency_stats.summary_lines()
+        if not lines:
+            return
+        self.log_manager.write_log("命令耗时统计（按 p99 排序）:")
+        for line in lines:
+            self.log_manager.write_log(line)
+        if self.log_file_path:
+            csv_path = self.log_file_path.replace(".txt", "_latency.csv")
+            try:
+                self.latency_stats.write_csv(csv_path)
+                self.log_manager.write_log(f"耗时统计已保存到 {csv_path}")
+            except OSError as e:
+                self.log_manager.write_log(f"保存耗时统计失败：{e}")
 
     def update_status(self, message):
-        """更新状态显示"""
-        self.status_var.set(message)
+        """更新状态显示，可在任意线程调用"""
+        self.progress.set_status(message)
 
     def on_closing(self):
         """关闭窗口时的处理"""
         self.stop_event.set()
         if self.telnet_thread and self.telnet_thread.is_alive():
             self.telnet_thread.join(timeout=2)
-        if self.telnet_manager:
-            self.telnet_manager.close()
+        self.connection_pool.close_all()
+        self._close_metrics_exporters()
+        if self.result_store:
+            self.result_store.close()
         self.destroy() 
\ No newline at end of file
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from .. import instrumentation
+
+
+class PhaseView(tk.Toplevel):
+    """
+    分阶段耗时窗口：开启计时后每 REFRESH_MS 毫秒刷新各阶段的次数、总耗时、平均、最大和占比
+    关闭窗口不会关闭计时
+    """
+    REFRESH_MS = 500
+    COLUMNS = ("阶段", "次数", "总耗时(ms)", "平均(us)", "最大(ms)", "占比", "说明")
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("分阶段耗时")
+        self.geometry("820x320")
+
+        toolbar = ttk.Frame(self)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        self.enabled_var = tk.BooleanVar(value=instrumentation.enabled)
+        ttk.Checkbutton(toolbar, text="启用计时", variable=self.enabled_var,
+                        command=self.toggle).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="清零", command=instrumentation.reset).pack(side=tk.LEFT, padx=2)
+        ttk.Button(toolbar, text="保存到文件", command=self.save).pack(side=tk.LEFT, padx=2)
+
+        self.tree = ttk.Treeview(self, columns=self.COLUMNS, show="headings")
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=260 if column == "说明" else 80,
+                             anchor=tk.W if column in ("阶段", "说明") else tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self._refresh()
+
+    def toggle(self):
+        instrumentation.enable(self.enabled_var.get())
+
+    def save(self):
+        file_path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".txt",
+            filetypes=[("文本文件", "*.txt"), ("JSON文件", "*.json")]
+        )
+        if not file_path:
+            return
+        try:
+            instrumentation.dump(file_path)
+        except OSError as e:
+            messagebox.showerror("错误", f"保存失败：{e}", parent=self)
+
+    def _refresh(self):
+        if not self.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for item in instrumentation.snapshot():
+            self.tree.insert("", tk.END, values=(
+                item["phase"], item["count"], f"{item['total'] * 1000:.1f}",
+                f"{item['mean'] * 1000000:.1f}", f"{item['max'] * 1000:.2f}",
+                f"{item['share']:.1%}", instrumentation.PHASES.get(item["phase"], "")
+            ))
+        self.after(self.REFRESH_MS, self._refresh)
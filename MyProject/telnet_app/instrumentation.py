@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# instrumentation.py
+
+"""
+执行路径分阶段计时，用于判断执行慢在设备、socket、解析、日志队列还是界面线程
+
+默认关闭。埋点处先检查模块属性 enabled，关闭时只多一次属性读取：
+
+    if instrumentation.enabled:
+        start = time.perf_counter()
+    ...
+    if instrumentation.enabled:
+        instrumentation.record("parse", time.perf_counter() - start)
+"""
+
+import json
+import time
+from threading import Lock
+
+# 阶段 -> 说明，按执行路径的顺序排列
+PHASES = {
+    "execute": "TelnetManager.execute_command 总耗时（含线程切换）",
+    "send": "发送命令（write + drain）",
+    "wait": "等待设备返回提示符",
+    "parse": "解析命令输出",
+    "log_enqueue": "日志行放入队列",
+    "log_drain": "界面线程写入日志控件",
+    "excel_append": "Excel 追加一行",
+}
+
+enabled = False
+
+_lock = Lock()
+_stats = {}  # 阶段 -> [次数, 总耗时, 最大耗时]
+_started = time.perf_counter()
+
+
+def enable(on=True):
+    """开启或关闭计时，开启时清零已有数据"""
+    global enabled
+    if on and not enabled:
+        reset()
+    enabled = on
+
+
+def reset():
+    global _started
+    with _lock:
+        _stats.clear()
+        _started = time.perf_counter()
+
+
+def record(phase, seconds):
+    """累加一次阶段耗时（秒），可在任意线程调用"""
+    with _lock:
+        item = _stats.get(phase)
+        if item is None:
+            _stats[phase] = [1, seconds, seconds]
+        else:
+            item[0] += 1
+            item[1] += seconds
+            if seconds > item[2]:
+                item[2] = seconds
+
+
+def snapshot():
+    """
+    返回各阶段的统计，按 PHASES 的顺序排列
+    [{"phase", "count", "total", "mean", "max", "share"}, ...]；耗时单位为秒，share 为该阶段占计时时长的比例
+    """
+    with _lock:
+        items = {phase: list(values) for phase, values in _stats.items()}
+        wall = time.perf_counter() - _started
+    order = list(PHASES) + sorted(phase for phase in items if phase not in PHASES)
+    result = []
+    for phase in order:
+        if phase not in items:
+            continue
+        count, total, max_seconds = items[phase]
+        result.append({
+            "phase": phase,
+            "count": count,
+            "total": total,
+            "mean": total / count,
+            "max": max_seconds,
+            "share": total / wall if wall > 0 else 0.0,
+        })
+    return result
+
+
+def format_lines(items=None):
+    """格式化为文本表格的各行"""
+    items = snapshot() if items is None else items
+    lines = [f"{'阶段':<14} {'次数':>9} {'总耗时(ms)':>12} {'平均(us)':>10} {'最大(ms)':>10} {'占比':>7}"]
+    for item in items:
+        lines.append(
+            f"{item['phase']:<14} {item['count']:>9} {item['total'] * 1000:>12.1f} "
+            f"{item['mean'] * 1000000:>10.1f} {item['max'] * 1000:>10.2f} {item['share']:>7.1%}"
+        )
+    return lines
+
+
+def dump(file_path):
+    """保存到文件：.json 保存为 JSON，其他扩展名保存为文本表格"""
+    items = snapshot()
+    with open(file_path, "w", encoding="utf-8") as f:
+        if file_path.lower().endswith(".json"):
+            json.dump({"phases": items}, f, indent=4, ensure_ascii=False)
+        else:
+            f.write("\n".join(format_lines(items)) + "\n")
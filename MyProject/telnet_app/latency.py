@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+# latency.py
+
+"""
+命令耗时统计：按命令和按设备的耗时直方图，给出 p50 / p95 / p99 / max
+"""
+
+import csv
+from array import array
+from threading import Lock
+
+LATENCY_HEADER = ["类型", "名称", "次数", "p50(ms)", "p95(ms)", "p99(ms)", "max(ms)"]
+
+
+class LatencyHistogram:
+    """
+    HDR 风格的对数分桶直方图，内存固定（约 4KB），与记录次数无关
+    - 以微秒为单位，小于 2^SUB_BITS 微秒的值精确记录，更大的值每个 2 的幂区间分为 2^(SUB_BITS-1) 个桶，
+      相对误差不超过 1/2^(SUB_BITS-1)（SUB_BITS 为 5 时为 1/16，约 6.25%）
+    - 超过 2^MAX_BITS 微秒（约 19 小时）的值计入最后一个桶；max 为精确值
+    """
+    SUB_BITS = 5
+    MAX_BITS = 36
+
+    __slots__ = ("counts", "count", "max_us", "sum_us")
+
+    _HALF = 1 << (SUB_BITS - 1)
+    _SIZE = (MAX_BITS - SUB_BITS + 2) * _HALF
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * self._SIZE))
+        self.count = 0
+        self.max_us = 0
+        self.sum_us = 0
+
+    @classmethod
+    def _index(cls, value):
+        shift = value.bit_length() - cls.SUB_BITS
+        if shift <= 0:
+            return value
+        return min(shift * cls._HALF + (value >> shift), cls._SIZE - 1)
+
+    @classmethod
+    def _upper(cls, index):
+        """桶内最大的值（微秒）"""
+        if index < 2 * cls._HALF:
+            return index
+        shift = index // cls._HALF - 1
+        return ((index - shift * cls._HALF + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = int(seconds * 1000000)
+        if value < 0:
+            value = 0
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum_us += value
+        if value > self.max_us:
+            self.max_us = value
+
+    def merge(self, other):
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.count += other.count
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def copy(self):
+        histogram = LatencyHistogram()
+        histogram.counts = array("Q", self.counts)
+        histogram.count = self.count
+        histogram.max_us = self.max_us
+        histogram.sum_us = self.sum_us
+        return histogram
+
+    def cumulative(self, bounds):
+        """
+        不超过各上限（秒，升序）的记录数，用于导出固定分桶的直方图
+        上限落在某个桶内时整个桶都计入，误差与直方图精度相同
+        """
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            limit = self._index(int(bound * 1000000)) if bound != float("inf") else self._SIZE - 1
+            while index <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def percentile(self, percent):
+        """第 percent 百分位的耗时（秒），没有记录时返回 0"""
+        if not self.count:
+            return 0.0
+        target = max(1, -(-self.count * percent // 100))  # 向上取整
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= target:
+                return min(self._upper(index), self.max_us) / 1000000
+        return self.max_us / 1000000
+
+    @property
+    def max(self):
+        return self.max_us / 1000000
+
+    @property
+    def sum(self):
+        return self.sum_us / 1000000
+
+
+class LatencyStats:
+    """
+    按命令、按设备汇总耗时，record 可在多个执行线程中调用
+    - default_host：结果记录中没有 host 时（单设备执行）使用的设备名
+    - take_changed() 返回上次调用后有新记录的 (类型, 名称)，供界面只刷新变化的行
+    """
+    def __init__(self, default_host=None):
+        self.default_host = default_host
+        self.by_command = {}
+        self.by_host = {}
+        self._changed = set()
+        self._lock = Lock()
+
+    def record(self, result):
+        """
+        记录一条 CommandResult 的耗时，等待提示符超时的命令不计入
+        模板展开的命令按模板汇总（result.source），扫描上百万个参数值也只占用一个直方图
+        """
+        if result.timed_out:
+            return
+        host = result.host or self.default_host
+        command = result.source or result.command
+        with self._lock:
+            histogram = self.by_command.get(command)
+            if histogram is None:
+                histogram = self.by_command[command] = LatencyHistogram()
+            histogram.record(result.elapsed)
+            self._changed.add(("命令", command))
+            if host:
+                histogram = self.by_host.get(host)
+                if histogram is None:
+                    histogram = self.by_host[host] = LatencyHistogram()
+                histogram.record(result.elapsed)
+                self._changed.add(("设备", host))
+
+    def reset(self, default_host=None):
+        with self._lock:
+            self.default_host = default_host
+            self.by_command.clear()
+            self.by_host.clear()
+            self._changed.clear()
+
+    def take_changed(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def row(self, kind, name):
+        """一行统计：类型、名称、次数和各百分位耗时（毫秒）"""
+        with self._lock:
+            histogram = (self.by_command if kind == "命令" else self.by_host).get(name)
+            if histogram is None:
+                return None
+            return [
+                kind, name, histogram.count,
+                round(histogram.percentile(50) * 1000, 1),
+                round(histogram.percentile(95) * 1000, 1),
+                round(histogram.percentile(99) * 1000, 1),
+                round(histogram.max * 1000, 1),
+            ]
+
+    def rows(self):
+        """全部统计行，命令在前、设备在后，各自按名称排序"""
+        with self._lock:
+            keys = [("命令", name) for name in sorted(self.by_command)]
+            keys += [("设备", name) for name in sorted(self.by_host)]
+        return [self.row(kind, name) for kind, name in keys]
+
+    def summary_lines(self, limit=10):
+        """按 p99 从高到低的前 limit 条命令，用于写入日志"""
+        rows = sorted((row for row in self.rows() if row[0] == "命令"), key=lambda row: row[5], reverse=True)
+        return [
+            f"{row[1]}: 次数 {row[2]}，p50 {row[3]} ms，p95 {row[4]} ms，p99 {row[5]} ms，max {row[6]} ms"
+            for row in rows[:limit]
+        ]
+
+    def write_csv(self, file_path):
+        with open(file_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(LATENCY_HEADER)
+            writer.writerows(self.rows())
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# log_index.py
+
+"""
+日志文件索引，用于浏览很大的 telnet_log_*.txt 文件
+不依赖 Tk，整个文件不会一次读入内存
+"""
+
+import mmap
+from array import array
+from bisect import bisect_right
+from threading import Thread, Lock
+
+COMMAND_MARKER = "] 命令: ".encode("utf-8")
+RESULT_MARKER = b"Result:"
+
+
+class LogIndex:
+    """
+    以只读 mmap 方式打开日志文件，后台线程建立行偏移索引
+    - 每 STEP 行记录一个起始偏移（稀疏索引），内存占用约为 行数/STEP*8 字节
+    - 索引建立过程中即可读取已索引的行，line_count 随之增长，done 为 True 表示索引完成
+    - 打开时文件的大小即为可浏览的范围，之后追加的内容不可见
+    """
+    STEP = 64
+    CHUNK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self.size = self._file.seek(0, 2)
+        # 空文件不能 mmap
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self._offsets = array("Q", [0])
+        self._line_count = 0
+        self._lock = Lock()
+        self._closed = False
+        self.done = False
+        self._thread = Thread(target=self._build, name="log-index", daemon=True)
+        self._thread.start()
+
+    @property
+    def line_count(self):
+        """已索引的行数"""
+        return self._line_count
+
+    @property
+    def progress(self):
+        """索引进度 0.0 ~ 1.0"""
+        if self.done or not self.size:
+            return 1.0
+        with self._lock:
+            return self._offsets[-1] / self.size if self._line_count else 0.0
+
+    def _build(self):
+        mm = self._mm
+        step = self.STEP
+        pos = 0
+        count = 0
+        try:
+            while mm is not None and pos < self.size and not self._closed:
+                end = min(pos + self.CHUNK_SIZE, self.size)
+                chunk = mm[pos:end]
+                checkpoints = []
+                i = chunk.find(b"\n")
+                while i != -1:
+                    count += 1
+                    if count % step == 0:
+                        checkpoints.append(pos + i + 1)
+                    i = chunk.find(b"\n", i + 1)
+                with self._lock:
+                    self._offsets.extend(checkpoints)
+                    self._line_count = count
+                pos = end
+            # 最后一行没有换行符
+            if mm is not None and not self._closed and mm[self.size - 1:self.size] != b"\n":
+                self._line_count = count + 1
+        except (ValueError, OSError):
+            # 索引过程中调用了 close()
+            pass
+        finally:
+            self.done = True
+
+    def _line_start(self, line_no):
+        """line_no（从0开始）所在行的起始偏移，line_no 须已索引"""
+        mm = self._mm
+        with self._lock:
+            offset = self._offsets[line_no // self.STEP]
+        for _ in range(line_no % self.STEP):
+            offset = mm.find(b"\n", offset) + 1
+        return offset
+
+    def get_lines(self, start, count):
+        """读取从 start 行（从0开始）起的最多 count 行，返回字符串列表"""
+        end = min(start + count, self._line_count)
+        if start < 0 or start >= end:
+            return []
+        mm = self._mm
+        offset = self._line_start(start)
+        lines = []
+        for _ in range(end - start):
+            next_nl = mm.find(b"\n", offset)
+            stop = next_nl if next_nl != -1 else self.size
+            lines.append(mm[offset:stop].rstrip(b"\r").decode("utf-8", errors="replace"))
+            offset = stop + 1
+        return lines
+
+    def line_of_offset(self, offset):
+        """字节偏移所在的行号"""
+        with self._lock:
+            index = bisect_right(self._offsets, offset) - 1
+            start = self._offsets[index]
+        return index * self.STEP + self._mm[start:offset].count(b"\n")
+
+    def find_next_fail(self, start_line):
+        """
+        从 start_line 的下一行开始查找 Result 不为 pass 的行，返回行号，没有时返回 None
+        判断规则与执行时日志着色相同
+        """
+        if self._mm is None or start_line + 1 >= self._line_count:
+            return None
+        mm = self._mm
+        pos = self._line_start(start_line + 1)
+        while True:
+            i = mm.find(RESULT_MARKER, pos)
+            if i == -1:
+                return None
+            line_end = mm.find(b"\n", i)
+            if line_end == -1:
+                line_end = self.size
+            if b"pass" not in mm[i:line_end].lower():
+                line_no = self.line_of_offset(i)
+                return line_no if line_no < self._line_count else None
+            pos = line_end
+
+    def filter_command(self, text, cancel=None):
+        """
+        查找命令中包含 text 的执行记录，返回行号区间列表 [(起始行, 结束行), ...]（结束行不包含）
+        一条记录从 "命令: xxx" 行开始，到下一条 "命令:" 行之前结束
+        多设备同时执行时各设备的日志交错，区间只能近似对应单条命令
+        cancel：threading.Event，置位后提前返回 None
+        """
+        if self._mm is None:
+            return []
+        mm = self._mm
+        text = text.lower()
+        ranges = []
+        current = None
+        pos = 0
+        prev_start = 0
+        prev_line = 0
+        while True:
+            if cancel is not None and cancel.is_set():
+                return None
+            i = mm.find(COMMAND_MARKER, pos)
+            if i == -1:
+                break
+            line_start = mm.rfind(b"\n", 0, i) + 1
+            prev_line += mm[prev_start:line_start].count(b"\n")
+            prev_start = line_start
+            if current is not None:
+                ranges.append((current, prev_line))
+                current = None
+            line_end = mm.find(b"\n", i)
+            if line_end == -1:
+                line_end = self.size
+            command = mm[i + len(COMMAND_MARKER):line_end].decode("utf-8", errors="replace")
+            if text in command.strip().lower():
+                current = prev_line
+            pos = line_end
+        if current is not None:
+            total = prev_line + mm[prev_start:].count(b"\n")
+            if mm[self.size - 1:self.size] != b"\n":
+                total += 1
+            ranges.append((current, total))
+
+        # 合并相邻的区间
+        merged = []
+        for start, end in ranges:
+            if merged and merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    def close(self):
+        self._closed = True
+        self._thread.join()
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
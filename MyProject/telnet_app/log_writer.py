@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# log_writer.py
+
+"""
+日志格式化与日志文件输出，GUI 和命令行共用
+"""
+
+import os
+import time
+from datetime import datetime
+from queue import Queue, Empty
+from threading import Thread
+
+
+def format_log_line(message, timestamp=None):
+    """
+    按日志格式生成一行文本
+    - Data: / Result: 行不带时间戳，缩进与上一行的 Cmd: 对齐
+    - 其他行前面加上 [时间戳]
+    """
+    lowered = message.lower()
+    if lowered.startswith('data:') or lowered.startswith('result:'):
+        return f"                      {message}"
+    if timestamp is None:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return f"[{timestamp}] {message}"
+
+
+def new_log_file_path(log_dir):
+    """在 log_dir 下生成本次执行的日志文件路径 telnet_log_<时间>.txt，目录不存在时自动创建"""
+    os.makedirs(log_dir, exist_ok=True)
+    current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(log_dir, f"telnet_log_{current_time}.txt")
+
+
+class LogFileWriter:
+    """
+    后台日志文件写入器
+    - write() 只把日志行放入队列，可在任意线程（包括 Tk 主线程）调用，不做磁盘 I/O
+    - 后台线程保持文件打开，批量写入；缓冲超过 flush_bytes 或距上次刷新超过 flush_interval 秒时刷新到磁盘
+    - 文件超过 max_bytes 字节（按写入的字符数估算）或已写入 rotate_interval 秒后切换到新文件 xxx_2.txt、xxx_3.txt ...（为0时不切换）
+    - on_error：写入失败时的回调 on_error(异常)
+    """
+    _STOP = object()
+    BATCH_LINES = 1000
+
+    def __init__(self, file_path, flush_interval=0.5, flush_bytes=64 * 1024,
+                 max_bytes=0, rotate_interval=0, on_error=None):
+        self.file_path = file_path
+        self.current_path = file_path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.on_error = on_error
+        self.files = []
+        self._queue = Queue()
+        self._file_index = 1
+        self._thread = Thread(target=self._run, name="log-file-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        """追加一行日志（不含换行符）"""
+        self._queue.put(line)
+
+    @property
+    def pending(self):
+        """队列中等待写入的行数"""
+        return self._queue.qsize()
+
+    def close(self, timeout=5):
+        """写完队列中剩余的日志并关闭文件"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def _open_next(self):
+        """打开下一个日志文件；打开失败时抛出 OSError，current_path 和 files 保持不变"""
+        path = self.file_path
+        if self._file_index > 1:
+            base, ext = os.path.splitext(self.file_path)
+            path = f"{base}_{self._file_index}{ext}"
+        f = open(path, "a", encoding="utf-8")
+        self._file_index += 1
+        self.current_path = path
+        self.files.append(path)
+        return f
+
+    def _run(self):
+        try:
+            f = self._open_next()
+        except OSError as e:
+            self._report(e)
+            return
+
+        opened_at = time.monotonic()
+        last_flush = opened_at
+        unflushed = 0
+        written = f.tell()
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                item = None
+
+            # 一次取出队列中已有的日志（最多 BATCH_LINES 行），合并为一次写入
+            batch = []
+            while item is not None:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.BATCH_LINES:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    item = None
+
+            try:
+                if batch:
+                    data = "\n".join(batch) + "\n"
+                    f.write(data)
+                    unflushed += len(data)
+                    written += len(data)
+
+                now = time.monotonic()
+                if unflushed and (stopping or unflushed >= self.flush_bytes or now - last_flush >= self.flush_interval):
+                    f.flush()
+                    unflushed = 0
+                    last_flush = now
+
+                if not stopping and ((self.max_bytes and written >= self.max_bytes) or
+                                     (self.rotate_interval and now - opened_at >= self.rotate_interval)):
+                    opened_at = now
+                    written = 0
+                    # 先打开新文件再关闭旧文件；打开失败时继续写入当前文件，到下一次切换条件满足时再试
+                    try:
+                        next_file = self._open_next()
+                    except OSError as e:
+                        self._report(e)
+                    else:
+                        previous, f = f, next_file
+                        unflushed = 0
+                        previous.close()
+            except OSError as e:
+                self._report(e)
+
+        f.close()
+
+    def _report(self, error):
+        if self.on_error:
+            try:
+                self.on_error(error)
+            except Exception:
+                pass
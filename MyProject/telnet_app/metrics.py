@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+# metrics.py
+
+"""
+执行指标导出为 OpenMetrics / Prometheus 文本格式，供实验室监控面板采集
+- MetricsHTTPServer：本地 HTTP 端点 /metrics
+- MetricsTextfileWriter：定期重写文本文件，供 node_exporter 的 textfile collector 读取
+采集在各自的后台线程中完成，执行线程只在每条命令完成时累加一次计数
+"""
+
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Event, Lock
+
+from .latency import LatencyHistogram
+
+# 命令耗时直方图的分桶上限（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class RunMetrics:
+    """
+    执行指标
+    - record() / progress() 由执行线程调用，只在锁内累加计数
+    - 计数器（命令数、通过/失败数、耗时直方图）在程序运行期间单调递增，不随每次执行清零；
+      本次执行的计划命令数和已完成数作为 gauge 导出
+    - runner：当前的 CommandRunner / MultiDeviceRunner，采集时读取其在途命令数和重连次数；
+      读取和结束时的累加都在 _lock 内完成（runner 的这两个属性只取自身的锁，不会反过来等待 _lock）
+    - log_queue_depth：返回日志队列长度的函数
+    """
+    def __init__(self, prefix="telnet"):
+        self.prefix = prefix
+        self.runner = None
+        self.log_queue_depth = None
+        self._lock = Lock()
+        self._results = {"pass": 0, "fail": 0, "none": 0}
+        self._latency = LatencyHistogram()
+        self._reconnects = 0
+        self._runs = 0
+        self._running = False
+        self._planned = 0
+        self._done = 0
+
+    def start(self, runner, planned=0):
+        """开始一次执行"""
+        with self._lock:
+            self.runner = runner
+            self._runs += 1
+            self._running = True
+            self._planned = planned
+            self._done = 0
+
+    def finish(self):
+        """结束一次执行，把本次的重连次数计入累计值"""
+        with self._lock:
+            if self.runner is not None:
+                self._reconnects += self.runner.reconnects
+            self.runner = None
+            self._running = False
+
+    def progress(self, current, total):
+        with self._lock:
+            self._done = current
+            self._planned = total
+
+    def record(self, result):
+        """累加一条 CommandResult，等待提示符超时的命令只计数，不计入耗时"""
+        key = "pass" if result.passed else "fail" if result.failed else "none"
+        with self._lock:
+            self._results[key] += 1
+            if not result.timed_out:
+                self._latency.record(result.elapsed)
+
+    def render(self, openmetrics=True):
+        """
+        生成指标文本
+        openmetrics 为 False 时生成 Prometheus 0.0.4 格式（计数器的 TYPE 名带 _total，没有 # EOF）
+        """
+        with self._lock:
+            results = dict(self._results)
+            latency = self._latency.copy()
+            reconnects = self._reconnects
+            runs = self._runs
+            running = self._running
+            planned = self._planned
+            done = self._done
+            in_flight = 0
+            if self.runner is not None:
+                in_flight = self.runner.in_flight
+                reconnects += self.runner.reconnects
+        queue_depth = self.log_queue_depth() if self.log_queue_depth else 0
+
+        lines = []
+        prefix = self.prefix
+
+        def family(name, kind, help_text, samples):
+            type_name = name if openmetrics or kind != "counter" else f"{name}_total"
+            lines.append(f"# HELP {type_name} {help_text}")
+            lines.append(f"# TYPE {type_name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else ""
+                lines.append(f"{name}{suffix}{label_text} {_format_value(value)}")
+
+        family(f"{prefix}_commands", "counter", "按结果统计的已执行命令数",
+               [("_total", (("result", key),), value) for key, value in results.items()])
+        family(f"{prefix}_reconnects", "counter", "连接中断后的重连次数",
+               [("_total", (), reconnects)])
+        family(f"{prefix}_runs", "counter", "执行次数", [("_total", (), runs)])
+        family(f"{prefix}_run_active", "gauge", "正在执行时为 1", [("", (), int(running))])
+        family(f"{prefix}_run_commands_planned", "gauge", "本次执行计划的命令数",
+               [("", (), planned)])
+        family(f"{prefix}_run_commands_done", "gauge", "本次执行已完成的命令数",
+               [("", (), done)])
+        family(f"{prefix}_inflight_commands", "gauge", "已发送、尚未收到提示符的命令数",
+               [("", (), in_flight)])
+        family(f"{prefix}_log_queue_depth", "gauge", "等待写入的日志行数",
+               [("", (), queue_depth)])
+
+        buckets = latency.cumulative(LATENCY_BUCKETS)
+        samples = [("_bucket", (("le", _format_value(bound)),), count)
+                   for bound, count in zip(LATENCY_BUCKETS, buckets)]
+        samples.append(("_count", (), latency.count))
+        samples.append(("_sum", (), latency.sum))
+        family(f"{prefix}_command_duration_seconds", "histogram", "命令从发送到收到提示符的耗时", samples)
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHTTPServer:
+    """
+    在后台线程中提供 http://host:port/metrics
+    请求头 Accept 包含 application/openmetrics-text 时返回 OpenMetrics，否则返回 Prometheus 文本格式
+    port 为 0 时由系统分配端口，启动后从 port 属性读取
+    """
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/metrics", "/"):
+                    handler.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in handler.headers.get("Accept", "")
+                body = metrics.render(openmetrics).encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type",
+                                    OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host = host
+        self.port = self._server.server_address[1]
+        self._thread = Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsTextfileWriter:
+    """
+    每 interval 秒把指标写入 file_path（Prometheus 文本格式），先写临时文件再替换，
+    node_exporter 不会读到写了一半的文件；close() 时再写一次最终结果
+    - on_error：写入失败时的回调 on_error(异常)
+    """
+    def __init__(self, metrics, file_path, interval=15.0, on_error=None):
+        self.metrics = metrics
+        self.file_path = file_path
+        self.interval = interval
+        self.on_error = on_error
+        self._stop = Event()
+        self._thread = Thread(target=self._run, name="metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        temp_path = f"{self.file_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(self.metrics.render(openmetrics=False))
+            os.replace(temp_path, self.file_path)
+        except OSError as e:
+            if self.on_error:
+                try:
+                    self.on_error(e)
+                except Exception:
+                    pass
+
+    def close(self, timeout=5):
+        self._stop.set()
+        self._thread.join(timeout)
+        self.write()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
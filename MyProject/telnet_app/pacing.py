@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# pacing.py
+
+"""
+命令发送节奏控制，基于 time.monotonic，不受系统时间调整影响
+- IntervalPacer：相邻两条命令的发送时刻间隔固定，按计划时刻而不是上一条命令结束时刻计算，误差不累积
+- TokenBucketPacer：目标速率（条/秒），令牌在等待设备返回期间也在累积，实际速率不随设备响应时间变化
+等待都通过 stop_event.wait() 完成，设置 stop_event 后立即返回
+"""
+
+import time
+from threading import Event
+
+
+class IntervalPacer:
+    """
+    固定间隔：第 n 条命令在 第一条命令的发送时刻 + n * interval 发送
+    命令本身的耗时从间隔中扣除；落后超过一个间隔时（设备响应慢于间隔）从当前时刻重新计时，不连续补发
+    """
+    def __init__(self, interval, stop_event: Event = None):
+        self.interval = interval
+        self.stop_event = stop_event or Event()
+        self._next_at = None
+
+    def reset(self):
+        self._next_at = None
+
+    def wait(self):
+        """等到下一条命令的发送时刻，被 stop_event 中断时返回 False"""
+        now = time.monotonic()
+        if self._next_at is None:
+            self._next_at = now
+        elif self._next_at > now:
+            if self.stop_event.wait(self._next_at - now):
+                return False
+        elif now - self._next_at > self.interval:
+            self._next_at = now
+        self._next_at += self.interval
+        return not self.stop_event.is_set()
+
+
+class TokenBucketPacer:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积累 burst 个，每条命令消耗一个
+    burst 为 1 时命令严格按 1/rate 秒的节奏发送
+    """
+    def __init__(self, rate, burst=1, stop_event: Event = None):
+        if rate <= 0:
+            raise ValueError("目标速率必须大于 0")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.stop_event = stop_event or Event()
+        self.reset()
+
+    def reset(self):
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def wait(self):
+        """取得一个令牌，被 stop_event 中断时返回 False"""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return not self.stop_event.is_set()
+            if self.stop_event.wait((1 - self._tokens) / self.rate):
+                return False
+
+
+def make_pacer(delay_ms=0, rate=0, burst=1, stop_event: Event = None):
+    """
+    按设置创建节奏控制器：rate 大于 0 时按目标速率，否则 delay_ms 大于 0 时按固定间隔，都为 0 时返回 None
+    """
+    if rate and rate > 0:
+        return TokenBucketPacer(rate, burst, stop_event)
+    if delay_ms and delay_ms > 0:
+        return IntervalPacer(delay_ms / 1000.0, stop_event)
+    return None
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# progress.py
+
+"""
+执行进度快照：执行线程只写入最新的进度和状态，界面按固定周期读取
+界面的刷新开销取决于刷新频率，与命令执行速度无关，执行线程也不需要访问 Tk 对象
+"""
+
+from threading import Lock
+
+
+class ProgressSnapshot:
+    """
+    最新的进度和状态
+    - update() / set_status() / finish() 可在任意线程调用，只在锁内替换几个值
+    - read() 返回 (版本号, 已执行数, 总数, 状态)，版本号在每次修改后递增，界面据此跳过没有变化的刷新
+    """
+    def __init__(self, status="就绪"):
+        self._lock = Lock()
+        self._version = 0
+        self._current = 0
+        self._total = 0
+        self._status = status
+
+    def update(self, current, total):
+        """记录进度，状态随之变为 正在执行: x/y (z%)"""
+        with self._lock:
+            self._current = current
+            self._total = total
+            self._status = None
+            self._version += 1
+
+    def set_status(self, status):
+        with self._lock:
+            self._status = status
+            self._version += 1
+
+    def finish(self, status):
+        """执行结束：进度清零并显示最终状态"""
+        with self._lock:
+            self._current = 0
+            self._total = 0
+            self._status = status
+            self._version += 1
+
+    def read(self):
+        with self._lock:
+            current, total, status = self._current, self._total, self._status
+            version = self._version
+        if status is None:
+            percent = current * 100 / total if total > 0 else 0
+            status = f"正在执行: {current}/{total} ({percent:.1f}%)"
+        return version, current, total, status
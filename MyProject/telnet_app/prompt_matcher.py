@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# prompt_matcher.py
+
+"""
+在 Telnet 数据流中查找提示符、错误标记和分页提示
+"""
+
+import re
+from collections import deque, namedtuple
+
+PROMPT = "prompt"
+ERROR = "error"
+PAGER = "pager"
+
+DEFAULT_PROMPTS = ("CIG-EVK-G2:>",)
+DEFAULT_PAGERS = ("--More--",)
+PAGER_REPLY = b" "
+PATTERN_SEPARATOR = "|"  # 界面中多个模式之间的分隔符
+
+# kind：PROMPT / ERROR / PAGER；pattern：匹配到的字节串；end：匹配结束位置（不含）
+Match = namedtuple("Match", "kind pattern end")
+
+
+def split_patterns(text):
+    """把界面中输入的 "a | b" 拆分为模式列表"""
+    return [item.strip() for item in text.split(PATTERN_SEPARATOR) if item.strip()]
+
+
+def join_patterns(patterns):
+    return f" {PATTERN_SEPARATOR} ".join(patterns)
+
+
+def _to_bytes(pattern):
+    return pattern.encode("utf-8") if isinstance(pattern, str) else bytes(pattern)
+
+
+class PromptMatcher:
+    """
+    多模式匹配器（Aho-Corasick 自动机，预先展开为 256 路状态转移表）
+    - 每个字节只经过一次状态转移，数据分多次到达时从上次的状态继续，不重复扫描已读数据
+    - 同一位置结束的多个模式取最长的一个
+    - 匹配器本身只读，可在多个会话间共享；每次读取使用 scanner() 创建的独立扫描状态
+    """
+    def __init__(self, prompts=DEFAULT_PROMPTS, errors=(), pagers=DEFAULT_PAGERS):
+        self.patterns = []
+        for kind, items in ((PROMPT, prompts), (ERROR, errors), (PAGER, pagers)):
+            for item in items or ():
+                pattern = _to_bytes(item)
+                if pattern:
+                    self.patterns.append((kind, pattern))
+        if not any(kind == PROMPT for kind, _ in self.patterns):
+            raise ValueError("至少需要配置一个提示符")
+        self._build()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置字典中的 prompts / error_markers / pager_markers 创建"""
+        return cls(
+            config.get("prompts") or DEFAULT_PROMPTS,
+            config.get("error_markers") or (),
+            config.get("pager_markers", DEFAULT_PAGERS) or ()
+        )
+
+    @property
+    def prompts(self):
+        return [pattern for kind, pattern in self.patterns if kind == PROMPT]
+
+    def _build(self):
+        # 字典树
+        goto = [{}]
+        output = [None]
+        for index, (_, pattern) in enumerate(self.patterns):
+            state = 0
+            for byte in pattern:
+                next_state = goto[state].get(byte)
+                if next_state is None:
+                    goto.append({})
+                    output.append(None)
+                    next_state = len(goto) - 1
+                    goto[state][byte] = next_state
+                state = next_state
+            if output[state] is None:
+                output[state] = index
+
+        # 按层次遍历计算失败指针，同时展开完整的状态转移表
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = [goto[0].get(byte, 0) for byte in range(256)]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = delta[fail[state]]
+            delta[state] = [goto[state].get(byte, fallback[byte]) for byte in range(256)]
+            if output[state] is None:
+                output[state] = output[fail[state]]
+            for byte, next_state in goto[state].items():
+                fail[next_state] = fallback[byte]
+                queue.append(next_state)
+
+        self._delta = delta
+        self._output = output
+        # 处于初始状态时，用正则直接跳到下一个可能的模式首字节
+        first_bytes = b"".join(re.escape(bytes((byte,))) for byte in sorted(goto[0]))
+        self._first = re.compile(b"[" + first_bytes + b"]")
+
+    def scanner(self):
+        return PromptScanner(self)
+
+
+class PromptScanner:
+    """一次读取过程中的扫描状态"""
+    __slots__ = ("_delta", "_output", "_first", "_patterns", "state")
+
+    def __init__(self, matcher):
+        self._delta = matcher._delta
+        self._output = matcher._output
+        self._first = matcher._first
+        self._patterns = matcher.patterns
+        self.state = 0
+
+    def feed(self, data, start=0):
+        """
+        从 data[start:] 继续扫描，返回第一个匹配的 Match（end 为在 data 中的位置），没有时返回 None
+        匹配后状态复位，下一次 feed 从 match.end 开始即可
+        """
+        delta = self._delta
+        output = self._output
+        state = self.state
+        pos = start
+        end = len(data)
+        while pos < end:
+            if state == 0:
+                found = self._first.search(data, pos)
+                if found is None:
+                    break
+                pos = found.start()
+            state = delta[state][data[pos]]
+            pos += 1
+            if output[state] is not None:
+                self.state = 0
+                kind, pattern = self._patterns[output[state]]
+                return Match(kind, pattern, pos)
+        self.state = state
+        return None
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# result_parser.py
+
+"""
+命令输出解析：一次扫描同时得到日志行和结果记录，日志、Excel 和统计都使用同一条记录
+"""
+
+import time
+
+# 没有等到提示符时的错误标记，这样的命令记为失败，耗时不计入延迟统计
+PROMPT_TIMEOUT = "等待提示符超时"
+
+
+class CommandResult:
+    """
+    一条命令的执行结果
+    - timestamp：完成时间（time.time()），导出时才格式化
+    - elapsed：执行耗时（秒）
+    - raw_offset：该命令输出在本次连接收到的数据中的字节偏移
+    - host：多设备执行时的设备标识，单设备时为 None
+    - source：由模板展开的命令对应的模板（见 command_plan.Command），耗时统计按它汇总；普通命令为 None
+    """
+    __slots__ = ("timestamp", "command", "data", "result", "elapsed", "raw_offset", "host", "source")
+
+    def __init__(self, timestamp, command, data, result, elapsed, raw_offset=0, host=None, source=None):
+        self.timestamp = timestamp
+        self.command = command
+        self.data = data
+        self.result = result
+        self.elapsed = elapsed
+        self.raw_offset = raw_offset
+        self.host = host
+        self.source = source
+
+    @property
+    def passed(self):
+        return "pass" in self.result.lower()
+
+    @property
+    def failed(self):
+        """有结果且不是 pass；没有 Result 行的命令既不算通过也不算失败"""
+        return bool(self.result) and not self.passed
+
+    @property
+    def timed_out(self):
+        """等待提示符超时，elapsed 只是超时时间而不是设备的响应时间"""
+        return self.result == f"ERROR: {PROMPT_TIMEOUT}"
+
+    def time_text(self):
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.timestamp))
+
+    def to_row(self):
+        """Excel 行：时间、命令、数据、结果（多设备时再加设备）"""
+        if self.host:
+            return (self.time_text(), self.command, self.data, self.result, self.host)
+        return (self.time_text(), self.command, self.data, self.result)
+
+    def __repr__(self):
+        return (f"CommandResult({self.command!r}, data={self.data!r}, result={self.result!r}, "
+                f"elapsed={self.elapsed:.3f})")
+
+
+def parse_output(output):
+    """
+    逐行扫描一次命令输出，返回 (data, result, log_lines)
+    log_lines 为需要写入日志的 [(行, 标签), ...]，即 Cmd: / Data: / Result: 行
+    """
+    data_val = ""
+    result_val = ""
+    log_lines = []
+    if not output:
+        return data_val, result_val, log_lines
+
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("Data:"):
+            data_val = line[5:].strip()  # 去掉"Data:"前缀
+            log_lines.append((line, "NORMAL"))
+        elif line.startswith("Result:"):
+            result_val = line[7:].strip()  # 去掉"Result:"前缀
+            log_lines.append((line, "RESULT_PASS" if "pass" in result_val.lower() else "RESULT_FAIL"))
+        elif line.startswith("Cmd:"):
+            log_lines.append((line, "NORMAL"))
+    return data_val, result_val, log_lines
+
+
+def parse_telnet_output(output):
+    """解析Telnet输出，返回 (data, result)"""
+    data_val, result_val, _ = parse_output(output)
+    return data_val, result_val
+
+
+def parse_result(command, output, elapsed, host=None, error=None, raw_offset=0, source=None):
+    """
+    解析一条命令的输出，返回 (CommandResult, log_lines)
+    error：匹配到的错误标记，输出中没有 Result 时以 "ERROR: 标记" 作为结果；
+    等待提示符超时（PROMPT_TIMEOUT）时输出不完整，总是以 "ERROR: 等待提示符超时" 作为结果
+    """
+    data_val, result_val, log_lines = parse_output(output)
+    if error and (not result_val or error == PROMPT_TIMEOUT):
+        result_val = f"ERROR: {error}"
+    result = CommandResult(time.time(), command, data_val, result_val, elapsed, raw_offset, host, source)
+    return result, log_lines
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# result_store.py
+
+"""
+执行结果持久化到本地 SQLite 数据库，跨多次执行查询命令的失败率
+"""
+
+import os
+import sqlite3
+import time
+from queue import Queue, Empty
+from threading import Thread, Lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    commands_file TEXT,
+    targets TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER,
+    ts REAL NOT NULL,
+    host TEXT,
+    command TEXT NOT NULL,
+    data TEXT,
+    result TEXT,
+    elapsed REAL
+);
+CREATE INDEX IF NOT EXISTS idx_results_command ON results (command, result, ts);
+CREATE INDEX IF NOT EXISTS idx_results_host ON results (host, ts);
+"""
+
+
+class ResultStore:
+    """
+    结果数据库
+    - WAL 模式，查询不会阻塞写入
+    - add() 只把结果放入队列，后台线程按批写入：攒够 BATCH_ROWS 条或距上次提交超过 flush_interval 秒时提交一次事务
+    - 索引 (command, result, ts) 覆盖按命令统计失败率的查询，(host, ts) 用于按设备查询
+    - on_error：写入失败时的回调 on_error(异常)
+    """
+    _STOP = object()
+    BATCH_ROWS = 1000
+
+    def __init__(self, db_path, flush_interval=1.0, on_error=None):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.run_id = None
+        self._host = None
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        # 连接由调用线程（start_run / finish_run）和写入线程共用，用锁保证同时只有一方使用
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = Lock()
+        self._queue = Queue()
+        self._thread = Thread(target=self._run, name="result-store", daemon=True)
+        self._thread.start()
+
+    def start_run(self, commands_file=None, targets=None, host=None):
+        """
+        开始一次执行，返回 run_id
+        host：单设备执行时的设备标识，结果记录中没有 host 时使用它
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (started_at, commands_file, targets) VALUES (?, ?, ?)",
+                (time.time(), commands_file, targets)
+            )
+            self._conn.commit()
+        self.run_id = cursor.lastrowid
+        self._host = host
+        return self.run_id
+
+    def finish_run(self):
+        """记录本次执行的结束时间"""
+        if self.run_id is None:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+            self._conn.commit()
+        self.run_id = None
+
+    def add(self, result):
+        """追加一条 CommandResult，不在 start_run / finish_run 之间时 run_id 为空"""
+        self._queue.put((
+            self.run_id, result.timestamp, result.host or self._host, result.command,
+            result.data, result.result, result.elapsed
+        ))
+
+    def close(self, timeout=5):
+        """写完队列中剩余的结果并关闭数据库"""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        pending = []
+        last_commit = time.monotonic()
+        stopping = False
+        while not stopping:
+            wait = max(0.0, last_commit + self.flush_interval - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=wait)
+            except Empty:
+                item = None
+            # 取出队列中已有的结果
+            while item is not None:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                pending.append(item)
+                if len(pending) >= self.BATCH_ROWS:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    item = None
+
+            now = time.monotonic()
+            if pending and (stopping or len(pending) >= self.BATCH_ROWS or now - last_commit >= self.flush_interval):
+                try:
+                    with self._lock:
+                        with self._conn:
+                            self._conn.executemany(
+                                "INSERT INTO results (run_id, ts, host, command, data, result, elapsed) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                pending
+                            )
+                except sqlite3.Error as e:
+                    self._report(e)
+                pending = []
+                last_commit = now
+
+    def _report(self, error):
+        if self.on_error:
+            try:
+                self.on_error(error)
+            except Exception:
+                pass
+
+
+def failure_rates(db_path, days=30, command=None, host=None):
+    """
+    统计最近 days 天内各命令的执行次数和失败率，返回按命令排序的列表
+    [{"command", "total", "passed", "failed", "rate"}, ...]
+    command / host 不为 None 时只统计该命令 / 设备；通过与失败的判断与 CommandResult 相同
+    """
+    sql = "SELECT command, result, COUNT(*) FROM results WHERE ts >= ?"
+    params = [time.time() - days * 86400]
+    if command is not None:
+        sql += " AND command = ?"
+        params.append(command)
+    if host is not None:
+        sql += " AND host = ?"
+        params.append(host)
+    sql += " GROUP BY command, result"
+
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"结果数据库不存在: {db_path}")
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    stats = {}
+    for command_str, result_val, count in rows:
+        item = stats.setdefault(command_str, {"command": command_str, "total": 0, "passed": 0, "failed": 0})
+        item["total"] += count
+        if result_val and "pass" in result_val.lower():
+            item["passed"] += count
+        elif result_val:
+            item["failed"] += count
+    for item in stats.values():
+        item["rate"] = item["failed"] / item["total"] if item["total"] else 0.0
+    return [stats[key] for key in sorted(stats)]
@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+# runner.py
+
+"""
+命令执行引擎：在单台设备上循环执行命令文件，或在多台设备上并发执行同一份命令
+"""
+
+import re
+import time
+from collections import deque
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from . import instrumentation
+from .telnet_manager import TelnetManager
+from .command_plan import Delay, compile_lines
+from .pacing import make_pacer
+from .result_parser import PROMPT_TIMEOUT, parse_result
+
+
+def parse_targets(text, default_port=81):
+    """
+    解析多设备目标列表，返回 [(host, port), ...]
+    - 目标之间可用逗号、分号、空格或换行分隔
+    - 未写端口的目标使用 default_port
+    """
+    targets = []
+    for item in re.split(r'[\s,;]+', text or ''):
+        if not item:
+            continue
+        host, sep, port = item.rpartition(':')
+        if not sep:
+            host, port = item, default_port
+        try:
+            port = int(port)
+        except ValueError:
+            raise ValueError(f"无效的目标地址: {item}")
+        if not host:
+            raise ValueError(f"无效的目标地址: {item}")
+        targets.append((host, port))
+    return targets
+
+
+class CommandRunner:
+    """
+    在一个 TelnetManager 上循环执行命令
+    - log：日志回调 log(message, tag)
+    - on_result：每条命令执行完成后调用，参数为 CommandResult
+    - host：多设备执行时的设备标识，设置后日志和结果记录都会带上它
+    - pool：连接池，设置后连接中断时会自动重连并重新执行当前命令
+    - delay_ms：相邻两条命令发送时刻的间隔（毫秒），扣除命令本身的耗时
+    - rate：目标速率（条/秒），大于 0 时代替 delay_ms，按令牌桶控制发送节奏
+    - pipeline_window：大于 1 时启用流水线模式，同时保持多条命令在途（仅在没有设置间隔和速率时生效）
+    Result 不是 Pass 的命令和输出中匹配到错误标记（见 PromptMatcher）的命令记为失败，stop_on_error 时停止执行
+    """
+    def __init__(self, telnet_manager, log=None, on_result=None, stop_event: Event = None,
+                 delay_ms=0, stop_on_error=False, host=None, pool=None, pipeline_window=1, rate=0):
+        self.telnet_manager = telnet_manager
+        self.log = log
+        self.on_result = on_result
+        self.stop_event = stop_event or Event()
+        self.delay_ms = delay_ms
+        self.rate = rate
+        self.pacer = make_pacer(delay_ms, rate, stop_event=self.stop_event)
+        self.stop_on_error = stop_on_error
+        self.host = host
+        self.pool = pool
+        self.pipeline_window = pipeline_window
+        self.executed = 0
+        self.failed = 0
+        self.reconnects = 0
+
+    @property
+    def in_flight(self):
+        return self.telnet_manager.in_flight
+
+    def _log(self, message, tag="NORMAL"):
+        if not self.log:
+            return
+        if self.host:
+            message = f"[{self.host}] {message}"
+        self.log(message, tag)
+
+    def run(self, plan, loop_count=1, on_progress=None):
+        """
+        按 loop_count 循环执行命令
+        - plan：CommandPlan，也可以直接传入命令字符串列表
+        - on_progress：每条命令完成后调用 on_progress(已执行数, 总数)
+        """
+        if not hasattr(plan, 'steps'):
+            plan = compile_lines(plan)
+        total_commands = plan.command_count * loop_count
+        pipelined = self.pipeline_window > 1 and self.pacer is None
+        if self.pipeline_window > 1 and not pipelined:
+            self._log("设置了命令间隔或目标速率，不使用流水线模式")
+
+        for loop in range(loop_count):
+            if self.stop_event.is_set():
+                self._log("用户终止执行。")
+                break
+
+            loop_start = time.monotonic()
+            self._log(f"\n=== 开始第 {loop + 1} 轮执行 ===\n")
+
+            results = self._iter_steps(plan.iter_steps(), pipelined)
+            try:
+                for success in results:
+                    self.executed += 1
+                    if on_progress:
+                        on_progress(self.executed, total_commands)
+
+                    if not success:
+                        self.failed += 1
+                        if not self.telnet_manager.is_connected:
+                            self._log("连接已断开，停止执行", "RESULT_FAIL")
+                            results.close()
+                            return
+                        if self.stop_on_error:
+                            self._log("检测到错误，停止执行")
+                            results.close()
+                            return
+            except InterruptedError:
+                self._log("用户终止执行，已中断正在等待返回的命令。")
+                return
+
+            loop_end = time.monotonic()
+            self._log(f"本轮执行时间: {loop_end - loop_start:.2f} 秒")
+
+    def _iter_steps(self, steps, pipelined):
+        """
+        按顺序执行一轮的命令和 DELAY 指令，每条命令完成后产出是否成功
+        steps 可以是 plan.iter_steps() 生成器，边执行边取下一步，不会一次展开
+        流水线模式下，两个 DELAY 之间的命令作为一批流水线执行
+        """
+        steps = iter(steps)
+        if not pipelined:
+            for step in steps:
+                if self.stop_event.is_set():
+                    return
+                if isinstance(step, Delay):
+                    self._delay(step)
+                    continue
+                if self.pacer and not self.pacer.wait():
+                    return
+                yield self.execute_one_command(step.text, step.line_no, step.source)
+            return
+
+        delay = []  # 结束当前批次的 DELAY 指令
+
+        def batch():
+            for step in steps:
+                if isinstance(step, Delay):
+                    delay.append(step)
+                    return
+                yield step
+
+        while not self.stop_event.is_set():
+            commands = batch()
+            yield from self._iter_pipelined(commands)
+            if self.stop_event.is_set():
+                return
+            # 批次提前结束时跳过其余命令，从下一个 DELAY 之后继续
+            for _ in commands:
+                pass
+            if not delay:
+                return
+            self._delay(delay.pop())
+
+    def _delay(self, step):
+        self._log(f"延时 {step.ms} 毫秒")
+        self.stop_event.wait(step.ms / 1000.0)
+
+    def _iter_pipelined(self, commands):
+        """
+        流水线执行，每条命令完成后产出是否成功
+        commands 按需逐条取出，只保留已发送但尚未收到返回的命令
+        连接中断时通过连接池重连，从第一条未收到返回的命令继续；
+        超时的命令记为失败且不再重发，之后重连会话（没有连接池时直接重连）继续执行
+        """
+        commands = iter(commands)
+        sent = deque()   # 已发送、尚未收到返回的命令
+        retry = deque()  # 重连后需要重新发送的命令
+
+        def source():
+            while True:
+                if retry:
+                    command = retry.popleft()
+                else:
+                    command = next(commands, None)
+                    if command is None:
+                        return
+                sent.append(command)
+                yield command.text
+
+        while not self.stop_event.is_set():
+            if not retry:
+                command = next(commands, None)
+                if command is None:
+                    return
+                retry.append(command)
+            timed_out = False
+            try:
+                pipeline = self.telnet_manager.execute_pipelined(source(), self.pipeline_window, self.stop_event)
+                for command_str, output, elapsed in pipeline:
+                    command = sent.popleft()
+                    self._log(f"命令: {command_str}")
+                    error = self.telnet_manager.last_error
+                    result = self._record(command_str, output, elapsed, error, command.source)
+                    if error == PROMPT_TIMEOUT:
+                        # 会话已被断开，接着会抛出 TimeoutError
+                        continue
+                    yield not error and not result.failed
+                return
+            except TimeoutError as e:
+                # 超时的命令已按 PROMPT_TIMEOUT 记录；重连之后才产出失败，调用方不会因连接已断开而停止执行
+                self._log_error(command.text, e, command.line_no)
+                timed_out = True
+            except ConnectionError as e:
+                if not self.pool or self.stop_event.is_set():
+                    command = sent[0] if sent else retry[0]
+                    self._log(f"命令: {command.text}")
+                    self._log_error(command.text, e, command.line_no)
+                    yield False
+                    return
+                self._log(f"连接中断: {e}，正在重连...", "RESULT_FAIL")
+            sent.extend(retry)
+            retry, sent = sent, deque()
+
+            if self.stop_event.is_set():
+                if timed_out:
+                    yield False
+                return
+            try:
+                if self.pool:
+                    self.pool.reconnect(self.telnet_manager, self.stop_event)
+                else:
+                    self.telnet_manager.connect(self.stop_event)
+            except ConnectionError as e:
+                self._log(str(e), "RESULT_FAIL")
+                yield False
+                return
+            self.reconnects += 1
+            self._log("重连成功，从未完成的命令继续执行")
+            if timed_out:
+                yield False
+
+    def _execute(self, command_str):
+        """发送命令，连接中断时通过连接池重连后重新执行该命令"""
+        try:
+            return self.telnet_manager.execute_command(command_str, self.stop_event)
+        except ConnectionError as e:
+            if not self.pool or self.stop_event.is_set():
+                raise
+            self._log(f"连接中断: {e}，正在重连...", "RESULT_FAIL")
+            self.pool.reconnect(self.telnet_manager, self.stop_event)
+            self.reconnects += 1
+            self._log("重连成功，重新执行当前命令")
+            return self.telnet_manager.execute_command(command_str, self.stop_event)
+
+    def _log_error(self, command_str, error, line_no=None):
+        """记录命令执行失败，带上命令文件中的行号"""
+        where = f"（第 {line_no} 行）" if line_no else ""
+        self._log(f"执行命令 '{command_str}'{where} 时出错: {str(error)}")
+
+    def execute_one_command(self, command_str, line_no=None, source=None):
+        """
+        执行单条命令，line_no 为命令文件中的行号，用于错误提示
+        source：由模板展开的命令对应的模板，写入结果记录供耗时统计汇总
+        等待返回期间设置了 stop_event 时抛出 InterruptedError，该命令不计入结果
+        返回是否成功：Result 不是 Pass、匹配到错误标记或执行出错时为 False
+        """
+        try:
+            # 执行命令前记录
+
+            self._log(f"命令: {command_str}")
+
+            # 执行命令，耗时取发送命令到收到提示符之间的时间，不含重连
+            output, elapsed = self._execute(command_str)
+            error = self.telnet_manager.last_error
+
+            result = self._record(command_str, output, elapsed, error, source)
+            return not error and not result.failed
+
+        except InterruptedError:
+            raise
+        except Exception as e:
+            self._log_error(command_str, e, line_no)
+            return False
+
+    def _record(self, command_str, output, elapsed, error=None, source=None):
+        """
+        记录一条命令的输出：解析一次，写日志并产出 CommandResult，返回该 CommandResult
+        error：匹配到的错误标记，输出中没有 Result 时以 "ERROR: 标记" 作为结果
+        source：模板展开的命令对应的模板
+        """
+        timing = instrumentation.enabled
+        if timing:
+            start = time.perf_counter()
+        result, log_lines = parse_result(
+            command_str, output, elapsed, self.host, error, self.telnet_manager.last_offset, source
+        )
+        if timing:
+            instrumentation.record("parse", time.perf_counter() - start)
+        for line, tag in log_lines:
+            self._log(line, tag)
+        if error:
+            self._log(f"检测到错误提示: {error}", "RESULT_FAIL")
+
+        # 记录执行时间
+        self._log(f"命令执行时间: {elapsed:.3f} 秒\n")
+
+        if self.on_result:
+            self.on_result(result)
+        return result
+
+
+
+class MultiDeviceRunner:
+    """
+    在多台设备上并发执行同一份命令
+    每台设备使用独立的 TelnetManager，max_workers 限制同时执行的设备数，
+    整体耗时取决于最慢的设备而不是所有设备耗时之和；delay_ms / rate 按每台设备分别计算
+    recorder：不使用连接池时各设备会话的 SessionRecorder，使用连接池时由连接池的设置决定
+    """
+    def __init__(self, targets, timeout=10, max_workers=8, log=None, on_result=None,
+                 stop_event: Event = None, delay_ms=0, stop_on_error=False, pool=None,
+                 pipeline_window=1, matcher=None, rate=0, recorder=None):
+        self.targets = list(targets)
+        self.timeout = timeout
+        self.max_workers = max(1, int(max_workers))
+        self.log = log
+        self.on_result = on_result
+        self.stop_event = stop_event or Event()
+        self.delay_ms = delay_ms
+        self.rate = rate
+        self.stop_on_error = stop_on_error
+        self.pool = pool
+        self.pipeline_window = pipeline_window
+        self.matcher = matcher
+        self.recorder = recorder
+        self._progress_lock = Lock()
+        self._executed = 0
+        self._total = 0
+        self._on_progress = None
+        self._runners = set()  # 正在执行的各设备 CommandRunner，用于汇总在途命令数和重连次数
+        self._reconnects = 0
+
+    @property
+    def in_flight(self):
+        with self._progress_lock:
+            return sum(runner.in_flight for runner in self._runners)
+
+    @property
+    def reconnects(self):
+        with self._progress_lock:
+            return self._reconnects + sum(runner.reconnects for runner in self._runners)
+
+    def run(self, plan, loop_count=1, on_progress=None):
+        """
+        并发执行并返回每台设备的汇总 {"host:port": {"executed", "failed", "error"}}
+        - on_progress：所有设备合计的进度回调 on_progress(已执行数, 总数)
+        """
+        if not self.targets:
+            return {}
+
+        if not hasattr(plan, 'steps'):
+            plan = compile_lines(plan)
+        self._executed = 0
+        self._total = plan.command_count * loop_count * len(self.targets)
+        self._on_progress = on_progress
+        self._runners.clear()
+        self._reconnects = 0
+
+        workers = min(self.max_workers, len(self.targets))
+        if self.log:
+            self.log(f"开始在 {len(self.targets)} 台设备上执行，并发数 {workers}")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._run_device, host, port, plan, loop_count)
+                for host, port in self.targets
+            ]
+            summary = dict(future.result() for future in futures)
+
+        if self.log:
+            for label, item in summary.items():
+                if item["error"]:
+                    self.log(f"[{label}] 执行失败: {item['error']}", "RESULT_FAIL")
+                else:
+                    tag = "RESULT_FAIL" if item["failed"] else "RESULT_PASS"
+                    self.log(f"[{label}] 已执行 {item['executed']} 条，失败 {item['failed']} 条", tag)
+        return summary
+
+    def _run_device(self, host, port, plan, loop_count):
+        """工作线程：连接一台设备并执行全部命令"""
+        label = f"{host}:{port}"
+        item = {"executed": 0, "failed": 0, "error": None}
+        if self.stop_event.is_set():
+            return label, item
+
+        try:
+            if self.pool:
+                telnet_manager = self.pool.acquire(host, port, self.timeout, self.stop_event, self.matcher)
+            else:
+                telnet_manager = TelnetManager(host, port, timeout=self.timeout, matcher=self.matcher,
+                                               recorder=self.recorder)
+                telnet_manager.connect(self.stop_event)
+        except Exception as e:
+            item["error"] = str(e)
+            return label, item
+
+        runner = CommandRunner(
+            telnet_manager,
+            log=self.log,
+            on_result=self.on_result,
+            stop_event=self.stop_event,
+            delay_ms=self.delay_ms,
+            stop_on_error=self.stop_on_error,
+            host=label,
+            pool=self.pool,
+            pipeline_window=self.pipeline_window,
+            rate=self.rate
+        )
+        with self._progress_lock:
+            self._runners.add(runner)
+        try:
+            runner.run(plan, loop_count, on_progress=self._count_progress)
+        except Exception as e:
+            item["error"] = str(e)
+        finally:
+            with self._progress_lock:
+                self._reconnects += runner.reconnects
+                self._runners.discard(runner)
+            # 使用连接池时保留会话，供下一次执行复用
+            if not self.pool:
+                telnet_manager.close()
+
+        item["executed"] = runner.executed
+        item["failed"] = runner.failed
+        return label, item
+
+    def _count_progress(self, executed, total):
+        """汇总各设备进度"""
+        with self._progress_lock:
+            self._executed += 1
+            current = self._executed
+        if self._on_progress:
+            self._on_progress(current, self._total)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+# session_record.py
+
+"""
+会话录制与回放：离线重跑解析、记录和报表流程，不需要连接设备
+
+录制文件（.tsr）以 b"TSR1" 开头，之后是连续的记录，可以追加写入；
+多个会话（多设备、重连）交错写在同一个文件中，按会话编号区分：
+
+    类型(1字节) 会话编号(4字节) 时间(8字节 double) 数据长度(4字节) 数据
+
+- OPEN：会话开始，时间为 time.time()，数据为 {"host", "port"} 的 JSON
+- SEND / RECV：发送和收到的原始字节（含 Telnet 协商），时间为距会话开始的秒数；数据为空的 RECV 表示对端关闭连接
+- OPTION：收到的选项协商，数据为 (命令, 选项) 两个字节
+- CLOSE：会话关闭
+程序异常退出时文件末尾可能有不完整的记录，读取时忽略
+"""
+
+import asyncio
+import json
+import struct
+import time
+from threading import Lock
+
+MAGIC = b"TSR1"
+
+OPEN = 1
+SEND = 2
+RECV = 3
+OPTION = 4
+CLOSE = 5
+
+_RECORD = struct.Struct("<BIdI")
+
+IAC = 255
+
+
+class SessionRecorder:
+    """
+    录制文件的写入端，一个文件可以同时记录多个会话
+    - open_session() 由 TelnetStream 在建立连接时调用，返回该会话的 SessionTap
+    - 所有写入在锁内完成，close() 之后的写入会被忽略
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._lock = Lock()
+        self._file = open(file_path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        else:
+            with open(file_path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    self._file.close()
+                    raise ValueError(f"{file_path} 不是会话录制文件")
+        self._next_id = 1
+        self.sessions = 0
+
+    def open_session(self, host, port):
+        with self._lock:
+            session_id = self._next_id
+            self._next_id += 1
+            self.sessions += 1
+        payload = json.dumps({"host": host, "port": port}).encode("utf-8")
+        self._write(OPEN, session_id, time.time(), payload)
+        return SessionTap(self, session_id)
+
+    def _write(self, kind, session_id, timestamp, data=b""):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD.pack(kind, session_id, timestamp, len(data)))
+            if data:
+                self._file.write(data)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SessionTap:
+    """一个会话的录制入口，时间从创建时开始计算（time.monotonic）"""
+    __slots__ = ("recorder", "session_id", "_started", "closed")
+
+    def __init__(self, recorder, session_id):
+        self.recorder = recorder
+        self.session_id = session_id
+        self._started = time.monotonic()
+        self.closed = False
+
+    def sent(self, data):
+        self.recorder._write(SEND, self.session_id, time.monotonic() - self._started, data)
+
+    def received(self, data):
+        self.recorder._write(RECV, self.session_id, time.monotonic() - self._started, data)
+
+    def option(self, command, option):
+        self.recorder._write(OPTION, self.session_id, time.monotonic() - self._started, bytes((command, option)))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.recorder._write(CLOSE, self.session_id, time.monotonic() - self._started)
+        self.recorder.flush()
+
+
+class RecordedSession:
+    """
+    读出的一个会话
+    - events：[(类型, 距会话开始的秒数, 数据), ...]，只包含 SEND / RECV
+    - options：收到的选项协商 [(命令, 选项), ...]
+    """
+    def __init__(self, host, port, started):
+        self.host = host
+        self.port = port
+        self.started = started
+        self.events = []
+        self.options = []
+        self.closed = False
+
+    @property
+    def duration(self):
+        return self.events[-1][1] if self.events else 0.0
+
+    def commands(self):
+        """会话中发送过的命令，不含协商应答、分页应答和空行"""
+        commands = []
+        for kind, _, data in self.events:
+            if kind != SEND or IAC in data:
+                continue
+            for line in data.decode("ascii", errors="ignore").splitlines():
+                line = line.strip()
+                if line:
+                    commands.append(line)
+        return commands
+
+
+def iter_sessions(file_path):
+    """
+    依次读出录制文件中的会话，会话在读到 CLOSE 时产出，文件结束时再产出尚未关闭的会话
+    文件不是录制文件时抛出 ValueError
+    """
+    active = {}
+    with open(file_path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_path} 不是会话录制文件")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                break
+            kind, session_id, timestamp, length = _RECORD.unpack(header)
+            data = f.read(length) if length else b""
+            if len(data) < length:
+                break
+            if kind == OPEN:
+                previous = active.pop(session_id, None)
+                if previous is not None:
+                    yield previous
+                info = json.loads(data.decode("utf-8"))
+                active[session_id] = RecordedSession(info.get("host"), info.get("port"), timestamp)
+                continue
+            session = active.get(session_id)
+            if session is None:
+                continue
+            if kind in (SEND, RECV):
+                session.events.append((kind, timestamp, data))
+            elif kind == OPTION and len(data) == 2:
+                session.options.append((data[0], data[1]))
+            elif kind == CLOSE:
+                session.closed = True
+                yield active.pop(session_id)
+    yield from active.values()
+
+
+class ReplayTransport:
+    """
+    回放录制的会话，代替套接字供 TelnetManager(transport=...) 使用
+    每次建立连接取出下一个会话，全部用完后连接失败
+    - sessions：录制文件路径，或 RecordedSession 列表
+    - speed：0 表示不等待，尽快回放；1.0 按录制时的速度，2.0 为两倍速
+    客户端只在等待提示符时读取，录制的返回数据按顺序逐块交给客户端，不检查发送的内容，
+    流水线模式录制的会话也可以逐条回放；按录制速度回放时，每块数据相对于它之前最近一次发送的间隔保持不变
+    """
+    def __init__(self, sessions, speed=0.0):
+        if isinstance(sessions, str):
+            sessions = iter_sessions(sessions)
+        self._sessions = iter(sessions)
+        self.speed = speed
+
+    async def open_connection(self, host, port):
+        session = next(self._sessions, None)
+        if session is None:
+            raise ConnectionRefusedError("录制的会话已全部回放")
+        state = _ReplayState(session, self.speed)
+        return _ReplayReader(state), _ReplayWriter(state)
+
+
+class _ReplayState:
+    def __init__(self, session, speed):
+        self.speed = speed
+        # [(之前最近一次发送的时间, 时间, 数据), ...]
+        self.chunks = []
+        sent_at = 0.0
+        for kind, timestamp, data in session.events:
+            if kind == SEND:
+                sent_at = timestamp
+            else:
+                self.chunks.append((sent_at, timestamp, data))
+        self.index = 0
+        self.pending = b""
+        self.written_at = time.monotonic()
+        self.closed = False
+        # 上一块数据送出时对应的录制时间和实际时间
+        self.last_recorded = 0.0
+        self.last_real = time.monotonic()
+
+
+class _ReplayReader:
+    def __init__(self, state):
+        self._state = state
+
+    async def read(self, n=-1):
+        state = self._state
+        if not state.pending:
+            if state.closed or state.index >= len(state.chunks):
+                return b""
+            sent_at, timestamp, data = state.chunks[state.index]
+            if state.speed > 0:
+                if state.written_at > state.last_real and sent_at >= state.last_recorded:
+                    base_recorded, base_real = sent_at, state.written_at
+                else:
+                    base_recorded, base_real = state.last_recorded, state.last_real
+                delay = (timestamp - base_recorded) / state.speed - (time.monotonic() - base_real)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            state.index += 1
+            state.last_recorded = timestamp
+            state.last_real = time.monotonic()
+            if not data:
+                state.closed = True
+                return b""
+            state.pending = data
+        if n is None or n < 0:
+            n = len(state.pending)
+        data, state.pending = state.pending[:n], state.pending[n:]
+        return data
+
+
+class _ReplayWriter:
+    def __init__(self, state):
+        self._state = state
+
+    def write(self, data):
+        self._state.written_at = time.monotonic()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self._state.closed = True
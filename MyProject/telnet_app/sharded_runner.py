@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# sharded_runner.py
+
+"""
+多进程分片执行：设备清单按进程数分片，每个工作进程用自己的 MultiDeviceRunner 连接和执行，
+解析在工作进程中完成，结果以紧凑的元组分批经队列发回主进程，
+由主进程统一写日志、统计和导出，单个进程的解析和日志开销不再限制设备数量
+"""
+
+import multiprocessing
+import os
+import queue
+from threading import Event, Lock, Thread
+
+from .command_plan import compile_lines
+from .result_parser import CommandResult
+
+BATCH_SIZE = 256        # 每批最多的结果和日志条数
+FLUSH_INTERVAL = 0.05   # 工作进程发送未满批次的间隔（秒）
+POLL_INTERVAL = 0.05    # 主进程等待队列的间隔（秒），同时检查 stop_event 和工作进程是否退出
+
+
+def split_targets(targets, shards):
+    """把设备清单轮流分配到 shards 个分片，去掉空分片"""
+    groups = [list(targets[index::shards]) for index in range(shards)]
+    return [group for group in groups if group]
+
+
+def _pack(result):
+    return (result.timestamp, result.command, result.data, result.result,
+            result.elapsed, result.raw_offset, result.host, result.source)
+
+
+class _ShardChannel:
+    """
+    工作进程一侧：收集结果、日志和进度，攒满 BATCH_SIZE 条或每 FLUSH_INTERVAL 秒发送一批
+    批次格式 ("batch", 分片序号, [结果元组, ...], [(日志, 标签), ...], 已执行数, 在途命令数, 重连次数)
+    """
+    def __init__(self, shard, out_queue):
+        self.shard = shard
+        self.queue = out_queue
+        self.runner = None
+        self._lock = Lock()
+        self._results = []
+        self._logs = []
+        self._executed = 0
+        self._sent_executed = 0
+        self._closed = Event()
+        self._thread = Thread(target=self._run, name="shard-flush", daemon=True)
+        self._thread.start()
+
+    def log(self, message, tag="NORMAL"):
+        with self._lock:
+            self._logs.append((message, tag))
+            full = len(self._logs) >= BATCH_SIZE
+        if full:
+            self.flush()
+
+    def result(self, result):
+        with self._lock:
+            self._results.append(_pack(result))
+            full = len(self._results) >= BATCH_SIZE
+        if full:
+            self.flush()
+
+    def progress(self, current, total):
+        with self._lock:
+            self._executed = current
+
+    def flush(self):
+        runner = self.runner
+        with self._lock:
+            if not self._results and not self._logs and self._executed == self._sent_executed:
+                return
+            results, self._results = self._results, []
+            logs, self._logs = self._logs, []
+            executed = self._sent_executed = self._executed
+            # 在锁内放入队列，保证各批次按顺序到达
+            self.queue.put(("batch", self.shard, results, logs, executed,
+                            runner.in_flight if runner else 0, runner.reconnects if runner else 0))
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._closed.wait(FLUSH_INTERVAL):
+            self.flush()
+
+
+def _shard_main(shard, targets, plan, loop_count, options, out_queue, stop_event):
+    """工作进程入口：在本进程的事件循环中执行一个分片，结束时发送 ("done", 分片序号, 汇总)"""
+    # 在工作进程中导入，主进程导入本模块时不需要加载 Telnet 相关模块
+    from .runner import MultiDeviceRunner
+    from .session_record import SessionRecorder
+
+    summary = {}
+    channel = _ShardChannel(shard, out_queue)
+    recorder = None
+    try:
+        record_path = options.pop("record_path", None)
+        if record_path:
+            recorder = SessionRecorder(record_path)
+        runner = MultiDeviceRunner(targets, log=channel.log, on_result=channel.result,
+                                   stop_event=stop_event, recorder=recorder, **options)
+        channel.runner = runner
+        summary = runner.run(plan, loop_count, on_progress=channel.progress)
+    except Exception as e:
+        for host, port in targets:
+            summary.setdefault(f"{host}:{port}", {"executed": 0, "failed": 0, "error": f"工作进程出错: {e}"})
+    finally:
+        channel.close()
+        if recorder:
+            recorder.close()
+        out_queue.put(("done", shard, summary))
+
+
+class ShardedRunner:
+    """
+    多进程执行同一份命令，接口与 MultiDeviceRunner 相同
+    - processes：工作进程数，默认为 CPU 核数，不超过设备数
+    - max_workers：每个工作进程内同时执行的设备数
+    - log / on_result / on_progress 都在调用 run() 的线程中调用，不需要考虑多进程
+    - record_path：设置后每个工作进程录制到 <record_path 去掉扩展名>_<分片序号>.tsr
+    工作进程用 spawn 方式启动，不继承主进程的线程和事件循环
+    """
+    def __init__(self, targets, timeout=10, max_workers=8, log=None, on_result=None,
+                 stop_event: Event = None, delay_ms=0, stop_on_error=False, processes=None,
+                 pipeline_window=1, matcher=None, rate=0, record_path=None):
+        self.targets = list(targets)
+        self.timeout = timeout
+        self.max_workers = max(1, int(max_workers))
+        self.log = log
+        self.on_result = on_result
+        self.stop_event = stop_event or Event()
+        self.delay_ms = delay_ms
+        self.rate = rate
+        self.stop_on_error = stop_on_error
+        self.processes = max(1, int(processes or os.cpu_count() or 1))
+        self.pipeline_window = pipeline_window
+        self.matcher = matcher
+        self.record_path = record_path
+        self._lock = Lock()
+        self._in_flight = {}
+        self._reconnects = {}
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return sum(self._in_flight.values())
+
+    @property
+    def reconnects(self):
+        with self._lock:
+            return sum(self._reconnects.values())
+
+    def _options(self, shard):
+        options = dict(
+            timeout=self.timeout,
+            max_workers=self.max_workers,
+            delay_ms=self.delay_ms,
+            stop_on_error=self.stop_on_error,
+            pipeline_window=self.pipeline_window,
+            matcher=self.matcher,
+            rate=self.rate,
+        )
+        if self.record_path:
+            root, _ = os.path.splitext(self.record_path)
+            options["record_path"] = f"{root}_{shard}.tsr"
+        return options
+
+    def run(self, plan, loop_count=1, on_progress=None):
+        """
+        并发执行并返回每台设备的汇总 {"host:port": {"executed", "failed", "error"}}
+        - on_progress：所有进程合计的进度回调 on_progress(已执行数, 总数)
+        """
+        if not self.targets:
+            return {}
+        if not hasattr(plan, 'steps'):
+            plan = compile_lines(plan)
+
+        shards = split_targets(self.targets, min(self.processes, len(self.targets)))
+        total = plan.command_count * loop_count * len(self.targets)
+        context = multiprocessing.get_context("spawn")
+        results_queue = context.Queue()
+        shard_stop = context.Event()
+        workers = []
+        for index, group in enumerate(shards):
+            worker = context.Process(
+                target=_shard_main,
+                args=(index, group, plan, loop_count, self._options(index), results_queue, shard_stop),
+                name=f"telnet-shard-{index}",
+                daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+        if self.log:
+            self.log(f"共 {len(self.targets)} 台设备，分 {len(workers)} 个进程执行")
+
+        summary = {}
+        executed = [0] * len(workers)
+        pending = set(range(len(workers)))
+        exited = set()
+        try:
+            while pending:
+                if self.stop_event.is_set() and not shard_stop.is_set():
+                    shard_stop.set()
+                try:
+                    message = results_queue.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    self._check_workers(workers, pending, exited, shards, summary)
+                    continue
+                shard = message[1]
+                if message[0] == "done":
+                    summary.update(message[2])
+                    pending.discard(shard)
+                    with self._lock:
+                        self._in_flight[shard] = 0
+                    continue
+                _, _, results, logs, count, in_flight, reconnects = message
+                with self._lock:
+                    self._in_flight[shard] = in_flight
+                    self._reconnects[shard] = reconnects
+                if self.log:
+                    for line, tag in logs:
+                        self.log(line, tag)
+                if self.on_result:
+                    for record in results:
+                        self.on_result(CommandResult(*record))
+                if count != executed[shard]:
+                    executed[shard] = count
+                    if on_progress:
+                        on_progress(sum(executed), total)
+        finally:
+            shard_stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.terminate()
+        return summary
+
+    def _check_workers(self, workers, pending, exited, shards, summary):
+        """
+        队列为空时检查工作进程，没有发送 done 就退出的分片记为出错
+        进程刚退出时队列中可能还有它最后发送的数据，连续两次检查都已退出才确认
+        """
+        for shard in list(pending):
+            worker = workers[shard]
+            if worker.is_alive():
+                continue
+            if shard not in exited:
+                exited.add(shard)
+                continue
+            pending.discard(shard)
+            for host, port in shards[shard]:
+                summary.setdefault(f"{host}:{port}", {
+                    "executed": 0, "failed": 0,
+                    "error": f"工作进程异常退出（退出码 {worker.exitcode}）"
+                })
+            if self.log:
+                self.log(f"工作进程 {shard} 异常退出（退出码 {worker.exitcode}）", "RESULT_FAIL")
@@ -1,68 +1,140 @@
 # telnet_manager.py
 
-import telnetlib
 import time
-from threading import Event
+from threading import Event, Lock
+
+from . import instrumentation
+from .async_telnet import AsyncTelnetManager, run_sync
+
+async def _anext(agen):
+    return await agen.__anext__()
+
 
 class TelnetManager:
     """
     封装 Telnet 连接和命令执行的核心逻辑
+    同步接口，实际 I/O 由共享事件循环中的 AsyncTelnetManager 完成
+    - transport：代替套接字的传输，如回放录制会话的 ReplayTransport
+    - recorder：SessionRecorder，设置后录制收发的数据
     """
-    def __init__(self, host, port, timeout=10):
-        self.host = host
-        self.port = port
-        self.timeout = timeout
-        self.tn = None
-        self.is_connected = False
-
-    def connect(self):
+    def __init__(self, host, port, timeout=10, matcher=None, transport=None, recorder=None):
+        self.session = AsyncTelnetManager(host, port, timeout, matcher, transport, recorder)
+        # 保证同一会话上同时只有一个请求（命令执行或保活探测）
+        self._lock = Lock()
+
+    @property
+    def host(self):
+        return self.session.host
+
+    @property
+    def port(self):
+        return self.session.port
+
+    @property
+    def timeout(self):
+        return self.session.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self.session.timeout = value
+
+    @property
+    def matcher(self):
+        return self.session.matcher
+
+    @matcher.setter
+    def matcher(self, value):
+        self.session.matcher = value
+
+    @property
+    def recorder(self):
+        return self.session.recorder
+
+    @recorder.setter
+    def recorder(self, value):
+        if value is not self.session.recorder:
+            run_sync(self.session.set_recorder(value))
+
+    @property
+    def last_error(self):
+        """最近一条命令输出中匹配到的错误标记，没有时为 None"""
+        return self.session.last_error
+
+    @property
+    def last_offset(self):
+        """最近一条命令输出在本次连接收到的数据中的字节偏移"""
+        return self.session.last_offset
+
+    @property
+    def in_flight(self):
+        """已发送、尚未收到提示符的命令数"""
+        return self.session.in_flight
+
+    @property
+    def is_connected(self):
+        return self.session.is_connected
+
+    @property
+    def last_active(self):
+        return self.session.last_active
+
+    def connect(self, stop_event: Event = None):
         """
         建立 Telnet 连接。如果已连接过，会先关闭再重连。
+        - stop_event：连接过程中被设置时放弃连接并抛出 InterruptedError
         """
-        self.close()
-        try:
-            self.tn = telnetlib.Telnet(self.host, self.port, self.timeout)
-            self.is_connected = True
-            # 读取初始提示符，确保连接正常
-            self.tn.read_until(b">", timeout=self.timeout)
-        except Exception as e:
-            self.is_connected = False
-            raise ConnectionError(f"Telnet 连接失败: {e}")
+        with self._lock:
+            run_sync(self.session.connect(), stop_event)
 
     def close(self):
         """ 关闭 Telnet 连接 """
-        if self.tn:
-            try:
-                self.tn.close()
-            except:
-                pass
-        self.is_connected = False
+        try:
+            run_sync(self.session.close())
+        except Exception:
+            pass
 
     def execute_command(self, command, stop_event: Event = None, delay_ms=0):
         """
         执行一条命令，并读取返回结果
-        - stop_event：在等待响应时，可用于中断
+        - stop_event：等待响应或延时期间被设置时立即中断并抛出 InterruptedError，
+          会话在下一条命令执行前重新同步
         - delay_ms：执行完当前命令后，额外等待的时间
         """
-        if not self.is_connected or not self.tn:
-            raise RuntimeError("尚未建立 Telnet 连接，无法执行命令。")
-
-        start_time = time.time()
+        with self._lock:
+            if not instrumentation.enabled:
+                return run_sync(self.session.execute_command(command, stop_event, delay_ms), stop_event)
+            start = time.perf_counter()
+            try:
+                return run_sync(self.session.execute_command(command, stop_event, delay_ms), stop_event)
+            finally:
+                instrumentation.record("execute", time.perf_counter() - start)
 
-        # 发送命令
-        self.tn.write(command.encode('ascii') + b'\n')
+    def execute_pipelined(self, commands, window=4, stop_event: Event = None):
+        """
+        流水线执行多条命令，依次产出 (command, output, elapsed)
+        - window：同时在途的最大命令数
+        - stop_event：被设置后不再发送新命令，正在等待的返回立即中断并抛出 InterruptedError
+        """
+        with self._lock:
+            agen = self.session.execute_pipelined(commands, window, stop_event)
+            try:
+                while True:
+                    try:
+                        item = run_sync(_anext(agen), stop_event)
+                    except StopAsyncIteration:
+                        return
+                    yield item
+            finally:
+                run_sync(agen.aclose())
 
-        # 读取直到提示符（假设提示符为 'CIG-EVK-G2:>'）
-        prompt = b'CIG-EVK-G2:>'
+    def probe(self, timeout=2, blocking=True):
+        """
+        探测连接是否可用
+        - blocking=False 时如果会话正忙则直接返回 None，不打断正在执行的命令
+        """
+        if not self._lock.acquire(blocking):
+            return None
         try:
-            output = self.tn.read_until(prompt, timeout=self.timeout).decode('ascii', errors='ignore')
-        except Exception as e:
-            raise Exception(f"读取 Telnet 输出时出错: {e}")
-
-        elapsed = time.time() - start_time
-
-        # 可选的延时
-        if delay_ms > 0 and not (stop_event and stop_event.is_set()):
-            time.sleep(delay_ms / 1000.0)
-
-        return output, elapsed
+            return run_sync(self.session.probe(timeout))
+        finally:
+            self._lock.release()
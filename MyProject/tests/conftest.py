@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# conftest.py
+
+import os
+import sys
+
+# 在 MyProject 目录或仓库根目录运行 pytest 时都能导入 telnet_app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
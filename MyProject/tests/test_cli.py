@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# test_cli.py
+
+"""命令行执行：退出码和超时命令的统计"""
+
+import sqlite3
+
+import pytest
+
+from telnet_app.cli import EXIT_FAILED, EXIT_OK, main
+from telnet_app.fake_device import DeviceBehavior, FakeDevice
+from telnet_app.result_parser import PROMPT_TIMEOUT
+
+
+@pytest.fixture
+def commands_file(tmp_path):
+    path = tmp_path / "commands.txt"
+    path.write_text("A\nSLOW\nB\n", encoding="utf-8")
+    return str(path)
+
+
+def _run(device, commands_file, *extra, result_db=""):
+    return main(["run", "--host", device.host, "--port", str(device.port), "--commands-file", commands_file,
+                 "--timeout", "1", "--output-mode", "do_not_generate", "--result-db", result_db, *extra])
+
+
+def test_all_pass_exits_ok(commands_file, capsys):
+    with FakeDevice() as device:
+        assert _run(device, commands_file) == EXIT_OK
+    assert "通过 3，失败 0，出错 0" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("window", ["1", "4"])
+def test_prompt_timeout_fails_run(commands_file, tmp_path, capsys, window):
+    db_path = str(tmp_path / "results.db")
+    with FakeDevice(overrides={"SLOW": DeviceBehavior(latency=1.5)}) as device:
+        assert _run(device, commands_file, "--pipeline-window", window, result_db=db_path) == EXIT_FAILED
+    out = capsys.readouterr().out
+    # 超时只记一次失败，后面的命令继续执行
+    assert "共 3 条，通过 2，失败 1，出错 0" in out
+    # 超时的命令不计入耗时统计
+    assert "SLOW:" not in out
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT command, result FROM results ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    assert rows == [("A", "Pass"), ("SLOW", f"ERROR: {PROMPT_TIMEOUT}"), ("B", "Pass")]
+
+
+@pytest.mark.parametrize("window", ["1", "4"])
+def test_dropped_connection_counts_as_error(commands_file, capsys, window):
+    with FakeDevice(overrides={"SLOW": DeviceBehavior(drop_rate=1.0)}) as device:
+        assert _run(device, commands_file, "--pipeline-window", window) == EXIT_FAILED
+    # 连接断开的命令没有结果，只计入出错
+    assert "共 1 条，通过 1，失败 0，出错 1" in capsys.readouterr().out
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# test_command_plan.py
+
+"""命令文件编译：DELAY、模板、LOOP 和缓存"""
+
+import itertools
+import os
+
+import pytest
+
+from telnet_app.command_plan import Command, Delay, compile_lines, load_plan
+
+
+def test_plain_lines_and_delay():
+    plan = compile_lines(["# 注释", "", "A", "DELAY 100", "  B  "])
+    assert plan.steps == (Command(3, "A"), Delay(4, 100), Command(5, "B"))
+    assert plan.command_count == 2
+    assert plan.commands == ("A", "B")
+
+
+@pytest.mark.parametrize("line", ["DELAY", "DELAY x", "DELAY -1"])
+def test_invalid_delay(line):
+    with pytest.raises(ValueError, match="第 1 行"):
+        compile_lines([line], "cmds.txt")
+
+
+def test_range_and_list_sweep():
+    plan = compile_lines(["SET ${a,b} ${1..3}"])
+    assert plan.command_count == 6
+    assert plan.commands == ("SET a 1", "SET a 2", "SET a 3", "SET b 1", "SET b 2", "SET b 3")
+
+
+def test_range_step_direction_padding_and_decimals():
+    assert compile_lines(["V ${0..10 step 5}"]).commands == ("V 0", "V 5", "V 10")
+    assert compile_lines(["V ${3..1}"]).commands == ("V 3", "V 2", "V 1")
+    assert compile_lines(["V ${01..03}"]).commands == ("V 01", "V 02", "V 03")
+    assert compile_lines(["V ${0.5..1 step 0.25}"]).commands == ("V 0.50", "V 0.75", "V 1.00")
+    assert compile_lines(["V ${1..0 step 1}"]).command_count == 0
+
+
+def test_plain_braces_are_literal_and_escape():
+    plan = compile_lines(['SET {"k":1,"j":2}', "ECHO $${a,b}"])
+    assert plan.commands == ('SET {"k":1,"j":2}', "ECHO ${a,b}")
+
+
+@pytest.mark.parametrize("line", ["A ${1..2 step 0}", "A ${foo}", "A ${x y}"])
+def test_invalid_template(line):
+    with pytest.raises(ValueError, match="第 1 行"):
+        compile_lines([line])
+
+
+def test_loop_blocks():
+    plan = compile_lines([
+        "LOOP 2",
+        "  LOOP ch IN ${1..2}",
+        "    CH ${ch} ${a,b}",
+        "    DELAY 0",
+        "  END",
+        "END",
+        "LAST",
+    ])
+    assert plan.command_count == 9
+    assert plan.commands == ("CH 1 a", "CH 1 b", "CH 2 a", "CH 2 b") * 2 + ("LAST",)
+    steps = list(plan.iter_steps())
+    assert sum(isinstance(step, Delay) for step in steps) == 4
+    assert steps[0].source == "CH ${ch} ${a,b} (第 3 行)"
+    assert steps[-1].source is None
+
+
+def test_loop_variable_out_of_scope():
+    with pytest.raises(ValueError, match="第 4 行"):
+        compile_lines(["LOOP i IN ${1..2}", "A ${i}", "END", "B ${i}"])
+
+
+def test_unbalanced_loop():
+    with pytest.raises(ValueError, match="第 1 行: LOOP 没有对应的 END"):
+        compile_lines(["LOOP 2", "A"])
+
+
+def test_loop_and_end_outside_directive_form_are_commands():
+    plan = compile_lines(["END", "LOOP abc", "LOOPBACK 1"])
+    assert plan.commands == ("END", "LOOP abc", "LOOPBACK 1")
+
+
+def test_large_sweep_is_lazy():
+    plan = compile_lines(["LOOP i IN ${1..1000}", "S ${i} ${0..9999}", "END"])
+    assert plan.command_count == 10000000
+    first = [step.text for step in itertools.islice(plan.iter_steps(), 3)]
+    assert first == ["S 1 0", "S 1 1", "S 1 2"]
+
+
+def test_load_plan_cache(tmp_path):
+    path = tmp_path / "commands.txt"
+    path.write_text("A\nB\n", encoding="utf-8")
+    plan = load_plan(str(path))
+    assert load_plan(str(path)) is plan
+
+    path.write_text("A\nB\nC ${1..2}\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    changed = load_plan(str(path))
+    assert changed is not plan
+    assert changed.commands == ("A", "B", "C 1", "C 2")
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# test_fake_device.py
+
+"""模拟设备：输出格式、按命令设置的行为、断线和停止时的清理"""
+
+import asyncio
+
+import pytest
+
+from telnet_app.fake_device import DeviceBehavior, FakeDevice
+from telnet_app.telnet_manager import TelnetManager
+
+
+def test_response_format():
+    device = FakeDevice()
+    assert device.response("VOL 1") == b"\r\nCmd: VOL 1\r\nData: 5\r\nResult: Pass\r\n" + device.prompt
+    assert b"Result: Fail" in device.response("FAIL 1")
+    assert device.response("") == b"\r\n" + device.prompt
+
+
+def test_overrides_keep_default_behavior():
+    device = FakeDevice(behavior=DeviceBehavior(latency=0.5, fail_rate=1.0),
+                        overrides={"SLOW": {"latency": 2.0}, "OK": DeviceBehavior()})
+    assert device.overrides["SLOW"].latency == 2.0
+    assert device.overrides["SLOW"].fail_rate == 1.0
+    assert b"Result: Fail" in device.response("A")
+    assert b"Result: Fail" in device.response("SLOW")
+    assert b"Result: Pass" in device.response("OK")
+
+
+def test_output_size_adds_filler_lines():
+    device = FakeDevice(behavior=DeviceBehavior(output_size=800))
+    output = device.response("A")
+    assert output.count(b"Log: ") == 10
+    assert len(output) > 800
+
+
+def test_serves_telnet_manager():
+    with FakeDevice() as device:
+        assert device.port
+        manager = TelnetManager(device.host, device.port, timeout=2)
+        manager.connect()
+        try:
+            output, _ = manager.execute_command("VOL 1")
+        finally:
+            manager.close()
+    assert "Cmd: VOL 1" in output
+    assert device.commands >= 1
+    assert device.connections == 1
+
+
+def test_drop_closes_connection():
+    async def scenario():
+        device = FakeDevice(behavior=DeviceBehavior(drop_rate=1.0))
+        await device.start()
+        try:
+            reader, writer = await asyncio.open_connection(device.host, device.port)
+            await reader.readuntil(device.prompt)
+            writer.write(b"A\r\n")
+            rest = await asyncio.wait_for(reader.read(), 2)
+            writer.close()
+        finally:
+            await device.stop()
+        return device, rest
+
+    device, rest = asyncio.run(scenario())
+    assert rest == b""
+    assert device.drops == 1
+    assert device.commands == 0
+
+
+def test_stop_cancels_open_connections():
+    async def scenario():
+        device = FakeDevice(overrides={"SLOW": DeviceBehavior(latency=30)})
+        await device.start()
+        reader, writer = await asyncio.open_connection(device.host, device.port)
+        await reader.readuntil(device.prompt)
+        writer.write(b"SLOW\r\n")
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(device.stop(), 2)
+        rest = await asyncio.wait_for(reader.read(), 2)
+        writer.close()
+        return device, rest
+
+    device, rest = asyncio.run(scenario())
+    assert rest == b""
+    assert device.commands == 0
+    assert not device._handlers
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_seed_makes_failures_reproducible(seed):
+    first = FakeDevice(behavior=DeviceBehavior(fail_rate=0.5), seed=seed)
+    second = FakeDevice(behavior=DeviceBehavior(fail_rate=0.5), seed=seed)
+    assert [first.response(f"C{i}") for i in range(50)] == [second.response(f"C{i}") for i in range(50)]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# test_latency.py
+
+"""LatencyHistogram 百分位和 LatencyStats 汇总"""
+
+import math
+import random
+
+import pytest
+
+from telnet_app.latency import LatencyHistogram, LatencyStats
+from telnet_app.result_parser import PROMPT_TIMEOUT, CommandResult
+
+# 相对误差上限 1/2^(SUB_BITS-1)
+ERROR = 1 / (1 << (LatencyHistogram.SUB_BITS - 1))
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    assert histogram.max == 0.0
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for us in range(1, 11):
+        histogram.record(us / 1000000)
+    assert histogram.percentile(50) == pytest.approx(5e-6)
+    assert histogram.percentile(100) == pytest.approx(10e-6)
+
+
+@pytest.mark.parametrize("percent", [50, 90, 95, 99, 99.9])
+def test_percentiles_within_error_bound(percent):
+    rng = random.Random(1)
+    values = sorted(rng.lognormvariate(-4, 1) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    exact = values[math.ceil(len(values) * percent / 100) - 1]
+    assert exact <= histogram.percentile(percent) <= exact * (1 + ERROR) + 1e-6
+
+
+def test_max_is_exact_and_caps_percentiles():
+    histogram = LatencyHistogram()
+    histogram.record(0.1)
+    histogram.record(1.234567)
+    assert histogram.max == pytest.approx(1.234567)
+    assert histogram.percentile(100) == pytest.approx(1.234567)
+
+
+def test_merge():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for _ in range(3):
+        first.record(0.01)
+        second.record(0.02)
+    first.merge(second)
+    assert first.count == 6
+    assert first.percentile(50) == pytest.approx(0.01, rel=ERROR)
+    assert first.percentile(100) == pytest.approx(0.02, rel=ERROR)
+
+
+def test_copy_and_sum():
+    histogram = LatencyHistogram()
+    histogram.record(0.01)
+    histogram.record(0.02)
+    copied = histogram.copy()
+    histogram.record(0.03)
+    assert copied.count == 2
+    assert copied.sum == pytest.approx(0.03)
+    assert histogram.sum == pytest.approx(0.06)
+
+
+def test_stats_by_command_and_host():
+    stats = LatencyStats("dev")
+    stats.record(CommandResult(0, "A", "", "Pass", 0.01))
+    stats.record(CommandResult(0, "A", "", "Pass", 0.02, host="other"))
+    stats.record(CommandResult(0, "B", "", "Fail", 0.03))
+    assert sorted(stats.by_command) == ["A", "B"]
+    assert stats.by_host["dev"].count == 2
+    assert stats.by_host["other"].count == 1
+    assert stats.row("命令", "A")[:3] == ["命令", "A", 2]
+    assert stats.take_changed() == {("命令", "A"), ("命令", "B"), ("设备", "dev"), ("设备", "other")}
+    assert stats.take_changed() == set()
+
+
+def test_stats_skip_prompt_timeouts():
+    stats = LatencyStats("dev")
+    stats.record(CommandResult(0, "A", "", "Pass", 0.02))
+    stats.record(CommandResult(0, "SLOW", "", f"ERROR: {PROMPT_TIMEOUT}", 10.0))
+    assert sorted(stats.by_command) == ["A"]
+    assert stats.by_host["dev"].count == 1
+
+
+def test_stats_group_expanded_templates():
+    stats = LatencyStats()
+    for value in range(100):
+        stats.record(CommandResult(0, f"SETVOL {value}", "", "Pass", 0.01, source="SETVOL ${0..99} (第 1 行)"))
+    stats.record(CommandResult(0, "A", "", "Pass", 0.02))
+    assert sorted(stats.by_command) == ["A", "SETVOL ${0..99} (第 1 行)"]
+    assert stats.row("命令", "SETVOL ${0..99} (第 1 行)")[2] == 100
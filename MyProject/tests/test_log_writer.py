@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# test_log_writer.py
+
+"""LogFileWriter 按大小切换文件，新文件打不开时继续写入当前文件"""
+
+import time
+
+from telnet_app.log_writer import LogFileWriter
+
+
+def _write_batches(writer, lines):
+    """每行单独成批写入，使每批之后都检查一次切换条件"""
+    for line in lines:
+        writer.write(line)
+        time.sleep(0.1)
+    writer.close()
+
+
+def test_rotates_by_size(tmp_path):
+    path = str(tmp_path / "log.txt")
+    writer = LogFileWriter(path, flush_interval=0.01, max_bytes=100)
+    _write_batches(writer, ["a" * 150, "b" * 150])
+
+    assert writer.files[:2] == [path, str(tmp_path / "log_2.txt")]
+    with open(writer.files[0], encoding="utf-8") as f:
+        assert f.read() == "a" * 150 + "\n"
+    with open(writer.files[1], encoding="utf-8") as f:
+        assert f.read() == "b" * 150 + "\n"
+
+
+def test_rotation_failure_keeps_current_file(tmp_path):
+    path = str(tmp_path / "log.txt")
+    # 与下一个文件同名的目录使打开失败
+    (tmp_path / "log_2.txt").mkdir()
+    errors = []
+    writer = LogFileWriter(path, flush_interval=0.01, max_bytes=10, on_error=errors.append)
+    _write_batches(writer, ["first line", "second line"])
+
+    assert writer.files == [path]
+    assert writer.current_path == path
+    assert errors and all(isinstance(error, OSError) for error in errors)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "first line\nsecond line\n"
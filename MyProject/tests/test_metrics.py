@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# test_metrics.py
+
+"""RunMetrics 的重连次数：执行中和结束后都只计一次"""
+
+from telnet_app.metrics import RunMetrics
+
+
+class _Runner:
+    in_flight = 1
+    reconnects = 2
+
+
+def _reconnects(metrics):
+    for line in metrics.render().splitlines():
+        if line.startswith("telnet_reconnects_total "):
+            return int(line.split()[1])
+    raise AssertionError("没有 telnet_reconnects_total")
+
+
+def test_reconnects_counted_once():
+    metrics = RunMetrics()
+    metrics.start(_Runner())
+    assert _reconnects(metrics) == 2
+    assert "telnet_inflight_commands 1" in metrics.render()
+    metrics.finish()
+    assert _reconnects(metrics) == 2
+    assert "telnet_inflight_commands 0" in metrics.render()
+    # 下一次执行在累计值上继续增加
+    metrics.start(_Runner())
+    assert _reconnects(metrics) == 4
+    metrics.finish()
+    metrics.finish()
+    assert _reconnects(metrics) == 4
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# test_pipelined.py
+
+"""流水线执行：超时的命令记为一条失败结果，不在重连后重发"""
+
+import threading
+
+import pytest
+
+from telnet_app.connection_pool import ConnectionPool
+from telnet_app.fake_device import DeviceBehavior, FakeDevice
+from telnet_app.result_parser import PROMPT_TIMEOUT
+from telnet_app.runner import CommandRunner
+from telnet_app.telnet_manager import TelnetManager
+
+
+@pytest.fixture
+def device():
+    with FakeDevice(overrides={"SLOW": DeviceBehavior(latency=1.0)}) as device:
+        yield device
+
+
+def test_pipelined_results_in_order(device):
+    manager = TelnetManager(device.host, device.port, timeout=2)
+    manager.connect()
+    try:
+        results = list(manager.execute_pipelined([f"C{i}" for i in range(20)], window=4))
+    finally:
+        manager.close()
+    assert [command for command, _, _ in results] == [f"C{i}" for i in range(20)]
+    assert all(f"Cmd: {command}" in output for command, output, _ in results)
+
+
+def test_pipelined_timeout_raises_timeout_error(device):
+    manager = TelnetManager(device.host, device.port, timeout=0.3)
+    manager.connect()
+    results = []
+    try:
+        with pytest.raises(TimeoutError):
+            for command, output, _ in manager.execute_pipelined(["A", "SLOW", "B"], window=4):
+                results.append((command, manager.last_error))
+        assert not manager.is_connected
+    finally:
+        manager.close()
+    # 超时的命令在抛出 TimeoutError 之前产出，last_error 为 PROMPT_TIMEOUT
+    assert results == [("A", None), ("SLOW", PROMPT_TIMEOUT)]
+
+
+def test_pipelined_timeout_is_not_resent(device):
+    pool = ConnectionPool(backoff_base=0.05)
+    stop_event = threading.Event()
+    # 出错时不会无限重连，最迟由这里结束
+    guard = threading.Timer(10, stop_event.set)
+    guard.start()
+    try:
+        manager = pool.acquire(device.host, device.port, timeout=0.3)
+        results = []
+        runner = CommandRunner(manager, on_result=results.append, stop_event=stop_event,
+                               pool=pool, pipeline_window=4)
+        runner.run(["A", "SLOW", "B", "C"])
+    finally:
+        guard.cancel()
+        pool.close_all()
+
+    assert not stop_event.is_set()
+    assert runner.executed == 4
+    assert runner.failed == 1
+    assert runner.reconnects == 1
+    assert [(result.command, result.result) for result in results] == [
+        ("A", "Pass"), ("SLOW", f"ERROR: {PROMPT_TIMEOUT}"), ("B", "Pass"), ("C", "Pass")]
+
+
+def test_pipelined_timeout_without_pool_reconnects(device):
+    manager = TelnetManager(device.host, device.port, timeout=0.3)
+    manager.connect()
+    results = []
+    try:
+        runner = CommandRunner(manager, on_result=results.append, pipeline_window=4)
+        runner.run(["A", "SLOW", "B", "C"])
+    finally:
+        manager.close()
+
+    assert runner.executed == 4
+    assert runner.failed == 1
+    assert runner.reconnects == 1
+    assert [result.command for result in results] == ["A", "SLOW", "B", "C"]
+    assert results[1].timed_out
+
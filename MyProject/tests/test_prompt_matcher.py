@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# test_prompt_matcher.py
+
+"""PromptMatcher：模式跨越多次到达的数据块时仍能匹配"""
+
+import pytest
+
+from telnet_app.prompt_matcher import ERROR, PAGER, PROMPT, PromptMatcher, split_patterns
+
+
+def _scan(matcher, chunks):
+    """模拟 read_until_prompt：数据分块追加到缓冲区，每次只扫描新到的部分"""
+    scanner = matcher.scanner()
+    buffer = b""
+    matches = []
+    for chunk in chunks:
+        start = len(buffer)
+        buffer += chunk
+        while True:
+            match = scanner.feed(buffer, start)
+            if match is None:
+                break
+            matches.append((match.kind, match.pattern, match.end))
+            start = match.end
+    return buffer, matches
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64])
+def test_prompt_split_across_chunks(size):
+    data = b"\r\nCmd: A\r\nResult: Pass\r\nCIG-EVK-G2:>"
+    chunks = [data[index:index + size] for index in range(0, len(data), size)]
+    buffer, matches = _scan(PromptMatcher(), chunks)
+    assert matches == [(PROMPT, b"CIG-EVK-G2:>", len(buffer))]
+
+
+def test_error_and_pager_before_prompt():
+    matcher = PromptMatcher(errors=["% Unknown"], pagers=["--More--"])
+    data = b"% Unknown command\r\nline\r\n--More--\r\nCIG-EVK-G2:>"
+    _, matches = _scan(matcher, [data[index:index + 3] for index in range(0, len(data), 3)])
+    assert [kind for kind, _, _ in matches] == [ERROR, PAGER, PROMPT]
+    assert matches[-1][2] == len(data)
+
+
+def test_partial_prefix_does_not_match():
+    matcher = PromptMatcher(prompts=["ab>"])
+    _, matches = _scan(matcher, [b"a", b"b", b"a", b"b", b">"])
+    assert matches == [(PROMPT, b"ab>", 5)]
+
+
+def test_longest_pattern_wins_at_same_end():
+    matcher = PromptMatcher(prompts=["#", "router#"])
+    _, matches = _scan(matcher, [b"rout", b"er#"])
+    assert matches == [(PROMPT, b"router#", 7)]
+
+
+def test_requires_a_prompt():
+    with pytest.raises(ValueError):
+        PromptMatcher(prompts=[])
+
+
+def test_split_patterns():
+    assert split_patterns(" a | b || c ") == ["a", "b", "c"]
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# test_result_store.py
+
+"""ResultStore 写入后读回，以及 failure_rates 统计"""
+
+import sqlite3
+import time
+
+import pytest
+
+from telnet_app.result_parser import CommandResult
+from telnet_app.result_store import ResultStore, failure_rates
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sub" / "results.db")
+
+
+def test_round_trip(db_path):
+    store = ResultStore(db_path, flush_interval=0.05)
+    run_id = store.start_run("commands.txt", "a:1,b:2", host="a:1")
+    now = time.time()
+    store.add(CommandResult(now, "A", "1", "Pass", 0.01))
+    store.add(CommandResult(now, "B", "2", "Fail", 0.02, host="b:2"))
+    store.finish_run()
+    store.close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT run_id, ts, host, command, data, result, elapsed FROM results ORDER BY id").fetchall()
+        run = conn.execute("SELECT commands_file, targets, finished_at FROM runs WHERE id = ?", (run_id,)).fetchone()
+    finally:
+        conn.close()
+    assert rows == [
+        (run_id, pytest.approx(now), "a:1", "A", "1", "Pass", pytest.approx(0.01)),
+        (run_id, pytest.approx(now), "b:2", "B", "2", "Fail", pytest.approx(0.02)),
+    ]
+    assert run[:2] == ("commands.txt", "a:1,b:2")
+    assert run[2] is not None
+
+
+def test_batches_larger_than_one_commit(db_path):
+    store = ResultStore(db_path, flush_interval=10)
+    store.start_run()
+    count = ResultStore.BATCH_ROWS * 2 + 5
+    for index in range(count):
+        store.add(CommandResult(time.time(), f"C{index % 3}", "", "Pass" if index % 4 else "Fail", 0.001))
+    store.close()
+    rates = failure_rates(db_path)
+    assert sum(item["total"] for item in rates) == count
+
+
+def test_failure_rates(db_path):
+    store = ResultStore(db_path)
+    store.start_run(host="dev")
+    now = time.time()
+    for result in ("Pass", "Pass", "Fail", "ERROR: % Unknown", ""):
+        store.add(CommandResult(now, "A", "", result, 0.01))
+    store.add(CommandResult(now, "B", "", "Pass", 0.01, host="other"))
+    # 超出统计天数的旧记录
+    store.add(CommandResult(now - 40 * 86400, "A", "", "Fail", 0.01))
+    store.close()
+
+    rates = failure_rates(db_path, days=30)
+    assert [item["command"] for item in rates] == ["A", "B"]
+    assert rates[0] == {"command": "A", "total": 5, "passed": 2, "failed": 2, "rate": 0.4}
+    assert failure_rates(db_path, host="other") == [
+        {"command": "B", "total": 1, "passed": 1, "failed": 0, "rate": 0.0}
+    ]
+    assert failure_rates(db_path, command="B", host="dev") == []
+
+
+def test_failure_rates_missing_db(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        failure_rates(str(tmp_path / "missing.db"))
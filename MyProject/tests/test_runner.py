@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# test_runner.py
+
+"""CommandRunner：Result 为 Fail 的命令记为失败，stop_on_error 时停止执行"""
+
+import pytest
+
+from telnet_app.fake_device import FakeDevice
+from telnet_app.runner import CommandRunner
+from telnet_app.telnet_manager import TelnetManager
+
+COMMANDS = ["A", "FAIL 1", "B", "C"]
+
+
+@pytest.fixture
+def manager():
+    with FakeDevice() as device:
+        manager = TelnetManager(device.host, device.port, timeout=2)
+        manager.connect()
+        try:
+            yield manager
+        finally:
+            manager.close()
+
+
+def test_execute_one_command_reports_result_fail(manager):
+    runner = CommandRunner(manager)
+    assert runner.execute_one_command("A")
+    assert not runner.execute_one_command("FAIL 1")
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_result_fail_counts_as_failed(manager, window):
+    results = []
+    runner = CommandRunner(manager, on_result=results.append, pipeline_window=window)
+    runner.run(COMMANDS)
+    assert runner.executed == 4
+    assert runner.failed == 1
+    assert [result.command for result in results] == COMMANDS
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_stop_on_error_stops_at_result_fail(manager, window):
+    results = []
+    runner = CommandRunner(manager, on_result=results.append, stop_on_error=True, pipeline_window=window)
+    runner.run(COMMANDS, loop_count=2)
+    assert runner.executed == 2
+    assert runner.failed == 1
+    assert [(result.command, result.result) for result in results] == [("A", "Pass"), ("FAIL 1", "Fail")]
+    # 在途命令的返回已读完，会话可以继续使用
+    assert runner.execute_one_command("B")
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# test_session_record.py
+
+"""会话录制（.tsr）和回放"""
+
+import pytest
+
+from telnet_app.fake_device import DeviceBehavior, FakeDevice
+from telnet_app.runner import CommandRunner
+from telnet_app.session_record import MAGIC, RECV, SEND, ReplayTransport, SessionRecorder, iter_sessions
+from telnet_app.telnet_manager import TelnetManager
+
+COMMANDS = ["A", "BB FAIL", "CCC"]
+
+
+def _run(manager, window=1):
+    results = []
+    runner = CommandRunner(manager, on_result=results.append, pipeline_window=window)
+    runner.run(COMMANDS)
+    return [(result.command, result.data, result.result) for result in results]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """录制一个会话，返回 (文件路径, 连接设备时的结果)"""
+    path = str(tmp_path / "session.tsr")
+    recorder = SessionRecorder(path)
+    with FakeDevice(behavior=DeviceBehavior(latency=0.005)) as device:
+        manager = TelnetManager(device.host, device.port, timeout=5, recorder=recorder)
+        manager.connect()
+        try:
+            live = _run(manager)
+        finally:
+            manager.close()
+    recorder.close()
+    return path, live
+
+
+def test_recorded_session(recording):
+    path, live = recording
+    assert live == [("A", "1", "Pass"), ("BB FAIL", "7", "Fail"), ("CCC", "3", "Pass")]
+    sessions = list(iter_sessions(path))
+    assert len(sessions) == 1
+    session = sessions[0]
+    assert session.closed
+    assert session.host == "127.0.0.1"
+    assert session.commands() == COMMANDS
+    assert (253, 1) in session.options
+    kinds = {kind for kind, _, _ in session.events}
+    assert kinds == {SEND, RECV}
+    times = [timestamp for _, timestamp, _ in session.events]
+    assert times == sorted(times)
+
+
+@pytest.mark.parametrize("window", [1, 4])
+def test_replay_reproduces_results(recording, window):
+    path, live = recording
+    manager = TelnetManager("127.0.0.1", 0, timeout=5, transport=ReplayTransport(path))
+    manager.connect()
+    try:
+        assert _run(manager, window) == live
+    finally:
+        manager.close()
+
+
+def test_replay_exhausted(recording):
+    path, _ = recording
+    transport = ReplayTransport(path)
+    manager = TelnetManager("127.0.0.1", 0, timeout=5, transport=transport)
+    manager.connect()
+    manager.close()
+    with pytest.raises(ConnectionError):
+        manager.connect()
+
+
+def test_append_and_truncated_tail(recording):
+    path, _ = recording
+    recorder = SessionRecorder(path)
+    recorder.open_session("10.0.0.1", 23).close()
+    recorder.close()
+    with open(path, "ab") as f:
+        f.write(b"\x02\x01\x00")  # 不完整的记录
+    sessions = list(iter_sessions(path))
+    assert [(session.host, session.port) for session in sessions] == [("127.0.0.1", sessions[0].port), ("10.0.0.1", 23)]
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "bad.tsr"
+    path.write_bytes(b"XXXX" + MAGIC)
+    with pytest.raises(ValueError):
+        list(iter_sessions(str(path)))
+    with pytest.raises(ValueError):
+        SessionRecorder(str(path))